@@ -25,6 +25,114 @@ class Settings:
   openai_model: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
   openai_base_url: str = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 
+  # send each stable prompt prefix once at startup (prefix cache warm-up)
+  llm_warmup: bool = os.getenv("LLM_WARMUP", "false").lower() in ("1", "true", "yes")
+
+  # shared LLM http transport (connection pool)
+  llm_timeout: float = float(os.getenv("LLM_TIMEOUT", "120"))
+  llm_http2: bool = os.getenv("LLM_HTTP2", "false").lower() in ("1", "true", "yes")
+  llm_keepalive_expiry: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+  llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+  llm_max_keepalive_connections: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "16"))
+  vllm_max_connections: int = int(os.getenv("VLLM_MAX_CONNECTIONS", os.getenv("LLM_MAX_CONNECTIONS", "32")))
+  vllm_max_keepalive_connections: int = int(os.getenv("VLLM_MAX_KEEPALIVE_CONNECTIONS", os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "16")))
+  ollama_max_connections: int = int(os.getenv("OLLAMA_MAX_CONNECTIONS", os.getenv("LLM_MAX_CONNECTIONS", "32")))
+  ollama_max_keepalive_connections: int = int(os.getenv("OLLAMA_MAX_KEEPALIVE_CONNECTIONS", os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "16")))
+  openai_max_connections: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", os.getenv("LLM_MAX_CONNECTIONS", "32")))
+  openai_max_keepalive_connections: int = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "16")))
+
+  # LLM endpoints per provider: comma-separated `url` or `url*weight` (replicas of the same model); empty = *_BASE_URL
+  vllm_endpoints: str = os.getenv("VLLM_ENDPOINTS", "")
+  ollama_endpoints: str = os.getenv("OLLAMA_ENDPOINTS", "")
+  openai_endpoints: str = os.getenv("OPENAI_ENDPOINTS", "")
+  # circuit breaker: open after N consecutive endpoint faults, retry one probe after the cooldown
+  llm_breaker_failures: int = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+  llm_breaker_cooldown: float = float(os.getenv("LLM_BREAKER_COOLDOWN", "10"))
+  # active health check of circuit-open endpoints (seconds, 0 = off)
+  llm_health_check_interval: float = float(os.getenv("LLM_HEALTH_CHECK_INTERVAL", "5"))
+  # secondary provider when every endpoint of LLM_PROVIDER fails, for the listed stages
+  llm_fallback_provider: str = os.getenv("LLM_FALLBACK_PROVIDER", "")
+  llm_fallback_stages: str = os.getenv("LLM_FALLBACK_STAGES", "db_selection,sql,answer")
+
+  # lexical DB router (skip the selection LLM call when confident)
+  db_router_enabled: bool = os.getenv("DB_ROUTER_ENABLED", "true").lower() in ("1", "true", "yes")
+  db_router_min_margin: float = float(os.getenv("DB_ROUTER_MIN_MARGIN", "0.3"))
+  db_router_min_score: float = float(os.getenv("DB_ROUTER_MIN_SCORE", "2.0"))
+
+  # question-relevant schema pruning for SQL generation prompts
+  schema_pruning_enabled: bool = os.getenv("SCHEMA_PRUNING_ENABLED", "true").lower() in ("1", "true", "yes")
+  schema_prune_token_budget: int = int(os.getenv("SCHEMA_PRUNE_TOKEN_BUDGET", "1500"))
+
+  # question -> SQL cache
+  sql_cache_enabled: bool = os.getenv("SQL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+  sql_cache_max_entries: int = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "1024"))
+  sql_cache_ttl_seconds: float = float(os.getenv("SQL_CACHE_TTL_SECONDS", "86400"))
+
+  # SQL result cache (per-DB policy in databases.yaml `result_cache`)
+  result_cache_max_bytes: int = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+  # row cap for /api/query (unbuffered fetch stops here, 0 = no cap)
+  query_max_rows: int = int(os.getenv("QUERY_MAX_ROWS", "1000"))
+  rows_stream_batch_size: int = int(os.getenv("ROWS_STREAM_BATCH_SIZE", "500"))
+
+  # query cost guard defaults (per-DB override: databases.yaml `guard`)
+  query_timeout_seconds: float = float(os.getenv("QUERY_TIMEOUT_SECONDS", "30"))
+  query_explain_enabled: bool = os.getenv("QUERY_EXPLAIN_ENABLED", "false").lower() in ("1", "true", "yes")
+  query_max_scan_rows: int = int(os.getenv("QUERY_MAX_SCAN_ROWS", "10000000"))
+
+  # answer prompt: raw rows up to this many tokens, exact aggregates + samples above
+  answer_rows_token_budget: int = int(os.getenv("ANSWER_ROWS_TOKEN_BUDGET", "1500"))
+
+  # local SQL check before MySQL (SELECT only, schema names, LIMIT injection)
+  sql_validation_enabled: bool = os.getenv("SQL_VALIDATION_ENABLED", "true").lower() in ("1", "true", "yes")
+
+  # POST /api/query/batch: questions in flight (per-request override up to the max), batch size
+  batch_concurrency: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+  batch_max_concurrency: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+  batch_max_questions: int = int(os.getenv("BATCH_MAX_QUESTIONS", "1000"))
+
+  # multi-candidate SQL: N samples per question, executed concurrently (1 = off)
+  sql_candidates: int = int(os.getenv("SQL_CANDIDATES", "1"))
+  sql_candidates_temperature: float = float(os.getenv("SQL_CANDIDATES_TEMPERATURE", "0.7"))
+  # first: first successful candidate wins / majority: wait for a result set most candidates agree on
+  sql_candidates_strategy: str = os.getenv("SQL_CANDIDATES_STRATEGY", "first")
+
+  # query log writer (background thread): queue size, full-queue policy drop | block,
+  # batch flush by lines/seconds, size rotation (0 = day only), gzip of rotated files
+  log_queue_size: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+  log_queue_full_policy: str = os.getenv("LOG_QUEUE_FULL_POLICY", "drop").lower()
+  log_batch_size: int = int(os.getenv("LOG_BATCH_SIZE", "200"))
+  log_flush_interval: float = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))
+  log_max_bytes: int = int(os.getenv("LOG_MAX_BYTES", str(100 * 1024 * 1024)))
+  log_gzip: bool = os.getenv("LOG_GZIP", "false").lower() in ("1", "true", "yes")
+
+  # prompt files are served from memory; re-stat interval in seconds for edits (0 = admin reload only)
+  prompt_watch_interval: float = float(os.getenv("PROMPT_WATCH_INTERVAL", "2.0"))
+
+  # startup: DBs are connected/introspected concurrently; boot waits at most this long (seconds),
+  # the rest keep retrying in the background (backoff up to SCHEMA_RETRY_MAX_SECONDS)
+  schema_startup_timeout: float = float(os.getenv("SCHEMA_STARTUP_TIMEOUT", "10"))
+  schema_retry_max_seconds: float = float(os.getenv("SCHEMA_RETRY_MAX_SECONDS", "60"))
+  # per-table schema fingerprint check interval in seconds; changed tables are re-introspected (0 = off)
+  schema_refresh_interval: float = float(os.getenv("SCHEMA_REFRESH_INTERVAL", "300"))
+
+  # column value profiles (sampled distinct values / ranges) injected into the SQL prompt
+  value_profiles_enabled: bool = os.getenv("VALUE_PROFILES_ENABLED", "true").lower() in ("1", "true", "yes")
+  value_profile_sample_rows: int = int(os.getenv("VALUE_PROFILE_SAMPLE_ROWS", "10000"))
+  value_profile_max_values: int = int(os.getenv("VALUE_PROFILE_MAX_VALUES", "20"))
+  value_profile_max_age_seconds: float = float(os.getenv("VALUE_PROFILE_MAX_AGE_SECONDS", "86400"))
+  value_profile_token_budget: int = int(os.getenv("VALUE_PROFILE_TOKEN_BUDGET", "300"))
+
+  # few-shot examples: verified question -> SQL pairs mined from the query logs
+  examples_enabled: bool = os.getenv("EXAMPLES_ENABLED", "true").lower() in ("1", "true", "yes")
+  examples_top_k: int = int(os.getenv("EXAMPLES_TOP_K", "3"))
+  examples_min_similarity: float = float(os.getenv("EXAMPLES_MIN_SIMILARITY", "0.3"))
+  examples_token_budget: int = int(os.getenv("EXAMPLES_TOKEN_BUDGET", "400"))
+  examples_max_per_db: int = int(os.getenv("EXAMPLES_MAX_PER_DB", "50000"))
+  # doc ids walked per lookup (most recent postings of each query n-gram); bounds lookup cost regardless of index size
+  examples_max_postings: int = int(os.getenv("EXAMPLES_MAX_POSTINGS", "3000"))
+  examples_scan_interval: float = float(os.getenv("EXAMPLES_SCAN_INTERVAL", "60"))
+
   databases_yaml_path: str = os.getenv("CONFIG_DATABASES_FILE", "./config/databases.yaml")
 
   host: str = os.getenv("HOST", "0.0.0.0")
@@ -1,10 +1,27 @@
+import asyncio
+import time
+from typing import Iterator
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from .config import settings
 from .services.prompt_manager import PromptManager
 from .models.db_manager import DatabaseManager
+from .models.http_transport import LLMTransport
+from .models.llm_client import LLMClient
 from .routes.query import router as query_router
+from .routes.admin import router as admin_router
 from .services.logger import AppLogger
+from .services.sql_cache import QuestionSQLCache
+from .services.db_router import LexicalDBRouter
+from .services.schema_retriever import SchemaRetriever
+from .services.sql_validator import SQLValidator
+from .services.db_selector import DBSelector
+from .services.sql_generator import SQLGenerator
+from .services.value_profiler import ValueProfiler
+from .services.example_index import ExampleIndex
+from .services.metrics import MetricsMiddleware, MetricsRegistry, Sample
 
 
 app = FastAPI(title="LLM TEXT2SQL Answer Server")
@@ -18,28 +35,262 @@ app.add_middleware(
 )
 
 
+metrics = MetricsRegistry()
 prompt_manager = PromptManager()
-db_manager = DatabaseManager()
+db_manager = DatabaseManager(metrics)
 app_logger = AppLogger()
+llm_transport = LLMTransport()
+llm_client = LLMClient(llm_transport, metrics)
+sql_cache = QuestionSQLCache()
+db_router = LexicalDBRouter()
+schema_retriever = SchemaRetriever()
+sql_validator = SQLValidator()
+value_profiler = ValueProfiler()
+example_index = ExampleIndex()
+# PROMPT_WATCH_INTERVAL마다 프롬프트 파일 변경을 확인하는 task
+prompt_watcher: asyncio.Task[None] | None = None
+# SCHEMA_REFRESH_INTERVAL마다 테이블 fingerprint를 확인하는 task
+schema_poller: asyncio.Task[None] | None = None
+# EXAMPLES_SCAN_INTERVAL마다 쿼리 로그의 새 줄을 예시 인덱스에 추가하는 task
+example_scanner: asyncio.Task[None] | None = None
+# LLM_HEALTH_CHECK_INTERVAL마다 차단된 LLM endpoint를 확인하는 task
+llm_health_checker: asyncio.Task[None] | None = None
+# DB별 연결/스키마 준비 task와 상태 ("pending" | "ready" | "error: ...")
+schema_tasks: dict[str, asyncio.Task[None]] = {}
+# DB별 값 프로필 수집 task (서버 시작을 기다리게 하지 않음)
+profile_tasks: dict[str, asyncio.Task[list[str]]] = {}
+db_status: dict[str, str] = {}
+
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
+
+def collect_component_stats() -> Iterator[Sample]:
+  """Counters the components already keep, read at scrape time."""
+  usage = db_manager.pool_usage()
+  yield "db_pool_connections_in_use", "gauge", "DB connections currently checked out.", [({"db": n}, u["in_use"]) for n, u in usage.items()]
+  yield "db_pool_waiting", "gauge", "Callers waiting for a DB connection slot.", [({"db": n}, u["waiting"]) for n, u in usage.items() if "waiting" in u]
+  yield "db_guard_events_total", "counter", "Query guard events (explained, rejected, timeouts, killed).", [({"event": k}, v) for k, v in db_manager.guard_stats.items()]
+  providers = llm_transport.pool_stats()["providers"]
+  yield "llm_requests_in_flight", "gauge", "LLM HTTP requests in flight.", [({"provider": p}, s["in_flight"]) for p, s in providers.items()]
+  yield "llm_requests_total", "counter", "LLM HTTP requests sent.", [({"provider": p}, s["requests"]) for p, s in providers.items()]
+  yield "llm_request_errors_total", "counter", "LLM HTTP requests that raised.", [({"provider": p}, s["errors"]) for p, s in providers.items()]
+  yield "llm_connections_opened_total", "counter", "New TCP connections to the LLM provider.", [({"provider": p}, s["connections_opened"]) for p, s in providers.items()]
+  endpoints = [(p, e) for p, s in providers.items() for e in s.get("endpoints", ())]
+  yield "llm_endpoint_in_flight", "gauge", "LLM requests in flight per endpoint.", [({"provider": p, "endpoint": e["url"]}, e["in_flight"]) for p, e in endpoints]
+  yield "llm_endpoint_requests_total", "counter", "LLM calls per endpoint.", [({"provider": p, "endpoint": e["url"]}, e["requests"]) for p, e in endpoints]
+  yield "llm_endpoint_errors_total", "counter", "LLM endpoint faults (connection errors, timeouts, 5xx/429).", [({"provider": p, "endpoint": e["url"]}, e["errors"]) for p, e in endpoints]
+  yield "llm_endpoint_up", "gauge", "1 when the endpoint's circuit is closed.", [({"provider": p, "endpoint": e["url"]}, int(e["state"] == "closed")) for p, e in endpoints]
+  cache = sql_cache.stats()
+  yield "sql_cache_lookups_total", "counter", "Question cache lookups by stage and result.", [
+    *(({"stage": k, "result": "hit"}, v) for k, v in cache["hits"].items()),
+    *(({"stage": k, "result": "miss"}, v) for k, v in cache["misses"].items()),
+  ]
+  result = db_manager.result_cache.stats()
+  yield "result_cache_lookups_total", "counter", "Result cache lookups.", [({"result": "hit"}, result["hits"]), ({"result": "miss"}, result["misses"])]
+  yield "result_cache_bytes", "gauge", "Estimated bytes held by the result cache.", [({}, result["bytes"])]
+  logs = app_logger.stats()
+  yield "log_records_total", "counter", "Query log records by outcome.", [({"outcome": "written"}, logs["written"]), ({"outcome": "dropped"}, logs["dropped"])]
+  yield "log_queue_depth", "gauge", "Query log records waiting for the writer thread.", [({}, logs["queued"])]
+
+
+metrics.add_collector(collect_component_stats)
 
 
 @app.on_event("startup")
-def on_startup() -> None:
+async def on_startup() -> None:
   db_manager.load_config()
-  db_manager.connect_all()
   prompt_manager.ensure_directories()
-  prompt_manager.generate_db_structure_prompts(db_manager)
+  # DB마다 연결 + 스키마 확인을 동시에 시작; 느리거나 죽은 DB는 기다리지 않고 백그라운드에서 계속
+  for db in db_manager.list_db_names():
+    db_status[db] = "pending"
+    schema_tasks[db] = asyncio.create_task(prepare_db(db))
+  if schema_tasks:
+    await asyncio.wait(schema_tasks.values(), timeout=settings.schema_startup_timeout)
+  # await 없이 읽고 바로 인덱스 생성 (그 사이 끝난 DB가 반영을 건너뛰지 않도록)
+  prompt_manager.refresh()
+  db_router.build(db_manager, prompt_manager)
+  global prompt_watcher, schema_poller, example_scanner, llm_health_checker
+  if settings.prompt_watch_interval > 0:
+    prompt_watcher = asyncio.create_task(watch_prompts())
+  if settings.schema_refresh_interval > 0:
+    schema_poller = asyncio.create_task(poll_schemas())
+  if settings.examples_enabled:
+    await anyio.to_thread.run_sync(example_index.load)
+    if settings.examples_scan_interval > 0:
+      example_scanner = asyncio.create_task(scan_examples())
+  if settings.llm_health_check_interval > 0:
+    llm_health_checker = asyncio.create_task(check_llm_endpoints())
+
+
+async def prepare_db(db: str) -> None:
+  """Connect `db` and bring its schema prompt up to date, retrying with backoff
+  until it succeeds. A cached prompt whose schema fingerprint still matches is
+  reused without introspection."""
+  delay = 1.0
+  while True:
+    started = time.perf_counter()
+    try:
+      await anyio.to_thread.run_sync(db_manager.connect_db, db)
+      await db_manager.aconnect_db(db)
+      changed = await refresh_schema(db)
+      break
+    except Exception as e:
+      db_status[db] = f"error: {e}"
+      await anyio.to_thread.run_sync(prompt_manager.write_db_structure_placeholder, db, e)
+      app_logger.log_query({"event": "schema_prepare_failed", "db": db, "error": str(e), "retry_in_s": delay})
+      await asyncio.sleep(delay)
+      delay = min(delay * 2, settings.schema_retry_max_seconds)
+  db_status[db] = "ready"
+  app_logger.log_query({
+    "event": "schema_ready", "db": db, "tables_changed": len(changed),
+    "ms": round((time.perf_counter() - started) * 1000, 1),
+  })
+  profile_tasks[db] = asyncio.create_task(profile_values(db))
+
+
+async def refresh_schema(db: str, force: bool = False) -> list[str]:
+  """Re-check `db`'s table fingerprints and patch its schema prompt and the
+  state derived from it (result cache of changed tables, question cache, DB
+  router). Returns the changed tables."""
+  changed = await anyio.to_thread.run_sync(prompt_manager.refresh_db_structure_prompt, db_manager, db, force)
+  if not changed:
+    return changed
+  for table in changed:
+    db_manager.result_cache.invalidate(db, table)
+  sql_cache.invalidate_db(db)
+  app_logger.log_query({"event": "schema_refreshed", "db": db, "tables": changed})
+  if db_router.ready:
+    # 시작 이후의 변경: 프롬프트를 다시 읽고 바로 반영 (시작 중에는 on_startup이 한 번에 반영)
+    apply_prompt_changes(await anyio.to_thread.run_sync(prompt_manager.refresh))
+    profile_tasks[db] = asyncio.create_task(profile_values(db))
+  return changed
+
+
+async def profile_values(db: str, force: bool = False) -> list[str]:
+  """Profile column values of `db`'s new, changed or stale tables (see ValueProfiler)."""
+  if not settings.value_profiles_enabled:
+    return []
+  started = time.perf_counter()
+  tables = await anyio.to_thread.run_sync(prompt_manager.schema_tables, db)
+  profiled = await anyio.to_thread.run_sync(value_profiler.refresh, db_manager, db, tables, force)
+  if profiled:
+    app_logger.log_query({
+      "event": "values_profiled", "db": db, "tables": profiled,
+      "ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+  return profiled
+
+
+async def poll_schemas() -> None:
+  while True:
+    await asyncio.sleep(settings.schema_refresh_interval)
+    for db, status in list(db_status.items()):
+      # 아직 준비되지 않은 DB는 prepare_db가 재시도 중
+      if status != "ready":
+        continue
+      try:
+        await refresh_schema(db)
+        await profile_values(db)
+      except Exception as e:
+        app_logger.log_query({"event": "schema_refresh_failed", "db": db, "error": str(e)})
+
+
+async def index_examples() -> int:
+  """Add verified question -> SQL pairs logged since the last scan to the example index and persist it."""
+  started = time.perf_counter()
+  added = await anyio.to_thread.run_sync(example_index.scan_logs)
+  if added:
+    await anyio.to_thread.run_sync(example_index.save)
+    app_logger.log_query({
+      "event": "examples_indexed", "added": added,
+      "ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+  return added
+
+
+async def scan_examples() -> None:
+  # 첫 스캔은 바로 (저장된 offset 이후 쌓인 로그)
+  while True:
+    try:
+      await index_examples()
+    except OSError as e:
+      app_logger.log_query({"event": "examples_index_failed", "error": str(e)})
+    await asyncio.sleep(settings.examples_scan_interval)
+
+
+async def check_llm_endpoints() -> None:
+  while True:
+    await asyncio.sleep(settings.llm_health_check_interval)
+    recovered = await llm_transport.check_health()
+    if recovered:
+      app_logger.log_query({"event": "llm_endpoints_recovered", "endpoints": recovered})
+
+
+def apply_prompt_changes(changed: list[str]) -> None:
+  """Rebuild state derived from prompt files after `changed` were (re)loaded.
+
+  Runs on the event loop so routing never sees a half-built index. The
+  question/SQL cache and the schema retriever key on prompt fingerprints and
+  pick up the new text by themselves.
+  """
+  if not changed:
+    return
+  db_router.build(db_manager, prompt_manager)
+  app_logger.log_query({"event": "prompts_reloaded", "files": changed})
+
+
+async def watch_prompts() -> None:
+  while True:
+    await asyncio.sleep(settings.prompt_watch_interval)
+    try:
+      changed = await anyio.to_thread.run_sync(prompt_manager.refresh)
+    except OSError as e:
+      app_logger.log_query({"event": "prompts_reload_failed", "error": str(e)})
+      continue
+    apply_prompt_changes(changed)
+
+
+@app.on_event("startup")
+async def warm_up_llm() -> None:
+  """Optionally send each stable prompt prefix once so vLLM caches its KV blocks."""
+  if not settings.llm_warmup:
+    return
+  selector = DBSelector(prompt_manager, db_manager, llm_client)
+  sqlgen = SQLGenerator(prompt_manager, llm_client, schema_retriever, value_profiler, example_index)
+  names = db_manager.list_db_names()
+  results = await asyncio.gather(
+    selector.warm_up(),
+    *(sqlgen.warm_up(db) for db in names),
+    return_exceptions=True,
+  )
+  errors = {
+    target: str(r) for target, r in zip(["db_selection", *names], results) if isinstance(r, Exception)
+  }
+  app_logger.log_query({"event": "llm_warmup", "targets": len(results), "errors": errors})
 
 
 @app.on_event("shutdown")
-def on_shutdown() -> None:
+async def on_shutdown() -> None:
+  for task in (prompt_watcher, schema_poller, example_scanner, llm_health_checker, *schema_tasks.values(), *profile_tasks.values()):
+    if task is not None:
+      task.cancel()
   db_manager.close_all()
+  await db_manager.aclose_all()
+  await llm_transport.aclose()
+  app_logger.close()
 
 
 app.include_router(query_router, prefix="/api")
+app.include_router(admin_router, prefix="/api/admin")
 
 
 @app.get("/health")
 def health() -> dict:
-  return {"ok": True}
+  return {"ok": True, "databases": db_status}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint() -> PlainTextResponse:
+  """Prometheus text exposition of the in-process metrics."""
+  return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
@@ -1,15 +1,160 @@
 from __future__ import annotations
 
+import asyncio
+import re
+import threading
+import time
+from contextlib import contextmanager
+import anyio
 import mysql.connector
 from mysql.connector import pooling
-from typing import Any
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterator
 import yaml
 from pathlib import Path
 from ..config import settings
+from .result_cache import ResultCache, ResultCachePolicy
+
+if TYPE_CHECKING:
+  from ..services.metrics import MetricsRegistry
+
+
+# mysql-connector-python 풀 최대 크기 (pooling.CNX_POOL_MAXSIZE)
+CONNECTOR_POOL_MAXSIZE = 32
+
+# 서버 측 MAX_EXECUTION_TIME이 먼저 동작하도록 watchdog은 조금 늦게 KILL
+KILL_GRACE_SECONDS = 1.0
+# ER_QUERY_INTERRUPTED (KILL QUERY), ER_QUERY_TIMEOUT (MAX_EXECUTION_TIME)
+INTERRUPTED_ERRNOS = (1317, 3024)
+
+_HINT_SCAN = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`|/\*.*?\*/|--[^\n]*|#[^\n]*|[()]|\bSELECT\b", re.IGNORECASE | re.DOTALL)
+
+
+class QueryRejected(Exception):
+  """EXPLAIN estimate above the DB's `guard.max_scan_rows`; nothing was executed."""
+
+
+class QueryTimeout(Exception):
+  """Statement interrupted by MAX_EXECUTION_TIME or the KILL QUERY watchdog."""
+
+
+def with_max_execution_time(sql: str, ms: int) -> str:
+  """Add a `MAX_EXECUTION_TIME` optimizer hint to the top-level SELECT.
+
+  Statements without one at paren depth 0 (e.g. `(SELECT ..) UNION (..)`) are
+  returned unchanged and rely on the watchdog.
+  """
+  if ms <= 0 or "MAX_EXECUTION_TIME" in sql.upper():
+    return sql
+  depth = 0
+  for m in _HINT_SCAN.finditer(sql):
+    tok = m.group()
+    if tok == "(":
+      depth += 1
+    elif tok == ")":
+      depth -= 1
+    elif depth == 0 and tok.upper() == "SELECT":
+      return f"{sql[:m.end()]} /*+ MAX_EXECUTION_TIME({int(ms)}) */{sql[m.end():]}"
+  return sql
+
+
+def estimate_scan_rows(plan: list[dict[str, Any]]) -> int:
+  """Rows examined according to EXPLAIN: nested-loop product of `rows`
+  (scaled by `filtered`) within each select id, summed over all ids."""
+  total = 0.0
+  fanout: dict[Any, float] = {}
+  for row in plan:
+    key = row.get("id")
+    examined = fanout.get(key, 1.0) * float(row.get("rows") or 0)
+    total += examined
+    fanout[key] = examined * float(row.get("filtered") or 100.0) / 100.0
+  return int(total)
+
+
+def _quote_ident(name: str) -> str:
+  return "`" + name.replace("`", "``") + "`"
+
+
+def _is_interrupted(error: Exception) -> bool:
+  code = getattr(error, "errno", None)
+  if code is None and error.args and isinstance(error.args[0], int):
+    code = error.args[0]
+  return code in INTERRUPTED_ERRNOS
+
+
+class PoolConfig:
+  """Per-DB `pool` block of databases.yaml.
+
+  backend: `mysql-connector` (threads, default) or `aiomysql` (asyncio-native).
+  When every connection is busy, callers wait up to `acquire_timeout` seconds
+  instead of failing immediately. `recycle` only applies to aiomysql.
+  """
+
+  def __init__(self, backend: str = "mysql-connector", min_size: int = 1, max_size: int = 5, acquire_timeout: float = 30.0, recycle: int = 3600) -> None:
+    self.backend = backend
+    self.min_size = min_size
+    self.max_size = max_size
+    self.acquire_timeout = acquire_timeout
+    self.recycle = recycle
+
+  @classmethod
+  def from_dict(cls, data: dict[str, Any] | None) -> "PoolConfig":
+    data = data or {}
+    return cls(
+      backend=str(data.get("backend", "mysql-connector")).lower(),
+      min_size=int(data.get("min_size", 1)),
+      max_size=int(data.get("max_size", 5)),
+      acquire_timeout=float(data.get("acquire_timeout", 30)),
+      recycle=int(data.get("recycle", 3600)),
+    )
+
+
+class ColumnarRows:
+  """Result set as column names + row tuples (tuple cursor, no dict per row)."""
+
+  __slots__ = ("columns", "rows")
+
+  def __init__(self, columns: list[str], rows: list[tuple[Any, ...]]) -> None:
+    self.columns = columns
+    self.rows = rows
+
+  def __len__(self) -> int:
+    return len(self.rows)
+
+  def __iter__(self) -> Iterator[tuple[Any, ...]]:
+    return iter(self.rows)
+
+  def __getitem__(self, index: slice) -> "ColumnarRows":
+    return ColumnarRows(self.columns, self.rows[index])
+
+  def as_dicts(self) -> list[dict[str, Any]]:
+    return [dict(zip(self.columns, row)) for row in self.rows]
+
+
+class GuardConfig:
+  """Per-DB `guard` block of databases.yaml (defaults from QUERY_* settings).
+
+  timeout: seconds per statement, sent as a MAX_EXECUTION_TIME hint and
+  enforced by a KILL QUERY watchdog (0 = off). explain: run EXPLAIN first and
+  reject statements estimated to examine more than `max_scan_rows` rows.
+  """
+
+  def __init__(self, timeout: float | None = None, explain: bool | None = None, max_scan_rows: int | None = None) -> None:
+    self.timeout = settings.query_timeout_seconds if timeout is None else timeout
+    self.explain = settings.query_explain_enabled if explain is None else explain
+    self.max_scan_rows = settings.query_max_scan_rows if max_scan_rows is None else max_scan_rows
+
+  @classmethod
+  def from_dict(cls, data: dict[str, Any] | None) -> "GuardConfig":
+    data = data or {}
+    return cls(
+      timeout=float(data["timeout"]) if "timeout" in data else None,
+      explain=bool(data["explain"]) if "explain" in data else None,
+      max_scan_rows=int(data["max_scan_rows"]) if "max_scan_rows" in data else None,
+    )
 
 
 class DatabaseConfig:
-  def __init__(self, name: str, host: str, port: int, user: str, password: str, database: str, description: str | None = None) -> None:
+  def __init__(self, name: str, host: str, port: int, user: str, password: str, database: str, description: str | None = None, result_cache: ResultCachePolicy | None = None, pool: PoolConfig | None = None, guard: GuardConfig | None = None) -> None:
     self.name = name
     self.host = host
     self.port = port
@@ -17,12 +162,24 @@ class DatabaseConfig:
     self.password = password
     self.database = database
     self.description = description or name
+    self.result_cache = result_cache or ResultCachePolicy()
+    self.pool = pool or PoolConfig()
+    self.guard = guard or GuardConfig()
 
 
 class DatabaseManager:
-  def __init__(self) -> None:
+  def __init__(self, metrics: MetricsRegistry | None = None) -> None:
+    self.metrics = metrics
     self.databases: list[DatabaseConfig] = []
     self.pools: dict[str, pooling.MySQLConnectionPool] = {}
+    self.result_cache = ResultCache(max_bytes=settings.result_cache_max_bytes)
+    # asyncio-native pools (backend: aiomysql)
+    self.apools: dict[str, Any] = {}
+    # connector 풀 고갈 시 PoolError 대신 대기하도록 크기만큼의 세마포어
+    self._slots: dict[str, threading.BoundedSemaphore] = {}
+    # to_thread 실행 시 anyio 기본 limiter(40) 대신 DB별 limiter 사용
+    self._limiters: dict[str, anyio.CapacityLimiter] = {}
+    self.guard_stats = {"explained": 0, "rejected": 0, "timeouts": 0, "killed": 0}
 
   def load_config(self) -> None:
     yaml_path = Path(settings.databases_yaml_path)
@@ -39,21 +196,67 @@ class DatabaseManager:
         password=item.get("password", ""),
         database=item.get("database", item["name"]),
         description=item.get("description"),
+        result_cache=ResultCachePolicy.from_dict(item.get("result_cache")),
+        pool=PoolConfig.from_dict(item.get("pool")),
+        guard=GuardConfig.from_dict(item.get("guard")),
       )
       self.databases.append(cfg)
 
+  def connect_db(self, name: str) -> None:
+    """Create the connector pool for one DB; no-op when it already exists."""
+    if name in self.pools:
+      return
+    cfg = self.get_config(name)
+    if cfg is None:
+      raise KeyError(f"Unknown DB: {name}")
+    # aiomysql DB는 스키마 조회용 연결 하나만 동기 풀로 유지
+    size = 1 if cfg.pool.backend == "aiomysql" else min(cfg.pool.max_size, CONNECTOR_POOL_MAXSIZE)
+    # consume_results: 행 수 제한으로 중간에 멈춘 unbuffered 결과를 close 시 버림
+    pool = pooling.MySQLConnectionPool(
+      pool_name=f"pool_{cfg.name}", pool_size=size, host=cfg.host, port=cfg.port,
+      user=cfg.user, password=cfg.password, database=cfg.database, consume_results=True,
+    )
+    # 세마포어를 먼저 등록 (connection()이 풀만 있고 슬롯이 없는 상태를 보지 않도록)
+    self._slots[cfg.name] = threading.BoundedSemaphore(size)
+    self.pools[cfg.name] = pool
+
   def connect_all(self) -> None:
     self.pools = {}
+    self._slots = {}
+    self._limiters = {}
     for cfg in self.databases:
-      pool = pooling.MySQLConnectionPool(
-        pool_name=f"pool_{cfg.name}", pool_size=5, host=cfg.host, port=cfg.port,
-        user=cfg.user, password=cfg.password, database=cfg.database
-      )
-      self.pools[cfg.name] = pool
+      self.connect_db(cfg.name)
+
+  async def aconnect_db(self, name: str) -> None:
+    """Create the aiomysql pool for one DB (backend: aiomysql only); must run inside the event loop."""
+    cfg = self.get_config(name)
+    if cfg is None or cfg.pool.backend != "aiomysql" or name in self.apools:
+      return
+    try:
+      import aiomysql
+    except ImportError as e:
+      raise RuntimeError(f"DB {cfg.name}: pool.backend=aiomysql requires `pip install aiomysql`") from e
+    self.apools[cfg.name] = await aiomysql.create_pool(
+      host=cfg.host, port=cfg.port, user=cfg.user, password=cfg.password, db=cfg.database,
+      minsize=cfg.pool.min_size, maxsize=cfg.pool.max_size, pool_recycle=cfg.pool.recycle,
+      autocommit=True, charset="utf8mb4",
+    )
+
+  async def aconnect_all(self) -> None:
+    """Create aiomysql pools; must run inside the event loop (startup)."""
+    self.apools = {}
+    for cfg in self.databases:
+      await self.aconnect_db(cfg.name)
 
   def close_all(self) -> None:
     self.pools = {}
 
+  async def aclose_all(self) -> None:
+    for pool in self.apools.values():
+      pool.close()
+      await pool.wait_closed()
+    self.apools = {}
+
   def list_db_names(self) -> list[str]:
     return [d.name for d in self.databases]
 
@@ -63,77 +266,557 @@ class DatabaseManager:
         return d.description
     return name
 
+  def get_config(self, name: str) -> DatabaseConfig | None:
+    for d in self.databases:
+      if d.name == name:
+        return d
+    return None
+
   def get_connection(self, db_name: str):
     if db_name not in self.pools:
       raise KeyError(f"Unknown DB: {db_name}")
     return self.pools[db_name].get_connection()
 
+  @contextmanager
+  def connection(self, db_name: str) -> Iterator[Any]:
+    """Pooled connection; waits up to acquire_timeout when the pool is busy."""
+    if db_name not in self.pools:
+      raise KeyError(f"Unknown DB: {db_name}")
+    cfg = self.get_config(db_name)
+    timeout = cfg.pool.acquire_timeout if cfg else 30.0
+    slot = self._slots[db_name]
+    if not slot.acquire(timeout=timeout):
+      raise TimeoutError(f"DB {db_name}: no free connection within {timeout}s")
+    try:
+      conn = self.pools[db_name].get_connection()
+      try:
+        yield conn
+      finally:
+        conn.close()
+    finally:
+      slot.release()
+
   def query(self, db_name: str, sql: str, params: tuple[Any, ...] | None = None) -> list[dict[str, Any]]:
-    conn = self.get_connection(db_name)
+    cfg = self.get_config(db_name)
+    plan = self.result_cache.plan(db_name, sql, params, cfg.result_cache if cfg else None)
+    if plan is not None:
+      cached = self.result_cache.get(plan)
+      if cached is not None:
+        return cached
+    rows, _ = self._query_connector(db_name, sql, params)
+    if plan is not None:
+      self.result_cache.put(plan, rows)
+    return rows
+
+  async def aquery(self, db_name: str, sql: str, params: tuple[Any, ...] | None = None) -> list[dict[str, Any]]:
+    """Async `query`: aiomysql when configured, otherwise a worker thread
+    bounded by the DB's own limiter (pool max_size)."""
+    rows, _ = await self.aquery_bounded(db_name, sql, params)
+    return rows
+
+  async def aquery_bounded(self, db_name: str, sql: str, params: tuple[Any, ...] | None = None, max_rows: int | None = None, columnar: bool = False) -> tuple[list[dict[str, Any]] | ColumnarRows, bool]:
+    """Like `aquery` but stops after `max_rows` rows. Returns (rows, truncated).
+
+    Rows are read from an unbuffered cursor and the server is told to stop at
+    max_rows + 1 (`sql_select_limit`, ignored when the SQL has its own LIMIT),
+    so a query without LIMIT never materializes its full result.
+    With `columnar=True` a tuple cursor is used and rows come back as
+    `ColumnarRows`.
+    """
+    cfg = self.get_config(db_name)
+    if cfg is None:
+      raise KeyError(f"Unknown DB: {db_name}")
+    plan = self.result_cache.plan(db_name, sql, params, cfg.result_cache, shape="columnar" if columnar else "dict")
+    if plan is not None:
+      cached = self.result_cache.get(plan)
+      if cached is not None:
+        if max_rows is not None and len(cached) > max_rows:
+          return cached[:max_rows], True
+        return cached, False
+    if db_name in self.apools:
+      rows, truncated = await self._query_aiomysql(db_name, sql, params, max_rows, columnar)
+    else:
+      # 취소되면 스레드를 기다리지 않고 watchdog이 즉시 KILL QUERY
+      cancel = threading.Event()
+      queued = time.perf_counter()
+
+      def run() -> tuple[list[dict[str, Any]] | ColumnarRows, bool]:
+        # limiter(풀 크기) 대기 = 워커 스레드가 시작될 때까지
+        self._observe_pool_wait(db_name, time.perf_counter() - queued)
+        return self._query_connector(db_name, sql, params, max_rows, columnar, cancel)
+
+      try:
+        rows, truncated = await anyio.to_thread.run_sync(run, limiter=self._limiter(db_name), abandon_on_cancel=True)
+      except anyio.get_cancelled_exc_class():
+        cancel.set()
+        raise
+    # 잘린 결과는 캐시하지 않음
+    if plan is not None and not truncated:
+      self.result_cache.put(plan, rows)
+    return rows, truncated
+
+  async def astream(self, db_name: str, sql: str, params: tuple[Any, ...] | None = None, batch_size: int = 500) -> AsyncIterator[list[dict[str, Any]]]:
+    """Yield the full result in batches from an unbuffered cursor (no row cap).
+
+    EXPLAIN admission and the MAX_EXECUTION_TIME hint apply; the watchdog does
+    not, since a long export is expected to outlive the per-query deadline.
+    """
+    guard = self._guard(db_name)
+    hinted = with_max_execution_time(sql, int(guard.timeout * 1000))
+    if db_name in self.apools:
+      import aiomysql
+
+      pool = self.apools[db_name]
+      conn = await self._acquire_aiomysql(db_name)
+      try:
+        if guard.explain:
+          await self._explain_aiomysql(conn, db_name, sql, params)
+        async with conn.cursor(aiomysql.SSDictCursor) as cur:
+          await cur.execute(hinted, params or None)
+          while True:
+            batch = await cur.fetchmany(batch_size)
+            if not batch:
+              break
+            yield list(batch)
+      except Exception as e:
+        if _is_interrupted(e):
+          raise self._timeout_error(guard) from e
+        raise
+      finally:
+        pool.release(conn)
+      return
+
+    limiter = self._limiter(db_name)
+    cm = self.connection(db_name)
+    queued = time.perf_counter()
+    conn = await anyio.to_thread.run_sync(cm.__enter__, limiter=limiter)
+    self._observe_pool_wait(db_name, time.perf_counter() - queued)
+    cur = None
     try:
+      if guard.explain:
+        await anyio.to_thread.run_sync(lambda: self._explain_connector(conn, db_name, sql, params), limiter=limiter)
       cur = conn.cursor(dictionary=True)
-      cur.execute(sql, params or ())
-      rows = cur.fetchall()
-      return rows
+      await anyio.to_thread.run_sync(lambda: cur.execute(hinted, params or ()), limiter=limiter)
+      while True:
+        batch = await anyio.to_thread.run_sync(cur.fetchmany, batch_size, limiter=limiter)
+        if not batch:
+          break
+        yield batch
+    except mysql.connector.Error as e:
+      if _is_interrupted(e):
+        raise self._timeout_error(guard) from e
+      raise
     finally:
+      def release() -> None:
+        try:
+          if cur is not None:
+            cur.close()
+        finally:
+          cm.__exit__(None, None, None)
+      await anyio.to_thread.run_sync(release, limiter=limiter)
+
+  def _observe_pool_wait(self, db_name: str, seconds: float) -> None:
+    if self.metrics is not None:
+      self.metrics.histogram("db_pool_wait_seconds", "Time spent waiting for a DB connection slot.", ("db",)).observe(seconds, db=db_name)
+
+  def pool_usage(self) -> dict[str, dict[str, int]]:
+    """Per-DB connections in use and callers waiting (thread limiter or aiomysql pool)."""
+    usage: dict[str, dict[str, int]] = {}
+    for name, limiter in self._limiters.items():
+      stats = limiter.statistics()
+      usage[name] = {"in_use": stats.borrowed_tokens, "waiting": stats.tasks_waiting, "size": int(limiter.total_tokens)}
+    for name, pool in self.apools.items():
+      usage[name] = {"in_use": pool.size - pool.freesize, "size": pool.maxsize}
+    return usage
+
+  def _limiter(self, db_name: str) -> anyio.CapacityLimiter:
+    limiter = self._limiters.get(db_name)
+    if limiter is None:
+      cfg = self.get_config(db_name)
+      size = min(cfg.pool.max_size, CONNECTOR_POOL_MAXSIZE) if cfg else 5
+      limiter = self._limiters[db_name] = anyio.CapacityLimiter(size)
+    return limiter
+
+  def _guard(self, db_name: str) -> GuardConfig:
+    cfg = self.get_config(db_name)
+    return cfg.guard if cfg else GuardConfig()
+
+  def _admit(self, db_name: str, plan: list[dict[str, Any]]) -> None:
+    """Raise QueryRejected when the EXPLAIN estimate exceeds the DB's limit.
+    The message is meant for the LLM retry prompt."""
+    guard = self._guard(db_name)
+    self.guard_stats["explained"] += 1
+    estimate = estimate_scan_rows(plan)
+    if estimate <= guard.max_scan_rows:
+      return
+    self.guard_stats["rejected"] += 1
+    scans = sorted({str(r.get("table")) for r in plan if r.get("type") == "ALL"})
+    detail = f"; full table scans on {', '.join(scans)}" if scans else ""
+    raise QueryRejected(
+      f"Query rejected before execution: EXPLAIN estimates ~{estimate:,} rows examined "
+      f"(limit {guard.max_scan_rows:,}){detail}. Add selective WHERE conditions on indexed "
+      f"columns (e.g. a date range) and avoid unnecessary joins."
+    )
+
+  def _timeout_error(self, guard: GuardConfig) -> QueryTimeout:
+    self.guard_stats["timeouts"] += 1
+    return QueryTimeout(
+      f"Query cancelled after {guard.timeout:g}s (execution time limit). Rewrite it to examine "
+      f"fewer rows: add selective WHERE conditions on indexed columns and avoid unnecessary joins."
+    )
+
+  def _explain_connector(self, conn: Any, db_name: str, sql: str, params: tuple[Any, ...] | None) -> None:
+    cur = conn.cursor(dictionary=True)
+    try:
+      cur.execute(f"EXPLAIN {sql}", params or ())
+      plan = cur.fetchall()
+    finally:
+      cur.close()
+    self._admit(db_name, plan)
+
+  async def _explain_aiomysql(self, conn: Any, db_name: str, sql: str, params: tuple[Any, ...] | None) -> None:
+    import aiomysql
+
+    async with conn.cursor(aiomysql.DictCursor) as cur:
+      await cur.execute(f"EXPLAIN {sql}", params or None)
+      plan = list(await cur.fetchall())
+    self._admit(db_name, plan)
+
+  def _abort_aiomysql(self, db_name: str, conn: Any, thread_id: int) -> None:
+    """Cancelled mid-query: stop the statement on the server and drop the
+    connection, whose protocol state is unknown (the pool discards closed ones)."""
+    if conn.closed:
+      return
+    asyncio.get_running_loop().create_task(self._akill_query(db_name, thread_id, 0))
+    conn.close()
+
+  def _kill_query(self, db_name: str, connection_id: int) -> None:
+    """Watchdog: KILL QUERY from a separate, non-pooled connection (the pool
+    may be exhausted by the very query being killed)."""
+    cfg = self.get_config(db_name)
+    try:
+      conn = mysql.connector.connect(host=cfg.host, port=cfg.port, user=cfg.user, password=cfg.password, connection_timeout=5)
       try:
+        cur = conn.cursor()
+        cur.execute(f"KILL QUERY {int(connection_id)}")
         cur.close()
-      except Exception:
-        pass
-      conn.close()
+      finally:
+        conn.close()
+      self.guard_stats["killed"] += 1
+    except Exception:
+      pass  # 이미 끝난 쿼리 등
 
-  def get_schema_text(self, db_name: str) -> str:
-    conn = self.get_connection(db_name)
+  async def _akill_query(self, db_name: str, thread_id: int, delay: float) -> None:
+    import aiomysql
+
+    await asyncio.sleep(delay)
+    cfg = self.get_config(db_name)
     try:
-      cur = conn.cursor()
-      cur.execute(
-        """
-        SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, IS_NULLABLE, COLUMN_KEY
-        FROM INFORMATION_SCHEMA.COLUMNS
-        WHERE TABLE_SCHEMA = DATABASE()
-        ORDER BY TABLE_NAME, ORDINAL_POSITION
-        """
-      )
-      columns = cur.fetchall()
-
-      cur.execute(
-        """
-        SELECT
-          kcu.TABLE_NAME,
-          kcu.COLUMN_NAME,
-          kcu.REFERENCED_TABLE_NAME,
-          kcu.REFERENCED_COLUMN_NAME
-        FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
-        WHERE kcu.TABLE_SCHEMA = DATABASE()
-          AND kcu.REFERENCED_TABLE_NAME IS NOT NULL
-        ORDER BY kcu.TABLE_NAME, kcu.COLUMN_NAME
-        """
-      )
-      fks = cur.fetchall()
+      conn = await aiomysql.connect(host=cfg.host, port=cfg.port, user=cfg.user, password=cfg.password, connect_timeout=5)
+      try:
+        async with conn.cursor() as cur:
+          await cur.execute(f"KILL QUERY {int(thread_id)}")
+      finally:
+        conn.close()
+      self.guard_stats["killed"] += 1
+    except Exception:
+      pass
+
+  def _watch(self, db_name: str, connection_id: int, wake: threading.Event, done: threading.Event, deadline: float | None) -> None:
+    """Watchdog thread: KILL QUERY at the deadline or when woken by a cancel,
+    unless the query finished first."""
+    wake.wait(deadline)
+    if not done.is_set():
+      self._kill_query(db_name, connection_id)
+
+  def _query_connector(self, db_name: str, sql: str, params: tuple[Any, ...] | None, max_rows: int | None = None, columnar: bool = False, cancel: threading.Event | None = None) -> tuple[list[dict[str, Any]] | ColumnarRows, bool]:
+    guard = self._guard(db_name)
+    with self.connection(db_name) as conn:
+      if guard.explain:
+        self._explain_connector(conn, db_name, sql, params)
+      sql = with_max_execution_time(sql, int(guard.timeout * 1000))
+      cur = conn.cursor() if columnar else conn.cursor(dictionary=True)
+      watchdog = None
+      wake, done = cancel or threading.Event(), threading.Event()
+      if guard.timeout > 0 or cancel is not None:
+        deadline = guard.timeout + KILL_GRACE_SECONDS if guard.timeout > 0 else None
+        watchdog = threading.Thread(target=self._watch, args=(db_name, conn.connection_id, wake, done, deadline), daemon=True)
+        watchdog.start()
+      try:
+        if max_rows is None:
+          cur.execute(sql, params or ())
+          rows, truncated = cur.fetchall(), False
+        else:
+          # 세션 변수는 풀 반환 시 reset_session으로 초기화됨
+          cur.execute(f"SET SESSION sql_select_limit = {int(max_rows) + 1}")
+          cur.execute(sql, params or ())
+          rows = cur.fetchmany(max_rows + 1)
+          rows, truncated = rows[:max_rows], len(rows) > max_rows
+        if columnar:
+          return ColumnarRows(list(cur.column_names), rows), truncated
+        return rows, truncated
+      except mysql.connector.Error as e:
+        if _is_interrupted(e) and not (cancel is not None and cancel.is_set()):
+          raise self._timeout_error(guard) from e
+        raise
+      finally:
+        if watchdog is not None:
+          # KILL이 진행 중이면 끝날 때까지 기다렸다가 연결을 반환 (다음 쿼리가 죽지 않도록)
+          done.set()
+          wake.set()
+          watchdog.join()
+        try:
+          cur.close()
+        except Exception:
+          pass
+
+  async def _acquire_aiomysql(self, db_name: str) -> Any:
+    pool = self.apools[db_name]
+    timeout = self.get_config(db_name).pool.acquire_timeout
+    queued = time.perf_counter()
+    acquire = asyncio.ensure_future(pool.acquire())
+    try:
+      async with asyncio.timeout(timeout):
+        return await asyncio.shield(acquire)
+    except BaseException as e:
+      # 타임아웃/취소가 연결을 얻은 직후에 도착하면 그 연결은 호출자에게 가지 않으므로 풀에 돌려줌
+      acquire.add_done_callback(lambda t: t.cancelled() or t.exception() is not None or pool.release(t.result()))
+      acquire.cancel()
+      if isinstance(e, TimeoutError):
+        raise TimeoutError(f"DB {db_name}: no free connection within {timeout}s") from None
+      raise
     finally:
+      self._observe_pool_wait(db_name, time.perf_counter() - queued)
+
+  async def _query_aiomysql(self, db_name: str, sql: str, params: tuple[Any, ...] | None, max_rows: int | None = None, columnar: bool = False) -> tuple[list[dict[str, Any]] | ColumnarRows, bool]:
+    import aiomysql
+
+    def shape(cur: Any, rows: list[Any]) -> list[dict[str, Any]] | ColumnarRows:
+      if columnar:
+        return ColumnarRows([d[0] for d in cur.description or ()], rows)
+      return rows
+
+    guard = self._guard(db_name)
+    pool = self.apools[db_name]
+    conn = await self._acquire_aiomysql(db_name)
+    thread_id = conn.thread_id()
+    watchdog: asyncio.Task[None] | None = None
+    try:
+      if guard.explain:
+        await self._explain_aiomysql(conn, db_name, sql, params)
+      sql = with_max_execution_time(sql, int(guard.timeout * 1000))
+      if guard.timeout > 0:
+        watchdog = asyncio.create_task(self._akill_query(db_name, thread_id, guard.timeout + KILL_GRACE_SECONDS))
+      if max_rows is None:
+        cur = await conn.cursor(aiomysql.Cursor if columnar else aiomysql.DictCursor)
+        try:
+          # args=None: aiomysql이 SQL의 '%'(DATE_FORMAT 등)를 포맷하지 않도록
+          await cur.execute(sql, params or None)
+          return shape(cur, list(await cur.fetchall())), False
+        except asyncio.CancelledError:
+          self._abort_aiomysql(db_name, conn, thread_id)
+          raise
+        finally:
+          if not conn.closed:
+            await cur.close()
       try:
-        cur.close()
-      except Exception:
-        pass
-      conn.close()
-
-    # format
-    lines: list[str] = []
-    lines.append(f"# DB: {db_name}")
-    lines.append("## Tables and Columns")
-    last_table = None
+        cur = await conn.cursor(aiomysql.SSCursor if columnar else aiomysql.SSDictCursor)
+        try:
+          await cur.execute(f"SET SESSION sql_select_limit = {int(max_rows) + 1}")
+          await cur.execute(sql, params or None)
+          rows = list(await cur.fetchmany(max_rows + 1))
+          result = shape(cur, rows[:max_rows])
+        except asyncio.CancelledError:
+          self._abort_aiomysql(db_name, conn, thread_id)
+          raise
+        finally:
+          # SSCursor.close()가 남은 행을 읽어 버려야 다음 명령을 보낼 수 있음
+          if not conn.closed:
+            await cur.close()
+      finally:
+        # aiomysql 연결은 세션 초기화 없이 풀로 돌아가므로 직접 되돌림
+        if not conn.closed:
+          try:
+            async with conn.cursor() as reset:
+              await reset.execute("SET SESSION sql_select_limit = DEFAULT")
+          except Exception:
+            conn.close()
+      return result, len(rows) > max_rows
+    except asyncio.CancelledError:
+      self._abort_aiomysql(db_name, conn, thread_id)
+      raise
+    except Exception as e:
+      if _is_interrupted(e):
+        raise self._timeout_error(guard) from e
+      raise
+    finally:
+      if watchdog is not None:
+        watchdog.cancel()
+        try:
+          await watchdog
+        except asyncio.CancelledError:
+          pass
+      pool.release(conn)
+
+  def table_fingerprints(self, db_name: str) -> dict[str, str]:
+    """Cheap per-table checksum of the metadata `introspect_tables` reads.
+
+    One grouped query over INFORMATION_SCHEMA.TABLES/COLUMNS (CREATE_TIME,
+    column count, CRC32 sum over the column rows) and one over the FK rows of
+    KEY_COLUMN_USAGE. UPDATE_TIME is left out: it moves on every data write.
+    """
+    with self.connection(db_name) as conn:
+      cur = conn.cursor()
+      try:
+        cur.execute(
+          """
+          SELECT t.TABLE_NAME, t.CREATE_TIME, COUNT(c.COLUMN_NAME),
+            COALESCE(SUM(CRC32(CONCAT_WS('|', c.COLUMN_NAME, c.ORDINAL_POSITION, c.DATA_TYPE, c.IS_NULLABLE, c.COLUMN_KEY))), 0)
+          FROM INFORMATION_SCHEMA.TABLES t
+          LEFT JOIN INFORMATION_SCHEMA.COLUMNS c
+            ON c.TABLE_SCHEMA = t.TABLE_SCHEMA AND c.TABLE_NAME = t.TABLE_NAME
+          WHERE t.TABLE_SCHEMA = DATABASE()
+          GROUP BY t.TABLE_NAME, t.CREATE_TIME
+          """
+        )
+        tables = cur.fetchall()
+        cur.execute(
+          """
+          SELECT TABLE_NAME, COALESCE(SUM(CRC32(CONCAT_WS('|', COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME))), 0)
+          FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+          WHERE TABLE_SCHEMA = DATABASE()
+            AND REFERENCED_TABLE_NAME IS NOT NULL
+          GROUP BY TABLE_NAME
+          """
+        )
+        fks = dict(cur.fetchall())
+      finally:
+        try:
+          cur.close()
+        except Exception:
+          pass
+    return {tbl: f"{created}:{n}:{crc}:{fks.get(tbl, 0)}" for tbl, created, n, crc in tables}
+
+  def introspect_tables(self, db_name: str, tables: list[str] | None = None) -> dict[str, dict[str, list[list[Any]]]]:
+    """Columns and FKs of `tables` (all when None): table -> {"columns": [[name,
+    type, nullable, key]], "fks": [[column, ref_table, ref_column]]}."""
+    column_filter, fk_filter, params = "", "", ()
+    if tables is not None:
+      if not tables:
+        return {}
+      placeholders = ", ".join(["%s"] * len(tables))
+      column_filter = f" AND TABLE_NAME IN ({placeholders})"
+      fk_filter = f" AND kcu.TABLE_NAME IN ({placeholders})"
+      params = tuple(tables)
+    with self.connection(db_name) as conn:
+      cur = conn.cursor()
+      try:
+        cur.execute(
+          f"""
+          SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, IS_NULLABLE, COLUMN_KEY
+          FROM INFORMATION_SCHEMA.COLUMNS
+          WHERE TABLE_SCHEMA = DATABASE(){column_filter}
+          ORDER BY TABLE_NAME, ORDINAL_POSITION
+          """,
+          params,
+        )
+        columns = cur.fetchall()
+
+        cur.execute(
+          f"""
+          SELECT
+            kcu.TABLE_NAME,
+            kcu.COLUMN_NAME,
+            kcu.REFERENCED_TABLE_NAME,
+            kcu.REFERENCED_COLUMN_NAME
+          FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
+          WHERE kcu.TABLE_SCHEMA = DATABASE()
+            AND kcu.REFERENCED_TABLE_NAME IS NOT NULL{fk_filter}
+          ORDER BY kcu.TABLE_NAME, kcu.COLUMN_NAME
+          """,
+          params,
+        )
+        fks = cur.fetchall()
+      finally:
+        try:
+          cur.close()
+        except Exception:
+          pass
+
+    result: dict[str, dict[str, list[list[Any]]]] = {}
     for tbl, col, dtype, is_null, col_key in columns:
-      if tbl != last_table:
-        lines.append("")
-        lines.append(f"- Table: {tbl}")
-        last_table = tbl
+      result.setdefault(tbl, {"columns": [], "fks": []})["columns"].append([col, dtype, is_null, col_key])
+    for tbl, col, rt, rc in fks:
+      result.setdefault(tbl, {"columns": [], "fks": []})["fks"].append([col, rt, rc])
+    return result
+
+  def _fetch_internal(self, db_name: str, sql: str) -> list[tuple[Any, ...]]:
+    """Server-side query (profiling): statement timeout, no EXPLAIN admission, no result cache."""
+    with self.connection(db_name) as conn:
+      cur = conn.cursor()
+      try:
+        cur.execute(with_max_execution_time(sql, int(self._guard(db_name).timeout * 1000)))
+        return cur.fetchall()
+      finally:
+        try:
+          cur.close()
+        except Exception:
+          pass
+
+  def profile_table(self, db_name: str, table: str, categorical: list[str], ranged: list[str], sample_rows: int, max_values: int) -> dict[str, dict[str, Any]]:
+    """Null rate, distinct count and min/max of `categorical` + `ranged`
+    columns over the first `sample_rows` rows of `table`, plus the most
+    frequent values of categorical columns with at most `max_values`
+    distinct values. The LIMIT sample bounds the scan, so EXPLAIN admission
+    (which estimates the whole table) is not applied."""
+    cols = categorical + ranged
+    if not cols:
+      return {}
+    q = _quote_ident
+    sample = f"(SELECT {', '.join(q(c) for c in cols)} FROM {q(table)} LIMIT {int(sample_rows)}) s"
+    aggregates = ", ".join(f"COUNT({q(c)}), COUNT(DISTINCT {q(c)}), MIN({q(c)}), MAX({q(c)})" for c in cols)
+    row = self._fetch_internal(db_name, f"SELECT COUNT(*), {aggregates} FROM {sample}")[0]
+    total = row[0] or 0
+    profiles: dict[str, dict[str, Any]] = {}
+    for i, col in enumerate(cols):
+      non_null, distinct, lo, hi = row[1 + i * 4:5 + i * 4]
+      profiles[col] = {
+        "null_rate": round(1 - non_null / total, 3) if total else None,
+        "distinct": distinct,
+        "min": lo,
+        "max": hi,
+      }
+      if col in categorical and 0 < distinct <= max_values:
+        values = self._fetch_internal(
+          db_name,
+          f"SELECT {q(col)}, COUNT(*) AS n FROM (SELECT {q(col)} FROM {q(table)} LIMIT {int(sample_rows)}) s "
+          f"WHERE {q(col)} IS NOT NULL GROUP BY {q(col)} ORDER BY n DESC LIMIT {int(max_values)}",
+        )
+        profiles[col]["values"] = [v for v, _ in values]
+    return profiles
+
+  def get_schema_text(self, db_name: str) -> str:
+    return render_schema_text(db_name, self.introspect_tables(db_name))
+
+
+def render_schema_text(db_name: str, tables: dict[str, dict[str, list[list[Any]]]]) -> str:
+  """Schema prompt (`{db}__db_structure.txt`) from `introspect_tables` output."""
+  lines: list[str] = []
+  lines.append(f"# DB: {db_name}")
+  lines.append("## Tables and Columns")
+  for tbl in sorted(tables):
+    if not tables[tbl]["columns"]:
+      continue
+    lines.append("")
+    lines.append(f"- Table: {tbl}")
+    for col, dtype, is_null, col_key in tables[tbl]["columns"]:
       key = f" [{col_key}]" if col_key else ""
       lines.append(f"  - {col}: {dtype} NULLABLE={is_null}{key}")
 
-    lines.append("")
-    lines.append("## Foreign Keys")
-    for tbl, col, rt, rc in fks:
+  lines.append("")
+  lines.append("## Foreign Keys")
+  for tbl in sorted(tables):
+    for col, rt, rc in sorted(tables[tbl]["fks"]):
       lines.append(f"- {tbl}.{col} -> {rt}.{rc}")
 
-    return "\n".join(lines)
-
+  return "\n".join(lines)
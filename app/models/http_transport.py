@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import httpx
+from ..config import settings
+from .llm_endpoints import EndpointPool, parse_endpoints
+
+
+def _http2_available() -> bool:
+  try:
+    import h2  # noqa: F401
+  except ImportError:
+    return False
+  return True
+
+
+class LLMTransport:
+  """App-lifetime, connection-pooled httpx clients (one per LLM provider).
+
+  Created once in `app.main`, closed on shutdown and shared by every
+  `LLMClient`, so pipeline stages reuse keep-alive connections instead of
+  paying a TCP/TLS handshake per call. Also owns each provider's endpoint
+  pool (`{PROVIDER}_ENDPOINTS`), so load and circuit state are shared too.
+  """
+
+  def __init__(self) -> None:
+    self._clients: dict[str, httpx.AsyncClient] = {}
+    self._pools: dict[str, EndpointPool] = {}
+    self._stats: dict[str, dict[str, Any]] = {}
+    self.http2 = settings.llm_http2 and _http2_available()
+
+  def _limits(self, provider: str) -> httpx.Limits:
+    max_conn = getattr(settings, f"{provider}_max_connections", settings.llm_max_connections)
+    max_keepalive = getattr(settings, f"{provider}_max_keepalive_connections", settings.llm_max_keepalive_connections)
+    return httpx.Limits(
+      max_connections=max_conn,
+      max_keepalive_connections=max_keepalive,
+      keepalive_expiry=settings.llm_keepalive_expiry,
+    )
+
+  def client(self, provider: str) -> httpx.AsyncClient:
+    client = self._clients.get(provider)
+    if client is None or client.is_closed:
+      client = httpx.AsyncClient(
+        timeout=settings.llm_timeout,
+        limits=self._limits(provider),
+        http2=self.http2,
+      )
+      self._clients[provider] = client
+      self._stats.setdefault(provider, {
+        "requests": 0,
+        "in_flight": 0,
+        "connections_opened": 0,
+        "tls_handshakes": 0,
+        "errors": 0,
+        "total_seconds": 0.0,
+      })
+    return client
+
+  def endpoints(self, provider: str) -> EndpointPool:
+    pool = self._pools.get(provider)
+    if pool is None:
+      spec = getattr(settings, f"{provider}_endpoints", "")
+      pool = self._pools[provider] = EndpointPool(provider, parse_endpoints(spec, getattr(settings, f"{provider}_base_url")))
+    return pool
+
+  async def check_health(self) -> list[str]:
+    """Probe circuit-open endpoints (vLLM `/health`, Ollama `/api/tags`, OpenAI `/models`)
+    and put the ones that answer back in rotation. Returns their URLs."""
+    paths = {"vllm": "/health", "ollama": "/api/tags", "openai": "/models"}
+    recovered: list[str] = []
+    for provider, pool in self._pools.items():
+      headers = {"Authorization": f"Bearer {settings.openai_api_key}"} if provider == "openai" else {}
+      for endpoint in pool.unhealthy():
+        try:
+          resp = await self.client(provider).get(f"{endpoint.url}{paths.get(provider, '')}", headers=headers, timeout=5.0)
+        except httpx.HTTPError:
+          continue
+        if resp.status_code < 400 and endpoint.state != "closed":
+          pool.mark_healthy(endpoint)
+          recovered.append(endpoint.url)
+    return recovered
+
+  def _tracer(self, provider: str):
+    stats = self._stats[provider]
+
+    async def trace(event: str, info: dict[str, Any]) -> None:
+      # httpcore trace hook: only fires when a new connection is opened
+      if event == "connection.connect_tcp.complete":
+        stats["connections_opened"] += 1
+      elif event == "connection.start_tls.complete":
+        stats["tls_handshakes"] += 1
+
+    return trace
+
+  async def post(self, provider: str, url: str, **kwargs: Any) -> httpx.Response:
+    client = self.client(provider)
+    stats = self._stats[provider]
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    started = time.perf_counter()
+    try:
+      return await client.post(url, extensions={"trace": self._tracer(provider)}, **kwargs)
+    except Exception:
+      stats["errors"] += 1
+      raise
+    finally:
+      stats["in_flight"] -= 1
+      stats["total_seconds"] += time.perf_counter() - started
+
+  @asynccontextmanager
+  async def stream(self, provider: str, url: str, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+    client = self.client(provider)
+    stats = self._stats[provider]
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    started = time.perf_counter()
+    try:
+      async with client.stream("POST", url, extensions={"trace": self._tracer(provider)}, **kwargs) as resp:
+        yield resp
+    except Exception:
+      stats["errors"] += 1
+      raise
+    finally:
+      stats["in_flight"] -= 1
+      stats["total_seconds"] += time.perf_counter() - started
+
+  def pool_stats(self) -> dict[str, Any]:
+    out: dict[str, Any] = {"http2": self.http2, "providers": {}}
+    for provider, stats in self._stats.items():
+      requests = stats["requests"]
+      opened = stats["connections_opened"]
+      entry = dict(stats)
+      entry["total_seconds"] = round(stats["total_seconds"], 3)
+      entry["reuse_rate"] = round(1 - opened / requests, 4) if requests else None
+      # httpcore pool snapshot (private attribute, best-effort only)
+      client = self._clients.get(provider)
+      pool = getattr(getattr(client, "_transport", None), "_pool", None)
+      conns = getattr(pool, "connections", None)
+      if conns is not None:
+        entry["open_connections"] = len(conns)
+        entry["idle_connections"] = sum(1 for c in conns if c.is_idle())
+      if provider in self._pools:
+        entry["endpoints"] = self._pools[provider].stats()
+      out["providers"][provider] = entry
+    return out
+
+  async def aclose(self) -> None:
+    for client in self._clients.values():
+      await client.aclose()
+    self._clients = {}
@@ -1,32 +1,302 @@
 from __future__ import annotations
 
-import httpx
-from typing import Any
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Iterator, TypeVar
 from ..config import settings
+from .http_transport import LLMTransport
+from .llm_endpoints import Endpoint, LLMUnavailableError, is_endpoint_fault
+
+if TYPE_CHECKING:
+  from ..services.metrics import MetricsRegistry
+
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant."
+PROVIDERS = ("vllm", "ollama", "openai")
+
+T = TypeVar("T")
+
+# 요청 단위 토큰 합계: 라우트가 track_usage()로 시작하면 같은 컨텍스트(와 그 하위 task)의 LLM 호출이 누적
+_request_usage: ContextVar[dict[str, int] | None] = ContextVar("llm_request_usage", default=None)
+
+
+def track_usage(usage: dict[str, int] | None = None) -> dict[str, int]:
+  """Start (or continue with `usage`) per-request token accounting in the current context."""
+  if usage is None:
+    usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+  _request_usage.set(usage)
+  return usage
+
+
+def current_usage() -> dict[str, int] | None:
+  return _request_usage.get()
 
 
 class LLMClient:
-  """Minimal LLM client supporting vllm, ollama and openai via HTTP."""
+  """Minimal LLM client supporting vllm, ollama and openai via HTTP.
+
+  Each call goes to the provider endpoint with the fewest in-flight requests
+  per weight (see `EndpointPool`). A call that fails on an endpoint fault
+  (connection error, timeout, 5xx/429) moves on to the next endpoint, and
+  then to LLM_FALLBACK_PROVIDER when the call's `stage` is listed in
+  LLM_FALLBACK_STAGES. Streams fail over only before the first chunk.
+  """
 
-  def __init__(self) -> None:
+  def __init__(self, transport: LLMTransport | None = None, metrics: MetricsRegistry | None = None) -> None:
     self.provider = settings.llm_provider.lower()
+    self.transport = transport or LLMTransport()
+    self.metrics = metrics
+
+  def _providers(self, stage: str | None) -> list[str]:
+    fallback = settings.llm_fallback_provider.lower()
+    stages = {s.strip() for s in settings.llm_fallback_stages.split(",") if s.strip()}
+    if fallback and fallback != self.provider and (stage is None or not stages or stage in stages):
+      return [self.provider, fallback]
+    return [self.provider]
+
+  def _candidates(self, stage: str | None) -> Iterator[tuple[str, Endpoint]]:
+    """Endpoints to try in order; picked lazily so each choice sees current load."""
+    for provider in self._providers(stage):
+      if provider not in PROVIDERS:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+      pool = self.transport.endpoints(provider)
+      tried: set[str] = set()
+      while (endpoint := pool.pick(tried)) is not None:
+        tried.add(endpoint.url)
+        if provider != self.provider and self.metrics is not None:
+          self.metrics.counter("llm_fallbacks_total", "LLM calls sent to the fallback provider.", ("provider", "stage")).inc(provider=provider, stage=stage or "")
+        yield provider, endpoint
+
+  @asynccontextmanager
+  async def _track(self, endpoint: Endpoint) -> AsyncIterator[None]:
+    """Count the call against `endpoint` and feed its outcome to the circuit breaker."""
+    pool = self.transport.endpoints(endpoint.provider)
+    pool.begin(endpoint)
+    started = time.perf_counter()
+    error: BaseException | None = None
+    try:
+      yield
+    except BaseException as e:
+      error = e
+      raise
+    finally:
+      elapsed = time.perf_counter() - started
+      pool.record(endpoint, elapsed, error)
+      if self.metrics is not None and error is None:
+        self.metrics.histogram("llm_endpoint_seconds", "LLM call duration per endpoint.", ("provider", "endpoint")).observe(
+          elapsed, provider=endpoint.provider, endpoint=endpoint.url,
+        )
+
+  async def _call(self, stage: str | None, fn: Callable[[str, str], Awaitable[T]]) -> T:
+    """`fn(provider, base_url)` on the first endpoint that does not fail with an endpoint fault."""
+    last: BaseException | None = None
+    for provider, endpoint in self._candidates(stage):
+      try:
+        async with self._track(endpoint):
+          return await fn(provider, endpoint.url)
+      except Exception as e:
+        if not is_endpoint_fault(e):
+          raise
+        last = e
+    raise LLMUnavailableError(f"no healthy LLM endpoint for {', '.join(self._providers(stage))}: {last}") from last
+
+  def _record_usage(self, usage: dict[str, Any] | None, provider: str) -> None:
+    """Count prompt/completion/cached tokens from an OpenAI-style `usage`."""
+    if not usage:
+      return
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    request = _request_usage.get()
+    if request is not None:
+      request["calls"] += 1
+      request["prompt_tokens"] += usage.get("prompt_tokens") or 0
+      request["completion_tokens"] += usage.get("completion_tokens") or 0
+      request["cached_tokens"] += cached or 0
+    if self.metrics is None:
+      return
+    tokens = self.metrics.counter("llm_tokens_total", "LLM tokens reported in the provider usage field.", ("provider", "kind"))
+    tokens.inc(usage.get("prompt_tokens") or 0, provider=provider, kind="prompt")
+    tokens.inc(usage.get("completion_tokens") or 0, provider=provider, kind="completion")
+    if cached:
+      tokens.inc(cached, provider=provider, kind="cached_prompt")
+
+  @staticmethod
+  def _ollama_usage(data: dict[str, Any]) -> dict[str, Any]:
+    return {"prompt_tokens": data.get("prompt_eval_count"), "completion_tokens": data.get("eval_count")}
+
+  async def generate(self, prompt: str, temperature: float = 0.2, max_tokens: int | None = None, system: str | None = None, stage: str | None = None) -> str:
+    """`system` should hold the stable, request-independent part of the prompt
+    so providers with prefix caching (vLLM, OpenAI) can reuse it. `stage`
+    (db_selection, sql, answer) decides whether the fallback provider may be used."""
+    system = system or DEFAULT_SYSTEM_PROMPT
+    return await self._call(stage, lambda provider, base_url: self._generate_one(provider, base_url, prompt, temperature, max_tokens, system))
+
+  async def _generate_one(self, provider: str, base_url: str, prompt: str, temperature: float, max_tokens: int | None, system: str) -> str:
+    if provider == "vllm":
+      return await self._generate_vllm(base_url, prompt, temperature, max_tokens, system)
+    if provider == "ollama":
+      return await self._generate_ollama(base_url, prompt, temperature, system)
+    return await self._generate_openai(base_url, prompt, temperature, max_tokens, system)
+
+  async def generate_many(self, prompt: str, n: int, temperature: float = 0.7, max_tokens: int | None = None, system: str | None = None, stage: str | None = None) -> list[str]:
+    """Up to `n` completions of the same prompt, the first one greedy. OpenAI-
+    compatible providers get a temperature-0 request next to one request with
+    `n - 1` samples at `temperature` (same prefix, so vLLM shares the prefill);
+    ollama gets `n` parallel requests with temperatures spread from 0 to
+    `temperature`. Empty completions are dropped, so the list may be shorter
+    than `n` or empty."""
+    system = system or DEFAULT_SYSTEM_PROMPT
+
+    async def one(provider: str, base_url: str) -> list[str]:
+      if provider == "ollama":
+        temps = [temperature * i / (n - 1) for i in range(n)] if n > 1 else [0.0]
+        texts = list(await asyncio.gather(*(self._generate_ollama(base_url, prompt, t, system) for t in temps)))
+      else:
+        requests = [self._chat_choices(provider, base_url, prompt, 0.0, 1, max_tokens, system)]
+        if n > 1:
+          requests.append(self._chat_choices(provider, base_url, prompt, temperature, n - 1, max_tokens, system))
+        texts = [t for batch in await asyncio.gather(*requests) for t in batch]
+      # content가 None(필터링, 도구 호출 등)이거나 빈 응답은 후보에서 제외
+      return [t.strip() for t in texts if t and t.strip()]
+
+    return await self._call(stage, one)
+
+  async def _chat_choices(self, provider: str, base_url: str, prompt: str, temperature: float, n: int, max_tokens: int | None, system: str) -> list[str | None]:
+    """Raw message contents of one OpenAI-compatible request with `n` choices."""
+    if provider == "vllm":
+      url = f"{base_url}/v1/chat/completions"
+      headers: dict[str, str] = {}
+      payload = self._chat_payload(settings.vllm_model, system, prompt, temperature, max_tokens)
+    else:
+      url = f"{base_url}/chat/completions"
+      headers = {"Authorization": f"Bearer {settings.openai_api_key}"}
+      payload = self._chat_payload(settings.openai_model, system, prompt, temperature, max_tokens)
+    payload["stream"] = False
+    payload["n"] = n
+    resp = await self.transport.post(provider, url, headers=headers, json=payload)
+    resp.raise_for_status()
+    data = resp.json()
+    self._record_usage(data.get("usage"), provider)
+    return [(c.get("message") or {}).get("content") for c in data.get("choices") or []]
+
+  async def warm_up(self, system: str) -> None:
+    """Send a 1-token request with `system` to every available endpoint of the
+    provider (each replica has its own prefix cache)."""
+    pool = self.transport.endpoints(self.provider)
+    tried: set[str] = set()
+    calls = []
+    while (endpoint := pool.pick(tried)) is not None:
+      tried.add(endpoint.url)
+
+      async def ping(endpoint: Endpoint = endpoint) -> str:
+        async with self._track(endpoint):
+          return await self._generate_one(self.provider, endpoint.url, "ping", 0.0, 1, system)
+
+      calls.append(ping())
+    await asyncio.gather(*calls)
 
-  async def generate(self, prompt: str, temperature: float = 0.2, max_tokens: int | None = None) -> str:
-    if self.provider == "vllm":
-      return await self._generate_vllm(prompt, temperature, max_tokens)
-    if self.provider == "ollama":
-      return await self._generate_ollama(prompt, temperature)
-    if self.provider == "openai":
-      return await self._generate_openai(prompt, temperature, max_tokens)
-    raise ValueError(f"Unsupported LLM provider: {self.provider}")
+  async def stream(self, prompt: str, temperature: float = 0.2, max_tokens: int | None = None, system: str | None = None, stage: str | None = None) -> AsyncIterator[str]:
+    """Yield answer text chunks as the provider streams them."""
+    system = system or DEFAULT_SYSTEM_PROMPT
+    last: BaseException | None = None
+    for provider, endpoint in self._candidates(stage):
+      started = False
+      try:
+        async with self._track(endpoint):
+          async for chunk in self._stream_one(provider, endpoint.url, prompt, temperature, max_tokens, system):
+            started = True
+            yield chunk
+        return
+      except Exception as e:
+        # 이미 내보낸 청크가 있으면 다른 endpoint로 이어 갈 수 없음
+        if started or not is_endpoint_fault(e):
+          raise
+        last = e
+    raise LLMUnavailableError(f"no healthy LLM endpoint for {', '.join(self._providers(stage))}: {last}") from last
 
-  async def _generate_vllm(self, prompt: str, temperature: float, max_tokens: int | None = None) -> str:
+  def _stream_one(self, provider: str, base_url: str, prompt: str, temperature: float, max_tokens: int | None, system: str) -> AsyncIterator[str]:
+    if provider == "vllm":
+      url = f"{base_url}/v1/chat/completions"
+      payload = self._chat_payload(settings.vllm_model, system, prompt, temperature, max_tokens)
+      payload["stream_options"] = {"include_usage": True}
+      return self._stream_chat_completions("vllm", url, {}, payload)
+    if provider == "openai":
+      url = f"{base_url}/chat/completions"
+      headers = {"Authorization": f"Bearer {settings.openai_api_key}"}
+      payload = self._chat_payload(settings.openai_model, system, prompt, temperature, max_tokens)
+      payload["stream_options"] = {"include_usage": True}
+      return self._stream_chat_completions("openai", url, headers, payload)
+    return self._stream_ollama(base_url, prompt, temperature, system)
+
+  @staticmethod
+  def _chat_payload(model: str, system: str, prompt: str, temperature: float, max_tokens: int | None) -> dict[str, Any]:
+    payload: dict[str, Any] = {
+      "model": model,
+      "messages": [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+      ],
+      "temperature": temperature,
+      "stream": True,
+    }
+    if max_tokens is not None:
+      payload["max_tokens"] = max_tokens
+    return payload
+
+  async def _stream_chat_completions(self, provider: str, url: str, headers: dict[str, str], payload: dict[str, Any]) -> AsyncIterator[str]:
+    """OpenAI-compatible SSE stream (vllm, openai)."""
+    async with self.transport.stream(provider, url, headers=headers, json=payload) as resp:
+      resp.raise_for_status()
+      async for line in resp.aiter_lines():
+        if not line.startswith("data:"):
+          continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+          break
+        chunk = json.loads(data)
+        # stream_options.include_usage: 마지막 청크(choices 비어 있음)에 usage
+        self._record_usage(chunk.get("usage"), provider)
+        choices = chunk.get("choices") or []
+        if not choices:
+          continue
+        content = (choices[0].get("delta") or {}).get("content")
+        if content:
+          yield content
+
+  async def _stream_ollama(self, base_url: str, prompt: str, temperature: float, system: str) -> AsyncIterator[str]:
+    url = f"{base_url}/api/chat"
+    payload = {
+      "model": settings.ollama_model,
+      "messages": [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+      ],
+      "options": {"temperature": temperature},
+      "stream": True,
+    }
+    async with self.transport.stream("ollama", url, json=payload) as resp:
+      resp.raise_for_status()
+      # ollama streams NDJSON: { message: { content }, done }
+      async for line in resp.aiter_lines():
+        if not line.strip():
+          continue
+        data = json.loads(line)
+        content = data.get("message", {}).get("content", "")
+        if content:
+          yield content
+        if data.get("done"):
+          self._record_usage(self._ollama_usage(data), "ollama")
+          break
+
+  async def _generate_vllm(self, base_url: str, prompt: str, temperature: float, max_tokens: int | None = None, system: str = DEFAULT_SYSTEM_PROMPT) -> str:
     """Generate text using vLLM OpenAI-compatible API."""
-    url = f"{settings.vllm_base_url}/v1/chat/completions"
+    url = f"{base_url}/v1/chat/completions"
     payload = {
       "model": settings.vllm_model,
       "messages": [
-        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "system", "content": system},
         {"role": "user", "content": prompt},
       ],
       "temperature": temperature,
@@ -35,50 +305,50 @@ class LLMClient:
     if max_tokens is not None:
       payload["max_tokens"] = max_tokens
     
-    async with httpx.AsyncClient(timeout=120) as client:
-      resp = await client.post(url, json=payload)
-      resp.raise_for_status()
-      data: dict[str, Any] = resp.json()
-      content = data["choices"][0]["message"]["content"]
-      return content.strip()
+    resp = await self.transport.post("vllm", url, json=payload)
+    resp.raise_for_status()
+    data: dict[str, Any] = resp.json()
+    self._record_usage(data.get("usage"), "vllm")
+    content = data["choices"][0]["message"]["content"]
+    return content.strip()
 
-  async def _generate_ollama(self, prompt: str, temperature: float) -> str:
-    url = f"{settings.ollama_base_url}/api/chat"
+  async def _generate_ollama(self, base_url: str, prompt: str, temperature: float, system: str = DEFAULT_SYSTEM_PROMPT) -> str:
+    url = f"{base_url}/api/chat"
     payload = {
       "model": settings.ollama_model,
       "messages": [
-        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "system", "content": system},
         {"role": "user", "content": prompt},
       ],
       "options": {"temperature": temperature},
       "stream": False,
     }
-    async with httpx.AsyncClient(timeout=120) as client:
-      resp = await client.post(url, json=payload)
-      resp.raise_for_status()
-      data: dict[str, Any] = resp.json()
-      # ollama chat returns { message: { content } }
-      message = data.get("message", {})
-      content = message.get("content", "")
-      return content.strip()
-
-  async def _generate_openai(self, prompt: str, temperature: float, max_tokens: int | None = None) -> str:
-    url = f"{settings.openai_base_url}/chat/completions"
+    resp = await self.transport.post("ollama", url, json=payload)
+    resp.raise_for_status()
+    data: dict[str, Any] = resp.json()
+    self._record_usage(self._ollama_usage(data), "ollama")
+    # ollama chat returns { message: { content } }
+    message = data.get("message", {})
+    content = message.get("content", "")
+    return content.strip()
+
+  async def _generate_openai(self, base_url: str, prompt: str, temperature: float, max_tokens: int | None = None, system: str = DEFAULT_SYSTEM_PROMPT) -> str:
+    url = f"{base_url}/chat/completions"
     headers = {"Authorization": f"Bearer {settings.openai_api_key}"}
     payload = {
       "model": settings.openai_model,
       "messages": [
-        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "system", "content": system},
         {"role": "user", "content": prompt},
       ],
       "temperature": temperature,
     }
     if max_tokens is not None:
       payload["max_tokens"] = max_tokens
-    async with httpx.AsyncClient(timeout=120) as client:
-      resp = await client.post(url, headers=headers, json=payload)
-      resp.raise_for_status()
-      data = resp.json()
-      content = data["choices"][0]["message"]["content"]
-      return content.strip()
+    resp = await self.transport.post("openai", url, headers=headers, json=payload)
+    resp.raise_for_status()
+    data = resp.json()
+    self._record_usage(data.get("usage"), "openai")
+    content = data["choices"][0]["message"]["content"]
+    return content.strip()
 
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import statistics
+import time
+from collections import deque
+from typing import Any
+
+import httpx
+from ..config import settings
+
+
+class LLMUnavailableError(RuntimeError):
+  """Every endpoint of the providers allowed for a call is failing or circuit-open."""
+
+
+def parse_endpoints(spec: str, default_url: str) -> list[tuple[str, float]]:
+  """`url[*weight], ...` -> [(url, weight)]; an empty spec means `default_url` alone."""
+  endpoints: list[tuple[str, float]] = []
+  for item in spec.split(","):
+    item = item.strip()
+    if not item:
+      continue
+    url, _, weight = item.partition("*")
+    endpoints.append((url.strip().rstrip("/"), float(weight) if weight.strip() else 1.0))
+  return endpoints or [(default_url.rstrip("/"), 1.0)]
+
+
+def is_endpoint_fault(error: BaseException) -> bool:
+  """Errors that say something about the endpoint (unreachable, timed out,
+  overloaded or broken), as opposed to a bad request that every endpoint
+  would reject the same way."""
+  if isinstance(error, httpx.HTTPStatusError):
+    return error.response.status_code >= 500 or error.response.status_code == 429
+  return isinstance(error, (httpx.TransportError, LLMUnavailableError))
+
+
+class Endpoint:
+  """One server of a provider, with its load, latency and circuit state.
+
+  closed: in rotation. open: LLM_BREAKER_FAILURES consecutive faults; skipped
+  for LLM_BREAKER_COOLDOWN seconds. half_open: the cooldown passed and one
+  request is let through as a probe; it closes or re-opens the circuit.
+  """
+
+  def __init__(self, provider: str, url: str, weight: float) -> None:
+    self.provider = provider
+    self.url = url
+    self.weight = max(weight, 0.01)
+    self.in_flight = 0
+    self.requests = 0
+    self.errors = 0
+    self.consecutive_failures = 0
+    self.state = "closed"
+    self.opened_at = 0.0
+    self.last_error: str | None = None
+    self.total_seconds = 0.0
+    # 최근 호출 시간(초), 통계용
+    self.recent: deque[float] = deque(maxlen=256)
+
+  def available(self, now: float) -> bool:
+    if self.state == "closed":
+      return True
+    if self.state == "open":
+      return now - self.opened_at >= settings.llm_breaker_cooldown
+    # half_open: 프로브 하나만
+    return self.in_flight == 0
+
+  def stats(self) -> dict[str, Any]:
+    recent = sorted(self.recent)
+    return {
+      "url": self.url,
+      "weight": self.weight,
+      "state": self.state,
+      "in_flight": self.in_flight,
+      "requests": self.requests,
+      "errors": self.errors,
+      "consecutive_failures": self.consecutive_failures,
+      "last_error": self.last_error,
+      "total_seconds": round(self.total_seconds, 3),
+      "latency_ms": {
+        "p50": round(recent[len(recent) // 2] * 1000, 1),
+        "p95": round(recent[int(len(recent) * 0.95)] * 1000, 1),
+        "mean": round(statistics.mean(recent) * 1000, 1),
+      } if recent else None,
+    }
+
+
+class EndpointPool:
+  """Weighted least-outstanding-requests routing over a provider's endpoints.
+
+  `pick` returns the available endpoint with the fewest in-flight requests
+  per unit of weight; `record` feeds the outcome back into the circuit
+  breaker. Runs on the event loop only, so no locking.
+  """
+
+  def __init__(self, provider: str, endpoints: list[tuple[str, float]]) -> None:
+    self.provider = provider
+    self.endpoints = [Endpoint(provider, url, weight) for url, weight in endpoints]
+
+  def pick(self, exclude: set[str] | frozenset[str] = frozenset()) -> Endpoint | None:
+    now = time.monotonic()
+    candidates = [e for e in self.endpoints if e.url not in exclude and e.available(now)]
+    if not candidates:
+      return None
+    # 진행 중 요청/가중치가 같으면 누적 요청이 적은 쪽 (유휴 상태에서도 고르게 분산)
+    best = min(candidates, key=lambda e: ((e.in_flight + 1) / e.weight, e.requests / e.weight))
+    if best.state == "open":
+      best.state = "half_open"
+    return best
+
+  def begin(self, endpoint: Endpoint) -> None:
+    endpoint.in_flight += 1
+    endpoint.requests += 1
+
+  def record(self, endpoint: Endpoint, seconds: float, error: BaseException | None) -> None:
+    endpoint.in_flight -= 1
+    endpoint.total_seconds += seconds
+    if error is None:
+      endpoint.recent.append(seconds)
+      endpoint.consecutive_failures = 0
+      endpoint.state = "closed"
+      return
+    if not is_endpoint_fault(error):
+      # 잘못된 요청(4xx), 취소: 서버 상태와 무관 (half_open이면 다음 요청이 다시 프로브)
+      return
+    endpoint.errors += 1
+    endpoint.consecutive_failures += 1
+    endpoint.last_error = f"{type(error).__name__}: {error}"[:200]
+    if endpoint.state == "half_open" or endpoint.consecutive_failures >= settings.llm_breaker_failures:
+      endpoint.state = "open"
+      endpoint.opened_at = time.monotonic()
+
+  def mark_healthy(self, endpoint: Endpoint) -> None:
+    """An active health check succeeded: put a circuit-open endpoint back in rotation."""
+    if endpoint.state != "closed" and endpoint.in_flight == 0:
+      endpoint.state = "closed"
+      endpoint.consecutive_failures = 0
+
+  def unhealthy(self) -> list[Endpoint]:
+    return [e for e in self.endpoints if e.state != "closed"]
+
+  def stats(self) -> list[dict[str, Any]]:
+    return [e.stats() for e in self.endpoints]
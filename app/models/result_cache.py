@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable
+
+
+# 시간에 따라 결과가 달라지는 함수: time_bucket 설정 시에만 캐시
+TIME_FUNCTIONS = re.compile(
+  r"\b(NOW|CURDATE|CURTIME|SYSDATE|UTC_DATE|UTC_TIME|UTC_TIMESTAMP|UNIX_TIMESTAMP|"
+  r"CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP|LOCALTIME|LOCALTIMESTAMP)\b",
+  re.IGNORECASE,
+)
+# 호출마다 결과가 달라지는 함수: 항상 캐시 제외
+NONDETERMINISTIC_FUNCTIONS = re.compile(
+  r"\b(RAND|UUID|UUID_SHORT|CONNECTION_ID|LAST_INSERT_ID|FOUND_ROWS|ROW_COUNT|SLEEP|GET_LOCK)\s*\(",
+  re.IGNORECASE,
+)
+TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+((?:`?\w+`?\.)?`?\w+`?(?:\s+(?:AS\s+)?\w+)?(?:\s*,\s*(?:`?\w+`?\.)?`?\w+`?(?:\s+(?:AS\s+)?\w+)?)*)", re.IGNORECASE)
+READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+def normalize_sql(sql: str) -> str:
+  return " ".join(sql.split()).rstrip(";").strip()
+
+
+def referenced_tables(sql: str) -> set[str]:
+  """Best-effort list of tables read by a SELECT (FROM/JOIN clauses)."""
+  tables: set[str] = set()
+  for m in TABLE_REF.finditer(sql):
+    for part in m.group(1).split(","):
+      name = part.strip().split()[0].replace("`", "")
+      tables.add(name.split(".")[-1].lower())
+  return tables
+
+
+def estimate_rows_bytes(rows: Iterable[Any]) -> int:
+  """Rough size of dict rows or of a `ColumnarRows` (tuple rows)."""
+  total = sys.getsizeof(rows)
+  for row in rows:
+    total += sys.getsizeof(row)
+    for value in (row.values() if isinstance(row, dict) else row):
+      total += sys.getsizeof(value)
+  return total
+
+
+class ResultCachePolicy:
+  """Per-DB `result_cache` block of databases.yaml."""
+
+  def __init__(self, enabled: bool = False, default_ttl: float = 60.0, time_bucket: float | None = None, tables: dict[str, float] | None = None) -> None:
+    self.enabled = enabled
+    self.default_ttl = default_ttl
+    self.time_bucket = time_bucket
+    self.tables = {k.lower(): float(v) for k, v in (tables or {}).items()}
+
+  @classmethod
+  def from_dict(cls, data: dict[str, Any] | None) -> "ResultCachePolicy":
+    data = data or {}
+    bucket = data.get("time_bucket")
+    return cls(
+      enabled=bool(data.get("enabled", False)),
+      default_ttl=float(data.get("default_ttl", 60)),
+      time_bucket=float(bucket) if bucket else None,
+      tables=data.get("tables"),
+    )
+
+  def ttl_for(self, tables: set[str]) -> float:
+    if not tables:
+      return self.default_ttl
+    return min(self.tables.get(t, self.default_ttl) for t in tables)
+
+
+class CachePlan:
+  def __init__(self, key: tuple[Any, ...], db_name: str, tables: set[str], ttl: float) -> None:
+    self.key = key
+    self.db_name = db_name
+    self.tables = tables
+    self.ttl = ttl
+
+
+class ResultCache:
+  """Thread-safe SQL result cache bounded by estimated row bytes.
+
+  `DatabaseManager.query` runs in worker threads, hence the lock.
+  """
+
+  def __init__(self, max_bytes: int) -> None:
+    self.max_bytes = max_bytes
+    self._lock = threading.Lock()
+    # key -> (expires_at, size, tables, rows)
+    self._entries: OrderedDict[tuple[Any, ...], tuple[float, int, set[str], Any]] = OrderedDict()
+    self._by_table: dict[tuple[str, str], set[tuple[Any, ...]]] = {}
+    self.bytes = 0
+    self.hits = 0
+    self.misses = 0
+    self.uncacheable = 0
+    self.evictions = 0
+
+  def plan(self, db_name: str, sql: str, params: tuple[Any, ...] | None, policy: ResultCachePolicy | None, shape: str = "dict") -> CachePlan | None:
+    """Decide whether a statement may be cached; None means bypass.
+
+    `shape` separates dict rows from columnar results of the same SQL.
+    """
+    if policy is None or not policy.enabled or self.max_bytes <= 0:
+      return None
+    norm = normalize_sql(sql)
+    if not READ_ONLY.match(norm) or NONDETERMINISTIC_FUNCTIONS.search(norm):
+      self.uncacheable += 1
+      return None
+    tables = referenced_tables(norm)
+    ttl = policy.ttl_for(tables)
+    bucket = None
+    if TIME_FUNCTIONS.search(norm):
+      if not policy.time_bucket:
+        self.uncacheable += 1
+        return None
+      now = time.time()
+      bucket = int(now // policy.time_bucket)
+      # never outlive the bucket the result was computed in
+      ttl = min(ttl, (bucket + 1) * policy.time_bucket - now)
+    if ttl <= 0:
+      self.uncacheable += 1
+      return None
+    key = (db_name, norm, repr(params) if params else None, bucket, shape)
+    return CachePlan(key, db_name, tables, ttl)
+
+  def get(self, plan: CachePlan) -> Any | None:
+    with self._lock:
+      item = self._entries.get(plan.key)
+      if item is None:
+        self.misses += 1
+        return None
+      expires_at, _, _, rows = item
+      if time.monotonic() >= expires_at:
+        self._remove(plan.key)
+        self.misses += 1
+        return None
+      self._entries.move_to_end(plan.key)
+      self.hits += 1
+      # copy (list or ColumnarRows slice) so callers cannot mutate the entry
+      return rows[:]
+
+  def put(self, plan: CachePlan, rows: Any) -> None:
+    size = estimate_rows_bytes(rows)
+    if size > self.max_bytes:
+      return
+    with self._lock:
+      self._remove(plan.key)
+      self._entries[plan.key] = (time.monotonic() + plan.ttl, size, plan.tables, rows)
+      self.bytes += size
+      for t in plan.tables:
+        self._by_table.setdefault((plan.db_name, t), set()).add(plan.key)
+      while self.bytes > self.max_bytes and self._entries:
+        oldest = next(iter(self._entries))
+        self._remove(oldest)
+        self.evictions += 1
+
+  def _remove(self, key: tuple[Any, ...]) -> None:
+    item = self._entries.pop(key, None)
+    if item is None:
+      return
+    _, size, tables, _ = item
+    self.bytes -= size
+    for t in tables:
+      keys = self._by_table.get((key[0], t))
+      if keys is not None:
+        keys.discard(key)
+        if not keys:
+          del self._by_table[(key[0], t)]
+
+  def invalidate(self, db_name: str, table: str | None = None) -> int:
+    """Drop entries of a DB, or only those reading `table`. Returns count."""
+    with self._lock:
+      if table is None:
+        keys = [k for k in self._entries if k[0] == db_name]
+      else:
+        keys = list(self._by_table.get((db_name, table.lower()), ()))
+      for k in keys:
+        self._remove(k)
+      return len(keys)
+
+  def clear(self) -> None:
+    with self._lock:
+      self._entries.clear()
+      self._by_table.clear()
+      self.bytes = 0
+
+  def stats(self) -> dict[str, Any]:
+    with self._lock:
+      return {
+        "entries": len(self._entries),
+        "bytes": self.bytes,
+        "max_bytes": self.max_bytes,
+        "hits": self.hits,
+        "misses": self.misses,
+        "uncacheable": self.uncacheable,
+        "evictions": self.evictions,
+      }
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import anyio
+from fastapi import APIRouter, HTTPException
+from typing import Any
+
+
+router = APIRouter()
+
+
+@router.get("/llm/pool")
+def llm_pool_stats() -> dict[str, Any]:
+  from ..main import llm_transport
+
+  return llm_transport.pool_stats()
+
+
+@router.get("/cache/sql")
+def sql_cache_stats() -> dict[str, Any]:
+  from ..main import sql_cache
+
+  return sql_cache.stats()
+
+
+@router.delete("/cache/sql")
+def sql_cache_clear() -> dict[str, Any]:
+  from ..main import sql_cache
+
+  sql_cache.clear()
+  return sql_cache.stats()
+
+
+@router.get("/cache/result")
+def result_cache_stats() -> dict[str, Any]:
+  from ..main import db_manager
+
+  return db_manager.result_cache.stats()
+
+
+@router.delete("/cache/result")
+def result_cache_invalidate(db: str | None = None, table: str | None = None) -> dict[str, Any]:
+  from ..main import db_manager
+
+  if db is None:
+    db_manager.result_cache.clear()
+    removed = None
+  else:
+    removed = db_manager.result_cache.invalidate(db, table)
+  return {"removed": removed, **db_manager.result_cache.stats()}
+
+
+@router.get("/db/guard")
+def db_guard_stats() -> dict[str, Any]:
+  from ..main import db_manager
+
+  return dict(db_manager.guard_stats)
+
+
+@router.get("/logs")
+def log_writer_stats() -> dict[str, Any]:
+  from ..main import app_logger
+
+  return app_logger.stats()
+
+
+@router.get("/prompts")
+def prompt_stats() -> dict[str, Any]:
+  from ..main import prompt_manager
+
+  return prompt_manager.stats()
+
+
+@router.post("/prompts/reload")
+async def prompt_reload() -> dict[str, Any]:
+  """Re-read every prompt file now, regardless of mtime."""
+  from ..main import apply_prompt_changes, prompt_manager
+
+  changed = await anyio.to_thread.run_sync(lambda: prompt_manager.refresh(force=True))
+  apply_prompt_changes(changed)
+  return {"changed": changed, **prompt_manager.stats()}
+
+
+@router.post("/schema/refresh")
+async def schema_refresh(db: str | None = None, force: bool = False) -> dict[str, Any]:
+  """Re-check table fingerprints now (one DB or all); `force` re-introspects every table."""
+  from ..main import db_manager, db_status, refresh_schema
+
+  names = db_manager.list_db_names()
+  if db is not None and db not in names:
+    raise HTTPException(status_code=404, detail=f"Unknown DB: {db}")
+  result: dict[str, Any] = {}
+  for name in [db] if db is not None else names:
+    try:
+      result[name] = {"changed": await refresh_schema(name, force)}
+    except Exception as e:
+      result[name] = {"error": str(e)}
+  return {"databases": result, "status": db_status}
+
+
+@router.get("/profiles")
+def value_profile_stats() -> dict[str, Any]:
+  from ..main import db_manager, value_profiler
+
+  return {db: value_profiler.stats(db) for db in db_manager.list_db_names()}
+
+
+@router.post("/profiles/refresh")
+async def value_profile_refresh(db: str | None = None, force: bool = False) -> dict[str, Any]:
+  """Profile new, changed or stale tables now (one DB or all); `force` profiles every table."""
+  from ..main import db_manager, profile_values
+
+  names = db_manager.list_db_names()
+  if db is not None and db not in names:
+    raise HTTPException(status_code=404, detail=f"Unknown DB: {db}")
+  return {name: {"profiled": await profile_values(name, force)} for name in ([db] if db is not None else names)}
+
+
+@router.get("/examples")
+def example_stats() -> dict[str, Any]:
+  from ..main import example_index
+
+  return example_index.stats()
+
+
+@router.post("/examples/scan")
+async def example_scan() -> dict[str, Any]:
+  """Index query log records appended since the last scan now."""
+  from ..main import index_examples
+
+  return {"added": await index_examples()}
+
+
+@router.get("/sql/validation")
+def sql_validation_stats() -> dict[str, Any]:
+  from ..main import sql_validator
+
+  return sql_validator.stats()
@@ -1,98 +1,764 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Any
-import anyio
+from typing import Any, AsyncIterator
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+import orjson
 
-from ..models.db_manager import DatabaseManager
+from ..config import settings
+from ..models.db_manager import ColumnarRows, DatabaseManager
+from ..models.llm_client import current_usage, track_usage
 from ..services.prompt_manager import PromptManager
 from ..services.db_selector import DBSelector
 from ..services.sql_generator import SQLGenerator
 from ..services.answer_generator import AnswerGenerator
+from ..services.sql_cache import QuestionSQLCache
+from ..services.sql_validator import SQLValidationError, SQLValidator
 
 
 router = APIRouter()
 
 
+# /api/query 응답 형식: rows (dict 목록, 기본) | columnar (columns + 행 배열)
+RESULT_FORMATS = ("rows", "columnar")
+
+
 class QueryRequest(BaseModel):
   question: str
 
 
-@router.post("/query")
-async def query(req: QueryRequest) -> dict[str, Any]:
-  from ..main import db_manager as dm
-  from ..main import prompt_manager as pm
-  from ..main import app_logger as logger
+class BatchQueryRequest(BaseModel):
+  questions: list[str]
+  # 동시 처리 수 (기본 BATCH_CONCURRENCY, 최대 BATCH_MAX_CONCURRENCY)
+  concurrency: int | None = None
+
+
+def _json_default(value: Any) -> Any:
+  if isinstance(value, Decimal):
+    return float(value)
+  if isinstance(value, (datetime, date, dtime)):
+    return value.isoformat()
+  if isinstance(value, timedelta):
+    return str(value)
+  if isinstance(value, (bytes, bytearray)):
+    return value.decode("utf-8", errors="replace")
+  if isinstance(value, (set, frozenset)):
+    # MySQL SET 컬럼은 문자열 set으로 옴
+    return sorted(value)
+  raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class CompactJSONResponse(JSONResponse):
+  """orjson-encoded response; dates are native, Decimal etc. via `_json_default`."""
+
+  def render(self, content: Any) -> bytes:
+    return orjson.dumps(content, default=_json_default)
+
+
+class ExecutionResult:
+  def __init__(self, rows: list[dict] | ColumnarRows, sql: str, retry: dict[str, Any] | None = None, truncated: bool = False, generated_sql: str | None = None) -> None:
+    self.rows = rows
+    self.sql = sql
+    self.retry = retry
+    self.truncated = truncated
+    # SQL before LIMIT injection; this is what the question cache stores
+    self.generated_sql = generated_sql or sql
+    # multi-candidate race summary (SQL_CANDIDATES > 1), for logs
+    self.race: dict[str, Any] | None = None
+
+
+class StageTimer:
+  """Milliseconds since request start at each stage boundary (`timings` in logs)."""
+
+  def __init__(self, started: float | None = None) -> None:
+    self.started = started if started is not None else time.perf_counter()
+    self.timings: dict[str, float] = {}
+
+  def mark(self, name: str) -> None:
+    self.timings[name] = round((time.perf_counter() - self.started) * 1000, 1)
+
+
+class SQLExecutionFailed(Exception):
+  def __init__(self, sql: str, error: str, retry: dict[str, Any]) -> None:
+    super().__init__(error)
+    self.sql = sql
+    self.error = error
+    self.retry = retry
+
+
+def _stage(stage: str, db: str = "") -> Any:
+  """Timer for one pipeline stage (`text2sql_stage_seconds`)."""
+  from ..main import metrics
+
+  return metrics.histogram("stage_seconds", "Pipeline stage duration.", ("stage", "db")).time(stage=stage, db=db)
+
+
+def _count_retry(db_name: str, local: bool, fixed: bool) -> None:
+  from ..main import metrics
+
+  metrics.counter("sql_retries_total", "LLM SQL retries by cause (validation/database) and outcome.", ("db", "cause", "outcome")).inc(
+    db=db_name, cause="validation" if local else "database", outcome="fixed" if fixed else "failed")
+  if not fixed:
+    metrics.counter("query_failures_total", "Questions whose SQL still failed after the retry.", ("db",)).inc(db=db_name)
+
+
+async def _resolve_db(selector: DBSelector, cache: QuestionSQLCache, question: str) -> tuple[str, bool]:
+  """Choose the DB, answering from the question cache when possible."""
+  names = selector.dbs.list_db_names()
+  if len(names) > 1:
+    cached = cache.get_db(question, selector.fingerprint())
+    if cached in names:
+      selector.decision = {"path": "cache"}
+      return cached, True
+  with _stage("db_selection"):
+    return await selector.choose_database(question), False
+
+
+async def _resolve_sql(sqlgen: SQLGenerator, cache: QuestionSQLCache, question: str, db_name: str) -> tuple[str, tuple[str, str], bool]:
+  """Return (sql, base_prompt, cache_hit); base_prompt is kept for the retry."""
+  cached = cache.get_sql(question, db_name, sqlgen.schema_fingerprint(db_name))
+  if cached is not None:
+    return cached, sqlgen._build_prompt(question, db_name), True
+  with _stage("sql_generation", db_name):
+    sql, base_prompt = await sqlgen.generate_sql(question, db_name)
+  return sql, base_prompt, False
+
+
+def _remember(selector: DBSelector, sqlgen: SQLGenerator, cache: QuestionSQLCache, question: str, db_name: str, sql: str) -> None:
+  """Store a DB choice and SQL that actually executed successfully."""
+  if len(selector.dbs.list_db_names()) > 1:
+    cache.put_db(question, selector.fingerprint(), db_name)
+  cache.put_sql(question, db_name, sqlgen.schema_fingerprint(db_name), sql)
+
+
+def _result_key(rows: list[dict] | ColumnarRows) -> str:
+  """Order-insensitive fingerprint of a result set, for majority voting."""
+  data = rows.rows if isinstance(rows, ColumnarRows) else [tuple(r.values()) for r in rows]
+  return hashlib.sha1("\n".join(sorted(map(repr, data))).encode("utf-8")).hexdigest()
+
 
-  selector = DBSelector(pm, dm)
-  sqlgen = SQLGenerator(pm)
-  ansg = AnswerGenerator(pm)
+async def _race_candidates(
+  dm: DatabaseManager, validator: SQLValidator, db_name: str, candidates: list[tuple[str, int]],
+  schema: str, limit: int | None, max_rows: int | None, columnar: bool,
+) -> tuple[ExecutionResult | None, dict[str, Any], Exception | None]:
+  """Run the distinct candidates concurrently and keep the first success
+  (`first`) or the first result set backed by more than half of the votes
+  (`majority`, falling back to the most voted result). Losers are cancelled,
+  which kills their statements on the server. Returns (result, info, error of
+  the best-ranked failed candidate when nothing succeeded).
+  """
+  strategy = settings.sql_candidates_strategy
+  info: dict[str, Any] = {"candidates": len(candidates), "strategy": strategy, "rejected": 0, "failed": 0}
+  errors: dict[int, Exception] = {}
+  tasks: dict[asyncio.Task, tuple[int, str, str, int]] = {}
+  for rank, (sql, votes) in enumerate(candidates):
+    try:
+      checked_sql, _ = validator.check(db_name, sql, schema, limit)
+    except SQLValidationError as e:
+      info["rejected"] += 1
+      errors[rank] = e
+      continue
+    task = asyncio.create_task(dm.aquery_bounded(db_name, checked_sql, max_rows=max_rows, columnar=columnar))
+    # 취소/미확인 예외 경고 방지
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    tasks[task] = (rank, sql, checked_sql, votes)
+
+  total = sum(votes for *_, votes in tasks.values())
+  groups: dict[str, list[Any]] = {}  # result key -> [votes, ExecutionResult]
+  pending = set(tasks)
+  try:
+    while pending:
+      done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+      # 동시에 끝난 후보는 순위(득표) 순으로
+      for task in sorted(done, key=lambda t: tasks[t][0]):
+        rank, sql, checked_sql, votes = tasks[task]
+        if task.exception() is not None:
+          info["failed"] += 1
+          errors[rank] = task.exception()
+          continue
+        rows, truncated = task.result()
+        result = ExecutionResult(rows, checked_sql, truncated=truncated, generated_sql=sql)
+        if strategy != "majority":
+          info.update(winner_rank=rank, cancelled=len(pending))
+          return result, info, None
+        group = groups.setdefault(_result_key(rows), [0, result])
+        group[0] += votes
+        if group[0] * 2 > total:
+          info.update(winner_votes=group[0], total_votes=total, cancelled=len(pending))
+          return group[1], info, None
+    if groups:
+      votes, result = max(groups.values(), key=lambda g: g[0])
+      info.update(winner_votes=votes, total_votes=total, cancelled=0)
+      return result, info, None
+    return None, info, errors[min(errors)]
+  finally:
+    for task in pending:
+      task.cancel()
 
-  db_name = await selector.choose_database(req.question)
 
-  sql, base_prompt = await sqlgen.generate_sql(req.question, db_name)
+async def _execute_with_retry(
+  dm: DatabaseManager, sqlgen: SQLGenerator, validator: SQLValidator, db_name: str, sql: str,
+  base_prompt: tuple[str, str], columnar: bool = False, candidates: list[tuple[str, int]] | None = None,
+) -> ExecutionResult:
+  """Validate locally, then run the SQL on the DB pool (capped at
+  QUERY_MAX_ROWS); on failure ask the LLM once for a fix. Raises
+  SQLExecutionFailed when the retry also fails.
 
-  # run query in thread
-  rows: list[dict]
-  retried = False
-  retry_error: str | None = None
-  initial_error: str | None = None
-  retry_sql_value: str | None = None
+  With several `candidates` (SQL_CANDIDATES > 1) they race instead of `sql`,
+  and the LLM retry only happens when every candidate failed.
+  """
+  max_rows = settings.query_max_rows or None
+  # max_rows + 1: 잘림 여부를 알 수 있도록 한 행 더
+  limit = max_rows + 1 if max_rows else None
+  schema = sqlgen.pm.get_db_structure_prompt(db_name)
+  race: dict[str, Any] | None = None
   try:
-    rows = await anyio.to_thread.run_sync(lambda: dm.query(db_name, sql))
+    if candidates and len(candidates) > 1:
+      with _stage("execution", db_name):
+        result, race, error = await _race_candidates(dm, validator, db_name, candidates, schema, limit, max_rows, columnar)
+      if result is None:
+        raise error
+      result.race = race
+      return result
+    checked_sql, _ = validator.check(db_name, sql, schema, limit)
+    with _stage("execution", db_name):
+      rows, truncated = await dm.aquery_bounded(db_name, checked_sql, max_rows=max_rows, columnar=columnar)
+    return ExecutionResult(rows, checked_sql, truncated=truncated, generated_sql=sql)
   except Exception as e:
-    # retry once with error
+    # retry once with error (local validation errors never reached the DB)
+    initial_error = str(e)
+    local = isinstance(e, SQLValidationError)
+    retry_sql_value: str | None = None
     try:
-      initial_error = str(e)
-      retry_sql = await sqlgen.retry_with_error(base_prompt, initial_error)
+      with _stage("sql_retry", db_name):
+        retry_sql = await sqlgen.retry_with_error(base_prompt, initial_error)
       retry_sql_value = retry_sql
-      rows = await anyio.to_thread.run_sync(lambda: dm.query(db_name, retry_sql))
-      sql = retry_sql
-      retried = True
+      checked_sql, warnings = validator.check(db_name, retry_sql, schema, limit, final=True)
+      with _stage("execution", db_name):
+        rows, truncated = await dm.aquery_bounded(db_name, checked_sql, max_rows=max_rows, columnar=columnar)
+      validator.record_retry(local, fixed=True)
+      _count_retry(db_name, local, fixed=True)
+      if warnings:
+        validator.record_override()
+      result = ExecutionResult(rows, checked_sql, {
+        "initial_error": initial_error,
+        "prevalidated": local,
+        "retry_sql": retry_sql_value,
+      }, truncated, retry_sql)
+      result.race = race
+      return result
     except Exception as e2:
-      # final failure
-      retry_error = str(e2)
-      logger.log_query({
-        "event": "query_failed",
-        "question": req.question,
-        "db": db_name,
-        "sql": sql,
-        "error": retry_error,
-        "retry": {
-          "initial_error": initial_error,
-          "retry_sql": retry_sql_value,
-          "retry_error": retry_error,
-        },
-      })
-      raise HTTPException(status_code=400, detail={
-        "message": "SQL 실행 실패",
-        "error": retry_error,
-        "sql": sql,
-        "db": db_name,
-      })
+      validator.record_retry(local, fixed=False)
+      _count_retry(db_name, local, fixed=False)
+      retry = {
+        "initial_error": initial_error,
+        "prevalidated": local,
+        "retry_sql": retry_sql_value,
+        "retry_error": str(e2),
+      }
+      if race is not None:
+        retry["sql_candidates"] = race
+      raise SQLExecutionFailed(sql, str(e2), retry) from e2
+
+
+async def _answer(
+  selector: DBSelector, question: str, db_name: str, db_cached: bool, columnar: bool = False,
+  log_extra: dict[str, Any] | None = None, timer: StageTimer | None = None,
+) -> dict[str, Any]:
+  """SQL generation, execution and answer for a question whose DB is already
+  chosen; logs the outcome with stage timings and the tokens tracked for the
+  request (`track_usage`). Raises HTTPException(400) when the SQL still fails
+  after the retry."""
+  from ..main import db_manager as dm
+  from ..main import prompt_manager as pm
+  from ..main import app_logger as logger
+  from ..main import llm_client as lm
+  from ..main import sql_cache as cache
+  from ..main import schema_retriever
+  from ..main import value_profiler
+  from ..main import example_index
+  from ..main import sql_validator
 
-  answer = await ansg.generate(req.question, db_name, sql, rows)
-  result = {
+  sqlgen = SQLGenerator(pm, lm, schema_retriever, value_profiler, example_index)
+  ansg = AnswerGenerator(pm, lm)
+  extra = log_extra or {}
+  timer = timer or StageTimer()
+
+  sql, base_prompt, sql_cached = await _resolve_sql(sqlgen, cache, question, db_name)
+  timer.mark("sql_ms")
+
+  try:
+    candidates = None if sql_cached else sqlgen.candidates
+    result = await _execute_with_retry(dm, sqlgen, sql_validator, db_name, sql, base_prompt, columnar, candidates)
+  except SQLExecutionFailed as e:
+    # final failure
+    if sql_cached:
+      cache.discard_sql(question, db_name, sqlgen.schema_fingerprint(db_name))
+    timer.mark("total_ms")
+    logger.log_query({
+      "event": "query_failed",
+      "question": question,
+      "db": db_name,
+      "sql": e.sql,
+      "error": e.error,
+      "retry": e.retry,
+      "db_selection": selector.decision,
+      "timings": timer.timings,
+      "tokens": current_usage(),
+      **extra,
+    })
+    raise HTTPException(status_code=400, detail={
+      "message": "SQL 실행 실패",
+      "error": e.error,
+      "sql": e.sql,
+      "db": db_name,
+    })
+
+  timer.mark("rows_ms")
+  sql, rows, retry = result.sql, result.rows, result.retry
+  _remember(selector, sqlgen, cache, question, db_name, result.generated_sql)
+
+  with _stage("answer", db_name):
+    answer = await ansg.generate(question, db_name, sql, rows, result.truncated)
+  timer.mark("total_ms")
+  response = {
     "answer": answer,
     "used_db": db_name,
     "sql": sql,
     "rows": rows,
+    "row_count": len(rows),
+    "truncated": result.truncated,
   }
+  if isinstance(rows, ColumnarRows):
+    response["columns"] = rows.columns
+    response["rows"] = rows.rows
   # log success
   payload = {
     "event": "query_succeeded",
-    "question": req.question,
+    "question": question,
     "db": db_name,
     "sql": sql,
-    "retried": retried,
+    "generated_sql": result.generated_sql,
+    "retried": retry is not None,
+    "row_count": len(rows),
+    "truncated": result.truncated,
     "answer": answer,
+    "cache": {"db": db_cached, "sql": sql_cached},
+    "db_selection": selector.decision,
+    "sql_prompt": sqlgen.prompt_stats,
+    "answer_prompt": ansg.prompt_stats,
+    "timings": timer.timings,
+    "tokens": current_usage(),
+    **extra,
   }
-  if retried:
-    payload["retry"] = {
-      "initial_error": initial_error,
-      "retry_sql": retry_sql_value,
-    }
+  if retry is not None:
+    payload["retry"] = retry
+  if result.race is not None:
+    payload["sql_candidates"] = result.race
   logger.log_query(payload)
-  return result
+  return response
+
+
+@router.post("/query", response_model=None)
+async def query(
+  req: QueryRequest,
+  result_format: str = Query("rows", alias="format"),
+  x_result_format: str | None = Header(None),
+) -> dict[str, Any] | CompactJSONResponse:
+  """`?format=columnar` (or `X-Result-Format: columnar`) returns `columns` plus
+  `rows` as arrays, fetched with a tuple cursor and encoded with orjson."""
+  from ..main import db_manager as dm
+  from ..main import prompt_manager as pm
+  from ..main import llm_client as lm
+  from ..main import sql_cache as cache
+  from ..main import db_router
+
+  selector = DBSelector(pm, dm, lm, db_router)
+
+  fmt = (x_result_format or result_format).lower()
+  if fmt not in RESULT_FORMATS:
+    raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(RESULT_FORMATS)}")
+  columnar = fmt == "columnar"
+
+  timer = StageTimer()
+  track_usage()
+  db_name, db_cached = await _resolve_db(selector, cache, req.question)
+  timer.mark("db_ms")
+  response = await _answer(selector, req.question, db_name, db_cached, columnar, timer=timer)
+  if columnar:
+    return CompactJSONResponse(response)
+  return response
+
+
+@router.post("/query/batch")
+async def query_batch(req: BatchQueryRequest) -> StreamingResponse:
+  """Answer many questions in one call, as NDJSON.
+
+  Each question runs DB selection and then the /query pipeline, with at most
+  `concurrency` questions in flight; a question goes on to its pipeline as
+  soon as its own DB is known. One line per question as soon as it finishes
+  (`index`, `question`, the /query response or `error`, `timings`), then
+  `{"done": true, ...}` with totals.
+  """
+  from ..main import db_manager as dm
+  from ..main import prompt_manager as pm
+  from ..main import llm_client as lm
+  from ..main import sql_cache as cache
+  from ..main import app_logger as logger
+  from ..main import db_router
+
+  if len(req.questions) > settings.batch_max_questions:
+    raise HTTPException(status_code=400, detail=f"at most {settings.batch_max_questions} questions per batch")
+  concurrency = max(1, min(req.concurrency or settings.batch_concurrency, settings.batch_max_concurrency))
+  batch_id = uuid.uuid4().hex[:12]
+
+  async def lines() -> AsyncIterator[str]:
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(concurrency)
+
+    def ms(since: float) -> float:
+      return round((time.perf_counter() - since) * 1000, 1)
+
+    by_db: dict[str, int] = {}
+
+    def log_failed(question: str, db_name: str | None, error: str, timings: dict[str, float], usage: dict[str, int], selector: DBSelector) -> None:
+      logger.log_query({
+        "event": "query_failed",
+        "question": question,
+        "db": db_name,
+        "error": error,
+        "db_selection": selector.decision,
+        "batch": batch_id,
+        "timings": timings,
+        "tokens": usage,
+      })
+
+    async def run(index: int, question: str) -> dict[str, Any]:
+      item: dict[str, Any] = {"index": index, "question": question}
+      queued = time.perf_counter()
+      # 슬롯 하나로 DB 선택과 파이프라인을 이어서 처리 (다른 질문의 DB 선택을 기다리지 않음)
+      async with slots:
+        t0 = time.perf_counter()
+        usage = track_usage()
+        selector = DBSelector(pm, dm, lm, db_router)
+        try:
+          db_name, db_cached = await _resolve_db(selector, cache, question)
+        except Exception as e:
+          item["error"] = {"message": "DB 선택 실패", "error": str(e)}
+          item["timings"] = {"db_ms": ms(t0), "wait_ms": round((t0 - queued) * 1000, 1)}
+          log_failed(question, None, str(e), item["timings"], usage, selector)
+          return item
+        by_db[db_name] = by_db.get(db_name, 0) + 1
+        db_ms = ms(t0)
+        t1 = time.perf_counter()
+        error: Exception | None = None
+        try:
+          item.update(await _answer(selector, question, db_name, db_cached, log_extra={"batch": batch_id}, timer=StageTimer(t1)))
+        except HTTPException as e:
+          # _answer가 query_failed를 이미 기록함
+          item.update(used_db=db_name, error=e.detail)
+        except Exception as e:
+          # 한 질문의 LLM/DB 오류가 배치 전체를 끊지 않도록
+          item.update(used_db=db_name, error={"message": "처리 실패", "error": str(e)})
+          error = e
+        item["timings"] = {"db_ms": db_ms, "wait_ms": round((t0 - queued) * 1000, 1), "run_ms": ms(t1)}
+        if error is not None:
+          log_failed(question, db_name, str(error), item["timings"], usage, selector)
+        return item
+
+    failed = 0
+    tasks = [asyncio.create_task(run(i, q)) for i, q in enumerate(req.questions)]
+    try:
+      for next_done in asyncio.as_completed(tasks):
+        item = await next_done
+        if "error" in item:
+          failed += 1
+        yield _ndjson(item)
+    finally:
+      for task in tasks:
+        task.cancel()
+    summary = {
+      "batch": batch_id,
+      "count": len(req.questions),
+      "failed": failed,
+      "concurrency": concurrency,
+      "by_db": by_db,
+      "total_ms": ms(started),
+    }
+    yield _ndjson({"done": True, **summary})
+    logger.log_query({"event": "batch_done", **summary})
+
+  return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _sse(event: str, data: Any) -> str:
+  body = json.dumps(jsonable_encoder(data), ensure_ascii=False)
+  return f"event: {event}\ndata: {body}\n\n"
+
+
+@router.post("/query/stream")
+async def query_stream(req: QueryRequest) -> StreamingResponse:
+  """Same pipeline as /query, emitted as server-sent events.
+
+  Events: `db`, `sql`, `rows`, `token` (answer chunks), then `done` with
+  timings (ms since request start, incl. time-to-first-token) or `error`.
+  """
+  from ..main import db_manager as dm
+  from ..main import prompt_manager as pm
+  from ..main import app_logger as logger
+  from ..main import llm_client as lm
+  from ..main import sql_cache as cache
+  from ..main import db_router
+  from ..main import schema_retriever
+  from ..main import value_profiler
+  from ..main import example_index
+  from ..main import sql_validator
+
+  selector = DBSelector(pm, dm, lm, db_router)
+  sqlgen = SQLGenerator(pm, lm, schema_retriever, value_profiler, example_index)
+  ansg = AnswerGenerator(pm, lm)
+
+  async def events() -> AsyncIterator[str]:
+    timer = StageTimer()
+    usage = track_usage()
+
+    db_name: str | None = None
+    sql: str | None = None
+    try:
+      db_name, db_cached = await _resolve_db(selector, cache, req.question)
+      timer.mark("db_ms")
+      yield _sse("db", {"used_db": db_name, "cached": db_cached})
+
+      sql, base_prompt, sql_cached = await _resolve_sql(sqlgen, cache, req.question, db_name)
+      timer.mark("sql_ms")
+      yield _sse("sql", {"sql": sql, "cached": sql_cached})
+
+      try:
+        candidates = None if sql_cached else sqlgen.candidates
+        result = await _execute_with_retry(dm, sqlgen, sql_validator, db_name, sql, base_prompt, candidates=candidates)
+      except SQLExecutionFailed as e:
+        if sql_cached:
+          cache.discard_sql(req.question, db_name, sqlgen.schema_fingerprint(db_name))
+        logger.log_query({
+          "event": "query_failed",
+          "question": req.question,
+          "db": db_name,
+          "sql": e.sql,
+          "error": e.error,
+          "retry": e.retry,
+          "db_selection": selector.decision,
+          "stream": True,
+          "timings": timer.timings,
+          "tokens": usage,
+        })
+        yield _sse("error", {
+          "message": "SQL 실행 실패",
+          "error": e.error,
+          "sql": e.sql,
+          "db": db_name,
+        })
+        return
+      timer.mark("rows_ms")
+      sql, rows, retry = result.sql, result.rows, result.retry
+      _remember(selector, sqlgen, cache, req.question, db_name, result.generated_sql)
+      if retry is not None:
+        yield _sse("sql", {"sql": sql, "retried": True})
+      elif result.race is not None:
+        # 경합에서 이긴 후보 (첫 sql 이벤트는 최다 득표 후보)
+        yield _sse("sql", {"sql": sql, "candidates": result.race["candidates"]})
+      yield _sse("rows", {"rows": rows, "row_count": len(rows), "truncated": result.truncated})
+
+      chunks: list[str] = []
+      with _stage("answer", db_name):
+        async for chunk in ansg.generate_stream(req.question, db_name, sql, rows, result.truncated):
+          if not chunks:
+            timer.mark("ttft_ms")
+          chunks.append(chunk)
+          yield _sse("token", {"text": chunk})
+      timer.mark("total_ms")
+      answer = "".join(chunks).strip()
+      yield _sse("done", {"answer": answer, "timings": timer.timings})
+    except Exception as e:
+      # LLM/전송 오류, 타임아웃, 알 수 없는 DB 등: 헤더는 이미 보냈으므로 error 이벤트로 끝냄
+      logger.log_query({
+        "event": "query_failed",
+        "question": req.question,
+        "db": db_name,
+        "sql": sql,
+        "error": str(e),
+        "db_selection": selector.decision,
+        "stream": True,
+        "timings": timer.timings,
+        "tokens": usage,
+      })
+      yield _sse("error", {"message": "처리 실패", "error": str(e), "sql": sql, "db": db_name})
+      return
+
+    payload = {
+      "event": "query_succeeded",
+      "question": req.question,
+      "db": db_name,
+      "sql": sql,
+      "generated_sql": result.generated_sql,
+      "retried": retry is not None,
+      "row_count": len(rows),
+      "truncated": result.truncated,
+      "answer": answer,
+      "cache": {"db": db_cached, "sql": sql_cached},
+      "db_selection": selector.decision,
+      "sql_prompt": sqlgen.prompt_stats,
+      "answer_prompt": ansg.prompt_stats,
+      "stream": True,
+      "timings": timer.timings,
+      "tokens": usage,
+    }
+    if retry is not None:
+      payload["retry"] = retry
+    if result.race is not None:
+      payload["sql_candidates"] = result.race
+    logger.log_query(payload)
+
+  return StreamingResponse(
+    events(),
+    media_type="text/event-stream",
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+  )
+
+
+def _ndjson(data: Any) -> str:
+  return json.dumps(data, ensure_ascii=False, default=_json_default) + "\n"
+
+
+@router.post("/query/rows")
+async def query_rows(req: QueryRequest) -> StreamingResponse:
+  """Full result of the generated SQL as NDJSON, without an answer.
+
+  Rows are streamed batch by batch from an unbuffered cursor and never
+  materialized. Lines: `{"used_db", "sql"}`, one object per row, then
+  `{"done": true, "row_count"}` (or `{"error"}`).
+  """
+  from ..main import db_manager as dm
+  from ..main import prompt_manager as pm
+  from ..main import app_logger as logger
+  from ..main import llm_client as lm
+  from ..main import sql_cache as cache
+  from ..main import db_router
+  from ..main import schema_retriever
+  from ..main import value_profiler
+  from ..main import example_index
+  from ..main import sql_validator
+
+  selector = DBSelector(pm, dm, lm, db_router)
+  sqlgen = SQLGenerator(pm, lm, schema_retriever, value_profiler, example_index)
+  batch_size = settings.rows_stream_batch_size
+
+  async def lines() -> AsyncIterator[str]:
+    timer = StageTimer()
+    usage = track_usage()
+
+    def log_failed(db_name: str | None, sql: str | None, error: str, **extra: Any) -> None:
+      logger.log_query({
+        "event": "query_failed",
+        "question": req.question,
+        "db": db_name,
+        "sql": sql,
+        "error": error,
+        **extra,
+        "db_selection": selector.decision,
+        "mode": "rows",
+        "timings": timer.timings,
+        "tokens": usage,
+      })
+
+    db_name: str | None = None
+    try:
+      db_name, _ = await _resolve_db(selector, cache, req.question)
+      timer.mark("db_ms")
+      sql, base_prompt, sql_cached = await _resolve_sql(sqlgen, cache, req.question, db_name)
+      timer.mark("sql_ms")
+    except Exception as e:
+      # DB 선택/SQL 생성 단계의 LLM/전송 오류: 헤더는 이미 보냈으므로 오류 줄로 끝냄
+      log_failed(db_name, None, str(e))
+      yield _ndjson({"error": str(e), "message": "처리 실패", "used_db": db_name})
+      return
+
+    # 첫 배치를 받아야 SQL 오류 여부를 알 수 있으므로, 그 전까지만 1회 재시도 (전체 결과라 LIMIT 주입 없음)
+    schema = pm.get_db_structure_prompt(db_name)
+    retry: dict[str, Any] | None = None
+    try:
+      sql, _ = sql_validator.check(db_name, sql, schema)
+      stream = dm.astream(db_name, sql, batch_size=batch_size)
+      with _stage("execution", db_name):
+        first = await anext(stream, [])
+    except Exception as e:
+      if sql_cached:
+        cache.discard_sql(req.question, db_name, sqlgen.schema_fingerprint(db_name))
+      local = isinstance(e, SQLValidationError)
+      retry = {"initial_error": str(e), "prevalidated": local, "retry_sql": None}
+      try:
+        with _stage("sql_retry", db_name):
+          sql = await sqlgen.retry_with_error(base_prompt, str(e))
+        retry["retry_sql"] = sql
+        sql, warnings = sql_validator.check(db_name, sql, schema, final=True)
+        stream = dm.astream(db_name, sql, batch_size=batch_size)
+        with _stage("execution", db_name):
+          first = await anext(stream, [])
+        sql_validator.record_retry(local, fixed=True)
+        _count_retry(db_name, local, fixed=True)
+        if warnings:
+          sql_validator.record_override()
+      except Exception as e2:
+        sql_validator.record_retry(local, fixed=False)
+        _count_retry(db_name, local, fixed=False)
+        retry["retry_error"] = str(e2)
+        log_failed(db_name, sql, str(e2), retry=retry)
+        yield _ndjson({"error": str(e2), "message": "SQL 실행 실패", "sql": sql, "used_db": db_name})
+        return
+
+    timer.mark("rows_ms")
+    yield _ndjson({"used_db": db_name, "sql": sql, "retried": retry is not None})
+    count = 0
+    try:
+      for row in first:
+        yield _ndjson(row)
+      count += len(first)
+      async for batch in stream:
+        yield "".join(_ndjson(row) for row in batch)
+        count += len(batch)
+    except Exception as e:
+      # 일부 행을 보낸 뒤의 실패 (연결 끊김, 실행 시간 초과 등)
+      log_failed(db_name, sql, str(e), row_count=count, retry=retry)
+      yield _ndjson({"error": str(e), "row_count": count})
+      return
+    finally:
+      await stream.aclose()
+    yield _ndjson({"done": True, "row_count": count})
+    timer.mark("total_ms")
+
+    _remember(selector, sqlgen, cache, req.question, db_name, sql)
+    payload = {
+      "event": "query_succeeded",
+      "question": req.question,
+      "db": db_name,
+      "sql": sql,
+      "retried": retry is not None,
+      "row_count": count,
+      "db_selection": selector.decision,
+      "mode": "rows",
+      "timings": timer.timings,
+      "tokens": usage,
+    }
+    if retry is not None:
+      payload["retry"] = retry
+    logger.log_query(payload)
 
+  return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -1,45 +1,51 @@
 from __future__ import annotations
 
-import json
-from datetime import date, datetime
-from decimal import Decimal
-from ..models.llm_client import LLMClient
+from typing import Any, AsyncIterator
+from ..models.db_manager import ColumnarRows
+from ..models.llm_client import LLMClient, DEFAULT_SYSTEM_PROMPT
 from .prompt_manager import PromptManager
+from .result_summarizer import ResultSummarizer
+from .lexical import estimate_tokens
 
 
 class AnswerGenerator:
-  def __init__(self, prompt_manager: PromptManager) -> None:
-    self.lm = LLMClient()
+  def __init__(self, prompt_manager: PromptManager, llm_client: LLMClient | None = None, summarizer: ResultSummarizer | None = None) -> None:
+    self.lm = llm_client or LLMClient()
     self.pm = prompt_manager
+    self.summarizer = summarizer or ResultSummarizer()
+    # rows_mode / token estimates of the last prompt, for logs
+    self.prompt_stats: dict[str, Any] = {}
 
-  def _convert_dates_to_strings(self, obj):
-    """날짜 타입과 Decimal 타입을 문자열로 변환하여 JSON 직렬화 가능하게 만듭니다."""
-    if isinstance(obj, (date, datetime)):
-      return str(obj)
-    elif isinstance(obj, Decimal):
-      return float(obj)  # Decimal을 float으로 변환
-    elif isinstance(obj, dict):
-      return {key: self._convert_dates_to_strings(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-      return [self._convert_dates_to_strings(item) for item in obj]
-    else:
-      return obj
-
-  async def generate(self, question: str, db_name: str, sql: str, rows: list[dict]) -> str:
+  def _build_prompt(self, question: str, db_name: str, sql: str, rows: list[dict] | ColumnarRows, truncated: bool = False) -> tuple[str, str]:
+    """Returns (system, user); the answer rules form the stable prefix."""
     rules = self.pm.load_template("answer")
-    preview_rows = rows[:50]  # guard
-    
-    # 날짜 타입을 문자열로 변환하여 JSON 직렬화 가능하게 만듭니다
-    serializable_rows = self._convert_dates_to_strings(preview_rows)
-    rows_json = json.dumps(serializable_rows, ensure_ascii=False)
-    prompt = (
-      f"{rules}\n\n"
+    rows_text, self.prompt_stats = self.summarizer.summarize(rows)
+    if self.prompt_stats["rows_mode"] == "raw":
+      section = f"[쿼리 결과]\n{rows_text}"
+    else:
+      section = (
+        f"[쿼리 결과 요약]\n{rows_text}\n"
+        f"(row_count와 컬럼별 min/max/sum/mean/top은 전체 결과 기준의 정확한 값이며, head/tail은 일부 행 예시입니다.)"
+      )
+    if truncated:
+      section += f"\n(결과가 {len(rows)}행에서 잘렸습니다. 전체 건수는 이보다 많으며 집계도 조회된 행 기준입니다.)"
+    system = f"{DEFAULT_SYSTEM_PROMPT}\n\n{rules}"
+    user = (
       f"[질문]\n{question}\n\n"
       f"[사용 DB]\n{db_name}\n\n"
       f"[생성된 SQL]\n{sql}\n\n"
-      f"[쿼리 결과 샘플]\n{rows_json}\n\n"
+      f"{section}\n\n"
       f"출력 형식: 사용자에게 보여줄 한국어 답변만 출력"
     )
-    text = await self.lm.generate(prompt, temperature=0.2)
+    self.prompt_stats["prompt_tokens"] = estimate_tokens(system) + estimate_tokens(user)
+    return system, user
+
+  async def generate(self, question: str, db_name: str, sql: str, rows: list[dict] | ColumnarRows, truncated: bool = False) -> str:
+    system, prompt = self._build_prompt(question, db_name, sql, rows, truncated)
+    text = await self.lm.generate(prompt, temperature=0.2, system=system, stage="answer")
     return text.strip()
 
+  async def generate_stream(self, question: str, db_name: str, sql: str, rows: list[dict] | ColumnarRows, truncated: bool = False) -> AsyncIterator[str]:
+    system, prompt = self._build_prompt(question, db_name, sql, rows, truncated)
+    async for chunk in self.lm.stream(prompt, temperature=0.2, system=system, stage="answer"):
+      yield chunk
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import re
+from typing import Any
+from ..config import settings
+from ..models.db_manager import DatabaseManager
+from .prompt_manager import PromptManager
+from .lexical import BM25Index
+
+
+# 스키마 프롬프트 라인: "- Table: farm", "  - name: varchar NULLABLE=YES [PRI]"
+_TABLE_LINE = re.compile(r"^- Table:\s*(\S+)")
+_COLUMN_LINE = re.compile(r"^\s+-\s*([^:\s]+):")
+
+
+class LexicalDBRouter:
+  """BM25 over character n-grams, one document per DB.
+
+  Each document is the DB description, its table/column names from the
+  generated schema prompt and the lines of `sql_generation__{db}.txt` that are
+  not in the common template (the DB-specific keyword mapping).
+  """
+
+  def __init__(self) -> None:
+    self._index = BM25Index()
+
+  def _document(self, db: str, db_manager: DatabaseManager, prompt_manager: PromptManager) -> str:
+    parts = [db, db_manager.get_db_description(db)]
+    for line in prompt_manager.get_db_structure_prompt(db).splitlines():
+      m = _TABLE_LINE.match(line) or _COLUMN_LINE.match(line)
+      if m:
+        parts.append(m.group(1))
+    common = set(prompt_manager.load_template("sql_generation").splitlines())
+    specific = prompt_manager.load_template("sql_generation", db_name=db)
+    parts.extend(line for line in specific.splitlines() if line not in common)
+    return "\n".join(parts)
+
+  def build(self, db_manager: DatabaseManager, prompt_manager: PromptManager) -> None:
+    self._index.build({
+      db: self._document(db, db_manager, prompt_manager) for db in db_manager.list_db_names()
+    })
+
+  @property
+  def ready(self) -> bool:
+    return len(self._index) > 0
+
+  def score(self, question: str) -> dict[str, float]:
+    return self._index.score(question)
+
+  def route(self, question: str) -> tuple[str | None, dict[str, Any]]:
+    """Return (db or None, decision info). None means: ask the LLM."""
+    scores = self.score(question)
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    info: dict[str, Any] = {
+      "scores": {db: round(s, 3) for db, s in ranked},
+      "threshold": settings.db_router_min_margin,
+    }
+    # too little lexical evidence: a single weak n-gram hit gives margin 1.0
+    if len(ranked) < 2 or ranked[0][1] < max(settings.db_router_min_score, 1e-9):
+      info["margin"] = 0.0
+      return None, info
+    top, second = ranked[0][1], ranked[1][1]
+    margin = (top - second) / top
+    info["margin"] = round(margin, 4)
+    if margin >= settings.db_router_min_margin:
+      return ranked[0][0], info
+    return None, info
@@ -1,33 +1,67 @@
 from __future__ import annotations
 
-from ..models.llm_client import LLMClient
+from typing import Any
+from ..config import settings
+from ..models.llm_client import LLMClient, DEFAULT_SYSTEM_PROMPT
 from ..models.db_manager import DatabaseManager
 from .prompt_manager import PromptManager
+from .sql_cache import fingerprint
+from .db_router import LexicalDBRouter
 
 
 class DBSelector:
-  def __init__(self, prompt_manager: PromptManager, db_manager: DatabaseManager) -> None:
-    self.lm = LLMClient()
+  def __init__(self, prompt_manager: PromptManager, db_manager: DatabaseManager, llm_client: LLMClient | None = None, router: LexicalDBRouter | None = None) -> None:
+    self.lm = llm_client or LLMClient()
     self.pm = prompt_manager
     self.dbs = db_manager
+    self.router = router
+    # how the last choice was made (single / cache / index / llm), for logs
+    self.decision: dict[str, Any] = {}
+
+  def _options_text(self, names: list[str]) -> str:
+    options_lines = []
+    for n in names:
+      desc = self.dbs.get_db_description(n)
+      options_lines.append(f"- {n}: {desc}")
+    return "\n".join(options_lines)
+
+  @staticmethod
+  def stable_prefix(rules: str, options: str) -> str:
+    return f"{DEFAULT_SYSTEM_PROMPT}\n\n{rules}\n\nDB 후보:\n{options}"
+
+  async def warm_up(self) -> None:
+    names = self.dbs.list_db_names()
+    if len(names) == 1:
+      return
+    system = self.stable_prefix(self.pm.load_template("db_selection"), self._options_text(names))
+    await self.lm.warm_up(system)
+
+  def fingerprint(self) -> str:
+    """Hash of everything the selection prompt depends on besides the question."""
+    names = self.dbs.list_db_names()
+    return fingerprint(self.pm.load_template("db_selection"), self._options_text(names))
 
   async def choose_database(self, question: str) -> str:
     names = self.dbs.list_db_names()
     if len(names) == 1:
+      self.decision = {"path": "single"}
       return names[0]
+    self.decision = {"path": "llm"}
+    if self.router is not None and settings.db_router_enabled and self.router.ready:
+      routed, info = self.router.route(question)
+      if routed in names:
+        self.decision = {"path": "index", **info}
+        return routed
+      self.decision = {"path": "llm", **info}
     rules = self.pm.load_template("db_selection")
-    options_lines = []
-    for n in names:
-      desc = self.dbs.get_db_description(n)
-      options_lines.append(f"- {n}: {desc}")
-    options = "\n".join(options_lines)
+    options = self._options_text(names)
+    # 규칙 + DB 후보는 요청과 무관한 고정 prefix (prefix cache 재사용)
+    system = self.stable_prefix(rules, options)
     prompt = (
-      f"{rules}\n\n"
       f"질문:\n{question}\n\n"
-      f"DB 후보:\n{options}\n\n"
       f"출력 형식: 선택한 DB의 이름만 단일 라인으로 출력"
     )
-    text = await self.lm.generate(prompt, temperature=0.0)
+    text = await self.lm.generate(prompt, temperature=0.0, system=system, stage="db_selection")
     chosen = text.strip().splitlines()[0].strip()
     # Normalize to known names
     for n in names:
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator
+from ..config import settings
+from . import logger as logger_module
+from . import prompt_manager as prompt_module
+from .lexical import char_ngrams, estimate_tokens
+from .sql_cache import normalize_question
+
+
+# 저장 형식이 바뀌면 올려서 기존 파일을 무시 (로그에서 다시 만듦)
+EXAMPLES_VERSION = 2
+EXAMPLES_FILE = "examples.json"
+# SQLValidator가 붙인 결과 행 상한 (generated_sql이 없는 이전 로그용; 생성 SQL은 한 줄이라 개행 LIMIT은 주입분)
+_INJECTED_LIMIT = re.compile(r"\nLIMIT \d+\s*$")
+
+
+class _DBExamples:
+  """Inverted index over one DB's questions (character n-grams, BM25 weights).
+
+  Postings are plain doc-id lists (tf is almost always 1 for short questions,
+  so BM25 reduces to idf(g) * length norm of the doc). A lookup walks the
+  most recent postings of each query n-gram (about EXAMPLES_MAX_POSTINGS doc
+  ids in total; rare n-grams are walked in full) and rescores the best candidates
+  with every query n-gram, so its cost does not grow with the index size.
+  """
+
+  k1 = 1.2
+  b = 0.75
+
+  def __init__(self) -> None:
+    self.questions: list[str] = []
+    self.sqls: list[str] = []
+    # 로그의 ts (ISO 문자열, 정렬 가능)
+    self.stored_at: list[str] = []
+    self.lengths: list[int] = []
+    self.postings: dict[str, list[int]] = {}
+    self.by_key: dict[str, int] = {}
+    self.total_len = 0
+
+  def __len__(self) -> int:
+    return len(self.questions)
+
+  def add(self, question: str, sql: str, stored_at: str) -> None:
+    key = normalize_question(question)
+    doc = self.by_key.get(key)
+    if doc is not None:
+      # 같은 질문이 다시 성공하면 최신 SQL로 교체 (회전된 파일을 다시 읽어도 오래된 SQL로 돌아가지 않음)
+      if stored_at >= self.stored_at[doc]:
+        self.sqls[doc] = sql
+        self.stored_at[doc] = stored_at
+      return
+    grams = set(char_ngrams(question))
+    doc = len(self.questions)
+    self.questions.append(question)
+    self.sqls.append(sql)
+    self.stored_at.append(stored_at)
+    self.lengths.append(len(grams))
+    self.total_len += len(grams)
+    self.by_key[key] = doc
+    for g in grams:
+      self.postings.setdefault(g, []).append(doc)
+
+  def search(self, question: str, k: int, max_postings: int) -> list[tuple[float, int]]:
+    """Top-k (similarity, doc); similarity is the BM25 score over the score of
+    a doc containing every query n-gram (1.0 at average length)."""
+    n = len(self.questions)
+    if not n:
+      return []
+    idf: dict[str, float] = {}
+    for g in set(char_ngrams(question)):
+      docs = self.postings.get(g)
+      if docs:
+        idf[g] = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+    if not idf:
+      return []
+    # 후보 생성: n-gram마다 최근 문서 max_postings / n-gram 수 개까지만 (드문 n-gram은 전부, 흔한 n-gram은 길고 idf가 작음)
+    cap = max(50, max_postings // len(idf))
+    acc: dict[int, float] = {}
+    for g, w in idf.items():
+      for d in self.postings[g][-cap:]:
+        acc[d] = acc.get(d, 0.0) + w
+    # 후보만 모든 질문 n-gram으로 다시 채점 + 길이 정규화 (tf = 1: (k1 + 1) / (1 + k1 * norm))
+    avg_len = self.total_len / n
+    best = sum(idf.values())
+    scored: list[tuple[float, int]] = []
+    for d in heapq.nlargest(k * 4, acc, key=acc.__getitem__):
+      grams = set(char_ngrams(self.questions[d]))
+      s = sum(w for g, w in idf.items() if g in grams)
+      norm = 1 - self.b + self.b * self.lengths[d] / avg_len
+      scored.append((s * (self.k1 + 1) / (1 + self.k1 * norm), d))
+    scored.sort(reverse=True)
+    return [(round(s / best, 3), d) for s, d in scored[:k]]
+
+
+class ExampleIndex:
+  """Verified question -> SQL pairs mined from the query logs, per DB.
+
+  `scan_logs` reads only what was appended since the last scan (per-file
+  byte offsets; rotated `.gz` files are read once) and keeps successful
+  queries that returned rows. Entries and offsets are persisted in
+  `examples.json` so a restart does not re-read old logs. `render` returns
+  the top EXAMPLES_TOP_K nearest pairs as a prompt block under a token budget.
+  """
+
+  def __init__(self) -> None:
+    self._dbs: dict[str, _DBExamples] = {}
+    # 파일 이름 -> [inode, 읽은 바이트 수]
+    self._offsets: dict[str, list[int]] = {}
+    self._lock = threading.Lock()
+    self.stats_counters = {"scans": 0, "lines_read": 0, "added": 0, "searches": 0}
+
+  @staticmethod
+  def _store_path() -> Path:
+    return prompt_module.GENERATED_DIR / EXAMPLES_FILE
+
+  def load(self) -> None:
+    """Restore entries and log offsets saved by `save`."""
+    try:
+      doc = json.loads(self._store_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+      return
+    if doc.get("version") != EXAMPLES_VERSION:
+      return
+    with self._lock:
+      self._dbs = {}
+      for db, items in doc.get("entries", {}).items():
+        index = self._dbs[db] = _DBExamples()
+        for question, sql, stored_at in items:
+          index.add(question, sql, stored_at)
+      self._offsets = doc.get("offsets", {})
+
+  def save(self) -> None:
+    with self._lock:
+      doc = {
+        "version": EXAMPLES_VERSION,
+        "offsets": dict(self._offsets),
+        "entries": {
+          db: [[q, s, t] for q, s, t in zip(index.questions, index.sqls, index.stored_at)]
+          for db, index in self._dbs.items()
+        },
+      }
+    path = self._store_path()
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+  def scan_logs(self) -> int:
+    """Index query_succeeded records appended to the logs since the last scan. Returns added pairs."""
+    log_dir = logger_module.LOG_DIR
+    if not log_dir.is_dir():
+      return 0
+    added = 0
+    seen: set[str] = set()
+    # 크기 회전은 이름만 바꾸므로 ({day}.log -> {day}.{n}.log) 읽은 위치를 inode로도 찾음
+    by_inode = {ino: offset for ino, offset in self._offsets.values()}
+    for path in sorted(log_dir.glob("*.log")) + sorted(log_dir.glob("*.log.gz")):
+      seen.add(path.name)
+      try:
+        st = path.stat()
+      except FileNotFoundError:
+        continue
+      prev = self._offsets.get(path.name)
+      done = prev is not None and prev[0] == st.st_ino
+      pairs: list[tuple[str, str, str, str]] = []
+      if path.suffix == ".gz":
+        # gzip은 닫힌 파일이므로 한 번만 읽음 (이미 읽은 질문은 add에서 합쳐짐)
+        if not done:
+          pairs = list(self._read_gzip(path))
+        offset = st.st_size
+      else:
+        # 새 파일 또는 이름이 바뀐 파일이면 inode로 이전 offset을 찾음
+        offset = prev[1] if done else by_inode.get(st.st_ino, 0)
+        if st.st_size > offset:
+          pairs, offset = self._read_plain(path, offset)
+      with self._lock:
+        for db, question, sql, stored_at in pairs:
+          index = self._dbs.get(db)
+          if index is None:
+            index = self._dbs[db] = _DBExamples()
+          before = len(index)
+          index.add(question, sql, stored_at)
+          added += len(index) - before
+        self._offsets[path.name] = [st.st_ino, offset]
+    with self._lock:
+      # 지워진 로그 파일의 offset은 버림
+      self._offsets = {name: v for name, v in self._offsets.items() if name in seen}
+      self._trim()
+      self.stats_counters["scans"] += 1
+      self.stats_counters["added"] += added
+    return added
+
+  def _trim(self) -> None:
+    """Keep the EXAMPLES_MAX_PER_DB most recent pairs per DB (rebuilds that DB's index)."""
+    limit = settings.examples_max_per_db
+    for db, index in list(self._dbs.items()):
+      if len(index) <= limit:
+        continue
+      keep = sorted(range(len(index)), key=lambda d: index.stored_at[d])[-limit:]
+      rebuilt = _DBExamples()
+      for d in sorted(keep):
+        rebuilt.add(index.questions[d], index.sqls[d], index.stored_at[d])
+      self._dbs[db] = rebuilt
+
+  def _read_plain(self, path: Path, offset: int) -> tuple[list[tuple[str, str, str, str]], int]:
+    with path.open("rb") as f:
+      f.seek(offset)
+      data = f.read()
+    # 마지막 줄이 아직 쓰이는 중이면 다음 스캔에서 읽음
+    end = data.rfind(b"\n") + 1
+    return list(self._parse(data[:end].splitlines())), offset + end
+
+  def _read_gzip(self, path: Path) -> Iterator[tuple[str, str, str, str]]:
+    try:
+      with gzip.open(path, "rb") as f:
+        yield from self._parse(f)
+    except (OSError, EOFError):
+      return
+
+  def _parse(self, lines: Any) -> Iterator[tuple[str, str, str, str]]:
+    for line in lines:
+      self.stats_counters["lines_read"] += 1
+      # 대부분의 줄은 JSON 파싱 없이 거름
+      if b'"query_succeeded"' not in line:
+        continue
+      try:
+        record = json.loads(line)
+      except ValueError:
+        continue
+      if record.get("event") != "query_succeeded" or not record.get("row_count"):
+        continue
+      # 실행된 sql에는 주입된 LIMIT이 붙어 있으므로 모델이 만든 SQL을 색인
+      sql = record.get("generated_sql") or _INJECTED_LIMIT.sub("", record.get("sql") or "")
+      db, question = record.get("db"), record.get("question")
+      if db and question and sql:
+        yield db, question, sql, str(record.get("ts") or "")
+
+  def search(self, db: str, question: str, k: int) -> list[tuple[float, str, str]]:
+    """Top-k (similarity, question, sql) for `db`."""
+    with self._lock:
+      index = self._dbs.get(db)
+      if index is None:
+        return []
+      self.stats_counters["searches"] += 1
+      hits = index.search(question, k, settings.examples_max_postings)
+      return [(s, index.questions[d], index.sqls[d]) for s, d in hits]
+
+  def render(self, db: str, question: str, token_budget: int) -> tuple[str, dict[str, Any]]:
+    """(prompt block, info) with the nearest verified pairs above EXAMPLES_MIN_SIMILARITY."""
+    started = time.perf_counter()
+    hits = [h for h in self.search(db, question, settings.examples_top_k) if h[0] >= settings.examples_min_similarity]
+    lines: list[str] = []
+    used = 0
+    for _, q, sql in hits:
+      block = f"질문: {q}\nSQL: {sql}"
+      cost = estimate_tokens(block)
+      if used + cost > token_budget:
+        continue
+      lines.append(block)
+      used += cost
+    info = {
+      "examples": len(lines),
+      "example_tokens": used,
+      "example_similarity": hits[0][0] if hits else None,
+      "example_lookup_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+    if not lines:
+      return "", info
+    return "[유사 질문 예시] (이 DB에서 실행에 성공한 SQL)\n" + "\n\n".join(lines), info
+
+  def stats(self) -> dict[str, Any]:
+    with self._lock:
+      return {
+        **self.stats_counters,
+        "databases": {db: len(index) for db, index in self._dbs.items()},
+        "files": len(self._offsets),
+      }
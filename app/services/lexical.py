@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+
+
+_WORD = re.compile(r"[0-9a-zA-Z가-힣]+")
+
+
+def char_ngrams(text: str, sizes: tuple[int, ...] = (2, 3)) -> list[str]:
+  """Word-bounded character n-grams; works for Korean without a tokenizer.
+
+  Identifiers are also split on `_` so `herd_history` matches `herd`.
+  """
+  grams: list[str] = []
+  for word in _WORD.findall(text.lower().replace("_", " ")):
+    if len(word) < min(sizes):
+      grams.append(word)
+      continue
+    for n in sizes:
+      for i in range(len(word) - n + 1):
+        grams.append(word[i:i + n])
+  return grams
+
+
+class BM25Index:
+  """Okapi BM25 over character n-grams for a small, static set of documents."""
+
+  k1 = 1.2
+  b = 0.75
+
+  def __init__(self, docs: dict[str, str] | None = None) -> None:
+    self._tf: dict[str, Counter[str]] = {}
+    self._len: dict[str, int] = {}
+    self._idf: dict[str, float] = {}
+    self._avg_len = 0.0
+    if docs:
+      self.build(docs)
+
+  def build(self, docs: dict[str, str]) -> None:
+    tf = {key: Counter(char_ngrams(text)) for key, text in docs.items()}
+    df: Counter[str] = Counter()
+    for counts in tf.values():
+      df.update(counts.keys())
+    n_docs = len(tf)
+    self._idf = {g: math.log(1 + (n_docs - d + 0.5) / (d + 0.5)) for g, d in df.items()}
+    self._tf = tf
+    self._len = {key: sum(c.values()) for key, c in tf.items()}
+    self._avg_len = (sum(self._len.values()) / n_docs) if n_docs else 0.0
+
+  def __len__(self) -> int:
+    return len(self._tf)
+
+  def score(self, query: str) -> dict[str, float]:
+    grams = set(char_ngrams(query))
+    scores: dict[str, float] = {}
+    for key, counts in self._tf.items():
+      norm = self.k1 * (1 - self.b + self.b * self._len[key] / (self._avg_len or 1))
+      total = 0.0
+      for g in grams:
+        f = counts.get(g)
+        if f:
+          total += self._idf[g] * f * (self.k1 + 1) / (f + norm)
+      scores[key] = total
+    return scores
+
+
+def estimate_tokens(text: str) -> int:
+  """Rough token count without a tokenizer: ~4 ASCII chars or ~1 Hangul syllable per token."""
+  ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+  return ascii_chars // 4 + (len(text) - ascii_chars)
@@ -2,17 +2,47 @@ from __future__ import annotations
 
 from pathlib import Path
 from datetime import datetime, timezone
+import gzip
 import json
-from typing import Any
+import queue
+import shutil
+import threading
+import time
+from typing import Any, IO
+from ..config import settings
 
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 LOG_DIR = BASE_DIR / "logs"
 
+# writer 스레드 종료 신호
+_STOP = object()
+
 
 class AppLogger:
+  """JSON-lines query log written by a background thread.
+
+  `log_query` only serializes the record and puts it on a bounded queue; the
+  writer thread batches lines (flush at LOG_BATCH_SIZE lines or every
+  LOG_FLUSH_INTERVAL seconds), keeps the day's file open, rotates by day and
+  by LOG_MAX_BYTES (`{day}.log` -> `{day}.{n}.log`) and optionally gzips
+  closed files. When the queue is full the record is dropped (counted) or the
+  caller blocks, per LOG_QUEUE_FULL_POLICY. `close()` drains and flushes.
+  """
+
   def __init__(self) -> None:
     LOG_DIR.mkdir(parents=True, exist_ok=True)
+    self.block_when_full = settings.log_queue_full_policy == "block"
+    self.batch_size = max(1, settings.log_batch_size)
+    self.flush_interval = settings.log_flush_interval
+    self.max_bytes = settings.log_max_bytes
+    self.compress = settings.log_gzip
+    self._queue: queue.Queue[Any] = queue.Queue(maxsize=max(1, settings.log_queue_size))
+    self._file: IO[str] | None = None
+    self._path: Path | None = None
+    self._stats = {"written": 0, "dropped": 0, "batches": 0, "rotations": 0, "errors": 0}
+    self._thread: threading.Thread | None = None
+    self._lock = threading.Lock()
 
   def _log_path_for_today(self) -> Path:
     day = datetime.now(timezone.utc).astimezone().strftime("%Y-%m-%d")
@@ -24,8 +54,116 @@ class AppLogger:
       "ts": datetime.now(timezone.utc).astimezone().isoformat(),
       **payload,
     }
-    line = json.dumps(record, ensure_ascii=False)
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    self._ensure_thread()
+    if self.block_when_full:
+      self._queue.put(line)
+      return
+    try:
+      self._queue.put_nowait(line)
+    except queue.Full:
+      self._stats["dropped"] += 1
+
+  def _ensure_thread(self) -> None:
+    if self._thread is not None:
+      return
+    with self._lock:
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._run, name="app-logger", daemon=True)
+        self._thread.start()
+
+  def close(self) -> None:
+    """Write everything queued so far and stop the writer thread."""
+    with self._lock:
+      thread, self._thread = self._thread, None
+    if thread is None:
+      return
+    self._queue.put(_STOP)
+    thread.join()
+
+  def stats(self) -> dict[str, Any]:
+    return {
+      **self._stats,
+      "queued": self._queue.qsize(),
+      "queue_size": self._queue.maxsize,
+      "policy": "block" if self.block_when_full else "drop",
+    }
+
+  def _run(self) -> None:
+    stop = False
+    while not stop:
+      batch: list[str] = []
+      # 첫 줄은 무기한 대기, 이후 크기/시간 중 먼저 도달한 쪽에서 flush
+      item = self._queue.get()
+      deadline = time.monotonic() + self.flush_interval
+      while True:
+        if item is _STOP:
+          stop = True
+          break
+        batch.append(item)
+        if len(batch) >= self.batch_size:
+          break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+          break
+        try:
+          item = self._queue.get(timeout=remaining)
+        except queue.Empty:
+          break
+      if batch:
+        self._write(batch)
+    self._close_file(compress=False)
+
+  def _write(self, lines: list[str]) -> None:
+    try:
+      f = self._open()
+      f.write("\n".join(lines) + "\n")
+      f.flush()
+      self._stats["written"] += len(lines)
+      self._stats["batches"] += 1
+      if self.max_bytes > 0 and f.tell() >= self.max_bytes:
+        self._rotate()
+    except OSError:
+      self._stats["errors"] += 1
+
+  def _open(self) -> IO[str]:
     path = self._log_path_for_today()
-    with path.open("a", encoding="utf-8") as f:
-      f.write(line + "\n")
+    if self._file is not None and path != self._path:
+      # 날짜가 바뀜: 전날 파일을 닫고 압축
+      self._close_file(compress=self.compress)
+    if self._file is None:
+      self._path = path
+      self._file = path.open("a", encoding="utf-8")
+    return self._file
+
+  def _close_file(self, compress: bool) -> None:
+    # 종료 시에는 압축하지 않음 (같은 날 재시작하면 이어서 씀)
+    if self._file is None:
+      return
+    self._file.close()
+    closed = self._path
+    self._file, self._path = None, None
+    if compress and closed is not None and closed.exists():
+      self._gzip(closed)
+
+  def _rotate(self) -> None:
+    """Size rotation: `{day}.log` -> `{day}.{n}.log` (n = next free number)."""
+    path = self._path
+    self._file.close()
+    self._file, self._path = None, None
+    n = 1
+    while (path.with_name(f"{path.stem}.{n}.log")).exists() or (path.with_name(f"{path.stem}.{n}.log.gz")).exists():
+      n += 1
+    rotated = path.with_name(f"{path.stem}.{n}.log")
+    path.rename(rotated)
+    self._stats["rotations"] += 1
+    if self.compress:
+      self._gzip(rotated)
 
+  @staticmethod
+  def _gzip(path: Path) -> None:
+    target = path.with_name(path.name + ".gz")
+    # 이미 있으면 gzip member를 이어 붙임 (gzip.open으로 읽으면 하나로 이어짐)
+    with path.open("rb") as src, gzip.open(target, "ab") as dst:
+      shutil.copyfileobj(src, dst)
+    path.unlink()
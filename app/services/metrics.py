@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
+
+
+# 초 단위 기본 버킷 (LLM 호출까지 포함하도록 60초까지)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# collector가 돌려주는 표본: (이름, 타입, 설명, [(라벨, 값)])
+Sample = tuple[str, str, str, list[tuple[dict[str, Any], float]]]
+
+
+def _escape(value: Any) -> str:
+  return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[Any]) -> str:
+  pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+  return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+  if value == float("inf"):
+    return "+Inf"
+  return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+  kind = ""
+
+  def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+    self.name = name
+    self.help = help_text
+    self.labelnames = labelnames
+    # 메트릭마다 락 하나 (DB 워커 스레드에서도 기록)
+    self._lock = threading.Lock()
+
+  def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+    return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+  def header(self) -> list[str]:
+    return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+  kind = "counter"
+
+  def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+    super().__init__(name, help_text, labelnames)
+    self._values: dict[tuple[str, ...], float] = {}
+
+  def inc(self, amount: float = 1.0, **labels: Any) -> None:
+    key = self._key(labels)
+    with self._lock:
+      self._values[key] = self._values.get(key, 0.0) + amount
+
+  def render(self) -> list[str]:
+    with self._lock:
+      items = sorted(self._values.items())
+    return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+  kind = "gauge"
+
+  def dec(self, amount: float = 1.0, **labels: Any) -> None:
+    self.inc(-amount, **labels)
+
+  def set(self, value: float, **labels: Any) -> None:
+    key = self._key(labels)
+    with self._lock:
+      self._values[key] = value
+
+
+class Histogram(_Metric):
+  kind = "histogram"
+
+  def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+    super().__init__(name, help_text, labelnames)
+    self.buckets = tuple(sorted(buckets))
+    # label key -> [bucket counts..., sum, count]
+    self._values: dict[tuple[str, ...], list[float]] = {}
+
+  def observe(self, value: float, **labels: Any) -> None:
+    key = self._key(labels)
+    with self._lock:
+      data = self._values.get(key)
+      if data is None:
+        data = self._values[key] = [0.0] * (len(self.buckets) + 2)
+      for i, bound in enumerate(self.buckets):
+        if value <= bound:
+          data[i] += 1
+          break
+      data[-2] += value
+      data[-1] += 1
+
+  @contextmanager
+  def time(self, **labels: Any) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(time.perf_counter() - started, **labels)
+
+  def render(self) -> list[str]:
+    with self._lock:
+      items = sorted((k, list(v)) for k, v in self._values.items())
+    names = (*self.labelnames, "le")
+    lines: list[str] = []
+    for key, data in items:
+      cumulative = 0.0
+      for bound, n in zip(self.buckets, data):
+        cumulative += n
+        lines.append(f"{self.name}_bucket{_labels(names, (*key, _number(bound)))} {_number(cumulative)}")
+      lines.append(f"{self.name}_bucket{_labels(names, (*key, '+Inf'))} {_number(data[-1])}")
+      lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(data[-2])}")
+      lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {_number(data[-1])}")
+    return lines
+
+
+class MetricsRegistry:
+  """In-process Prometheus metrics, rendered in the text exposition format.
+
+  Metrics are created on first use (`counter`/`gauge`/`histogram` return the
+  existing one for a known name). Values kept elsewhere (pool and cache
+  stats) are read at scrape time through `add_collector`.
+  """
+
+  def __init__(self, prefix: str = "text2sql_") -> None:
+    self.prefix = prefix
+    self._metrics: dict[str, _Metric] = {}
+    self._collectors: list[Callable[[], Iterable[Sample]]] = []
+    self._lock = threading.Lock()
+
+  def _get(self, cls: type, name: str, help_text: str, labelnames: tuple[str, ...], **kwargs: Any) -> Any:
+    full = self.prefix + name
+    metric = self._metrics.get(full)
+    if metric is None:
+      with self._lock:
+        metric = self._metrics.get(full)
+        if metric is None:
+          metric = self._metrics[full] = cls(full, help_text, labelnames, **kwargs)
+    return metric
+
+  def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+    return self._get(Counter, name, help_text, labelnames)
+
+  def gauge(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+    return self._get(Gauge, name, help_text, labelnames)
+
+  def histogram(self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return self._get(Histogram, name, help_text, labelnames, buckets=buckets)
+
+  def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+    self._collectors.append(collector)
+
+  def render(self) -> str:
+    lines: list[str] = []
+    for metric in list(self._metrics.values()):
+      lines += metric.header()
+      lines += metric.render()
+    for collector in self._collectors:
+      for name, kind, help_text, samples in collector():
+        full = self.prefix + name
+        lines += [f"# HELP {full} {help_text}", f"# TYPE {full} {kind}"]
+        lines += [f"{full}{_labels(labels.keys(), labels.values())} {_number(value)}" for labels, value in samples]
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+  """ASGI middleware: in-flight gauge and request duration per endpoint.
+
+  Duration runs until the last body chunk is sent, so streaming endpoints
+  (SSE, NDJSON) are measured to the end, not to the response headers.
+  """
+
+  def __init__(self, app: Any, registry: MetricsRegistry) -> None:
+    self.app = app
+    self._paths: set[str] | None = None
+    self.in_flight = registry.gauge("http_requests_in_flight", "HTTP requests currently being served.", ("path",))
+    self.duration = registry.histogram("http_request_duration_seconds", "HTTP request duration until the last body chunk.", ("path", "method", "status"))
+
+  async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    if self._paths is None:
+      self._paths = {getattr(r, "path", None) for r in scope["app"].routes}
+    # 라우트에 없는 경로는 라벨 수가 늘지 않도록 하나로 묶음
+    path = scope["path"] if scope["path"] in self._paths else "unmatched"
+    started = time.perf_counter()
+    status = {"code": 500}
+
+    async def send_wrapper(message: dict[str, Any]) -> None:
+      if message["type"] == "http.response.start":
+        status["code"] = message["status"]
+      await send(message)
+
+    self.in_flight.inc(path=path)
+    try:
+      await self.app(scope, receive, send_wrapper)
+    finally:
+      self.in_flight.dec(path=path)
+      self.duration.observe(time.perf_counter() - started, path=path, method=scope["method"], status=status["code"])
@@ -1,51 +1,171 @@
 from __future__ import annotations
 
+import json
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Optional
-from ..models.db_manager import DatabaseManager
+from typing import Any, Optional
+from ..models.db_manager import DatabaseManager, render_schema_text
 
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 TEMPLATES_DIR = BASE_DIR / "prompts" / "templates"
 GENERATED_DIR = BASE_DIR / "prompts" / "generated"
+# db -> 테이블별 fingerprint와 컬럼/FK (GENERATED_DIR 안, 재시작 시 재사용, 바뀐 테이블만 다시 조회)
+SCHEMA_CACHE_FILE = "schema_cache.json"
+# 스키마 프롬프트 형식이 바뀌면 올려서 기존 캐시를 무효화
+SCHEMA_CACHE_VERSION = 2
 
 
 class PromptManager:
+  """Templates and generated schema prompts, served from memory.
+
+  Every `*.txt` under TEMPLATES_DIR and GENERATED_DIR is read once (on the
+  first lookup or by `refresh`), so lookups are dict reads that never touch
+  the filesystem. `refresh` re-stats both directories and re-reads only new
+  or changed files (mtime/size), dropping deleted ones; main.py runs it every
+  PROMPT_WATCH_INTERVAL seconds and `/api/admin/prompts/reload` on demand.
+  """
+
+  def __init__(self) -> None:
+    # path -> (mtime_ns, size, text). 교체만 하고 수정하지 않으므로 읽기에 락이 필요 없음
+    self._files: dict[Path, tuple[int, int, str]] | None = None
+    self._lock = threading.Lock()
+    self._schema_lock = threading.Lock()
+    # 같은 DB의 스키마 갱신(시작, 주기 확인, admin)이 겹치지 않도록 DB별 락
+    self._db_locks: dict[str, threading.Lock] = {}
+    self._stats: dict[str, Any] = {"refreshes": 0, "reloads": 0, "files_read": 0, "last_change": None}
+
   def ensure_directories(self) -> None:
     TEMPLATES_DIR.mkdir(parents=True, exist_ok=True)
     GENERATED_DIR.mkdir(parents=True, exist_ok=True)
 
   def generate_db_structure_prompts(self, db_manager: DatabaseManager) -> None:
     for db in db_manager.list_db_names():
-      out_path = GENERATED_DIR / f"{db}__db_structure.txt"
       try:
-        schema_text = db_manager.get_schema_text(db)
-        out_path.write_text(schema_text, encoding="utf-8")
+        self.refresh_db_structure_prompt(db_manager, db)
       except Exception as e:
-        # 연결 불가 시 안내 문서만 생성하고 넘어감
-        out_path.write_text(
-          f"# DB: {db}\n연결 실패로 스키마를 가져오지 못했습니다. 서버 설정과 DB 상태를 확인하세요.\n에러: {e}",
-          encoding="utf-8",
-        )
+        self.write_db_structure_placeholder(db, e)
+    self.refresh()
+
+  def refresh_db_structure_prompt(self, db_manager: DatabaseManager, db: str, force: bool = False) -> list[str]:
+    """Bring `{db}__db_structure.txt` up to date, re-introspecting only the
+    tables whose fingerprint differs from the schema cache entry (every table
+    with `force` or without a usable entry). Returns the added, altered and
+    dropped tables; empty when the prompt was current. DB errors propagate."""
+    with self._db_locks.setdefault(db, threading.Lock()):
+      fps = db_manager.table_fingerprints(db)
+      path = GENERATED_DIR / f"{db}__db_structure.txt"
+      entry = self._load_schema_cache().get(db) or {}
+      usable = not force and entry.get("version") == SCHEMA_CACHE_VERSION and path.exists()
+      tables: dict[str, Any] = dict(entry.get("tables") or {}) if usable else {}
+      stale = sorted(t for t, fp in fps.items() if t not in tables or tables[t]["fingerprint"] != fp)
+      dropped = sorted(tables.keys() - fps.keys())
+      if not stale and not dropped:
+        return []
+      fresh = db_manager.introspect_tables(db, stale if tables else None)
+      for t in dropped:
+        del tables[t]
+      for t in stale:
+        tables[t] = {"fingerprint": fps[t], **fresh.get(t, {"columns": [], "fks": []})}
+      _write_atomic(path, render_schema_text(db, tables))
+      with self._schema_lock:
+        cache = self._load_schema_cache()
+        cache[db] = {"version": SCHEMA_CACHE_VERSION, "generated_at": time.time(), "tables": tables}
+        _write_atomic(GENERATED_DIR / SCHEMA_CACHE_FILE, json.dumps(cache, ensure_ascii=False, default=str))
+      return stale + dropped
+
+  def write_db_structure_placeholder(self, db: str, error: Exception) -> None:
+    """Notice for a DB whose schema could not be read; an existing (cached) prompt is kept."""
+    path = GENERATED_DIR / f"{db}__db_structure.txt"
+    if path.exists():
+      return
+    # 연결 불가 시 안내 문서만 생성하고 넘어감
+    _write_atomic(path, f"# DB: {db}\n연결 실패로 스키마를 가져오지 못했습니다. 서버 설정과 DB 상태를 확인하세요.\n에러: {error}")
+    # 이전 실행의 캐시 항목이 남아 있으면 DB가 돌아와도 fingerprint가 같아 안내 문서가 그대로 남으므로 버림
+    with self._schema_lock:
+      cache = self._load_schema_cache()
+      if cache.pop(db, None) is not None:
+        _write_atomic(GENERATED_DIR / SCHEMA_CACHE_FILE, json.dumps(cache, ensure_ascii=False, default=str))
+
+  def schema_tables(self, db: str) -> dict[str, Any]:
+    """Schema cache entry of `db`: table -> {fingerprint, columns, fks}."""
+    entry = self._load_schema_cache().get(db) or {}
+    return entry.get("tables") or {} if entry.get("version") == SCHEMA_CACHE_VERSION else {}
+
+  @staticmethod
+  def _load_schema_cache() -> dict[str, Any]:
+    try:
+      return json.loads((GENERATED_DIR / SCHEMA_CACHE_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+      return {}
+
+  def refresh(self, force: bool = False) -> list[str]:
+    """Re-read new/changed prompt files (all files with `force`); return the changed names."""
+    with self._lock:
+      old = self._files or {}
+      files: dict[Path, tuple[int, int, str]] = {}
+      changed: list[str] = []
+      for directory in (TEMPLATES_DIR, GENERATED_DIR):
+        if not directory.is_dir():
+          continue
+        for path in directory.glob("*.txt"):
+          try:
+            st = path.stat()
+            entry = old.get(path)
+            if entry is not None and not force and entry[:2] == (st.st_mtime_ns, st.st_size):
+              files[path] = entry
+              continue
+            text = path.read_text(encoding="utf-8")
+          except FileNotFoundError:
+            # glob 이후 삭제됨
+            continue
+          self._stats["files_read"] += 1
+          if entry is None or entry[2] != text:
+            changed.append(path.name)
+          files[path] = (st.st_mtime_ns, st.st_size, text)
+      changed += [p.name for p in old.keys() - files.keys()]
+      self._files = files
+      self._stats["reloads" if force else "refreshes"] += 1
+      if changed:
+        self._stats["last_change"] = time.time()
+      return sorted(changed)
+
+  def stats(self) -> dict[str, Any]:
+    files = self._files or {}
+    return {
+      **self._stats,
+      "templates": sorted(p.name for p in files if p.parent == TEMPLATES_DIR),
+      "generated": sorted(p.name for p in files if p.parent == GENERATED_DIR),
+    }
+
+  def _read(self, path: Path) -> str | None:
+    files = self._files
+    if files is None:
+      self.refresh()
+      files = self._files
+    entry = files.get(path)
+    return entry[2] if entry is not None else None
 
   def load_template(self, name: str, db_name: Optional[str] = None) -> str:
     # Allow per-DB override: name__{db}.txt
     if db_name:
-      cand = TEMPLATES_DIR / f"{name}__{db_name}.txt"
-      if cand.exists():
-        return cand.read_text(encoding="utf-8")
+      text = self._read(TEMPLATES_DIR / f"{name}__{db_name}.txt")
+      if text is not None:
+        return text
     # Fallback to common
-    path = TEMPLATES_DIR / f"{name}.txt"
-    if not path.exists():
-      return ""
-    return path.read_text(encoding="utf-8")
+    return self._read(TEMPLATES_DIR / f"{name}.txt") or ""
 
   def load_generated(self, filename: str) -> str:
-    path = GENERATED_DIR / filename
-    if not path.exists():
-      return ""
-    return path.read_text(encoding="utf-8")
+    return self._read(GENERATED_DIR / filename) or ""
 
   def get_db_structure_prompt(self, db_name: str) -> str:
     return self.load_generated(f"{db_name}__db_structure.txt")
 
+
+def _write_atomic(path: Path, text: str) -> None:
+  # 임시 파일에 쓰고 교체 (refresh가 반쯤 쓴 파일을 읽지 않도록, 확장자가 .txt가 아니라 glob에도 안 잡힘)
+  tmp = path.with_name(path.name + ".tmp")
+  tmp.write_text(text, encoding="utf-8")
+  os.replace(tmp, path)
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Callable
+from ..config import settings
+from ..models.db_manager import ColumnarRows
+from .lexical import estimate_tokens
+
+
+# 요약 시 문자열 컬럼의 상위 값 개수, head/tail 샘플 행 수 (예산 초과 시 줄임)
+TOP_K = 5
+SAMPLE_ROWS = (5, 3, 1, 0)
+
+
+def _identity(value: Any) -> Any:
+  return value
+
+
+def _converter(values: list[Any]) -> Callable[[Any], Any]:
+  """One JSON converter per column, picked from its first non-null value
+  (DB columns are typed), instead of type-checking every value."""
+  sample = next((v for v in values if v is not None), None)
+  if isinstance(sample, Decimal):
+    return lambda v: None if v is None else float(v)
+  if isinstance(sample, (datetime, date, time)):
+    return lambda v: None if v is None else v.isoformat()
+  if isinstance(sample, timedelta):
+    return lambda v: None if v is None else str(v)
+  if isinstance(sample, (bytes, bytearray)):
+    return lambda v: None if v is None else bytes(v).decode("utf-8", errors="replace")
+  if isinstance(sample, (set, frozenset)):
+    # MySQL SET 컬럼
+    return lambda v: None if v is None else sorted(v)
+  return _identity
+
+
+def _count_key(value: Any) -> Any:
+  """Hashable stand-in for `value` when counting distinct values."""
+  if isinstance(value, (set, frozenset)):
+    return tuple(sorted(value, key=repr))
+  if isinstance(value, bytearray):
+    return bytes(value)
+  try:
+    hash(value)
+  except TypeError:
+    return repr(value)
+  return value
+
+
+def _columns(rows: list[dict[str, Any]] | ColumnarRows) -> tuple[list[str], list[list[Any]]]:
+  if isinstance(rows, ColumnarRows):
+    if not rows.rows:
+      return list(rows.columns), [[] for _ in rows.columns]
+    return list(rows.columns), [list(col) for col in zip(*rows.rows)]
+  names = list(rows[0].keys()) if rows else []
+  return names, [[r.get(name) for r in rows] for name in names]
+
+
+def _dumps(data: Any) -> str:
+  return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _is_number(value: Any) -> bool:
+  return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def column_stats(values: list[Any], conv: Callable[[Any], Any], top_k: int = TOP_K) -> dict[str, Any]:
+  """Exact aggregates of one column: nulls, min/max (+ sum/mean for numbers,
+  distinct/top values for everything else)."""
+  present = [v for v in values if v is not None]
+  stats: dict[str, Any] = {"nulls": len(values) - len(present)}
+  if not present:
+    return stats
+  sample = present[0]
+  try:
+    if _is_number(sample):
+      total = sum(present)  # Decimal 합계는 정확하게 계산한 뒤 변환
+      stats.update(min=conv(min(present)), max=conv(max(present)), sum=conv(total), mean=round(float(total) / len(present), 4))
+      return stats
+    if isinstance(sample, (datetime, date, time, timedelta)):
+      stats.update(min=conv(min(present)), max=conv(max(present)))
+      return stats
+  except TypeError:
+    pass  # 타입이 섞인 컬럼은 빈도 요약으로
+  counts = Counter(map(_count_key, present))
+  stats["distinct"] = len(counts)
+  stats["top"] = [[conv(v), n] for v, n in counts.most_common(top_k)]
+  return stats
+
+
+class ResultSummarizer:
+  """Fits a query result into the answer prompt under a token budget.
+
+  Results that fit are passed as `{"columns", "rows"}` (all rows); larger ones
+  are replaced by aggregates computed locally over every fetched row (row
+  count, per-column min/max/sum/mean, top values) plus head/tail samples, so
+  totals stay exact while the prompt stays small.
+  """
+
+  def __init__(self, token_budget: int | None = None) -> None:
+    self.token_budget = token_budget if token_budget is not None else settings.answer_rows_token_budget
+
+  def summarize(self, rows: list[dict[str, Any]] | ColumnarRows) -> tuple[str, dict[str, Any]]:
+    """Return (text for the prompt, info); info["rows_mode"] is raw or summary."""
+    names, columns = _columns(rows)
+    convs = [_converter(col) for col in columns]
+    converted = [col if conv is _identity else list(map(conv, col)) for col, conv in zip(columns, convs)]
+    table = [list(r) for r in zip(*converted)]
+
+    raw = _dumps({"columns": names, "rows": table})
+    # len/4는 토큰 수의 하한이므로 명백히 큰 결과는 세지 않고 건너뜀
+    if len(raw) // 4 <= self.token_budget:
+      tokens = estimate_tokens(raw)
+      if tokens <= self.token_budget:
+        return raw, {"rows_mode": "raw", "rows_tokens": tokens}
+
+    n = len(table)
+    stats = {name: column_stats(col, conv) for name, col, conv in zip(names, columns, convs)}
+    text, tokens, k = "", 0, 0
+    for k in SAMPLE_ROWS:
+      text = _dumps({
+        "row_count": n,
+        "columns": stats,
+        "head": table[:k],
+        "tail": table[max(k, n - k):] if k else [],
+      })
+      tokens = estimate_tokens(text)
+      if tokens <= self.token_budget:
+        break
+    return text, {"rows_mode": "summary", "rows_tokens": tokens, "sample_rows": k}
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import re
+from typing import Any
+from .lexical import BM25Index, estimate_tokens
+from .sql_cache import fingerprint
+
+
+_TABLE_LINE = re.compile(r"^- Table:\s*(\S+)")
+_FK_LINE = re.compile(r"^- (\w+)\.(\w+) -> (\w+)\.(\w+)")
+_COLUMN_LINE = re.compile(r"^\s+-\s*([^:\s]+):")
+_IDENT = re.compile(r"\w+")
+
+# seed 테이블로 인정할 최소 점수 (top 점수 대비 비율)
+MIN_RELATIVE_SCORE = 0.2
+
+
+class ParsedSchema:
+  """`DatabaseManager.get_schema_text` output split into table blocks and FKs."""
+
+  def __init__(self, text: str) -> None:
+    self.header: list[str] = []
+    self.tables: dict[str, list[str]] = {}
+    self.fks: list[tuple[str, str, str]] = []  # (table, referenced_table, line)
+    section = "header"
+    current: str | None = None
+    for line in text.splitlines():
+      if line.startswith("## Foreign Keys"):
+        section = "fks"
+        continue
+      if line.startswith("## Tables and Columns"):
+        section = "tables"
+        continue
+      if section == "header":
+        self.header.append(line)
+      elif section == "tables":
+        m = _TABLE_LINE.match(line)
+        if m:
+          current = m.group(1)
+          self.tables[current] = [line]
+        elif current is not None and line.strip():
+          self.tables[current].append(line)
+      else:
+        m = _FK_LINE.match(line)
+        if m:
+          self.fks.append((m.group(1), m.group(3), line))
+
+  def columns(self, table: str) -> list[str]:
+    return [m.group(1) for m in map(_COLUMN_LINE.match, self.tables.get(table, [])[1:]) if m]
+
+  def references(self, table: str) -> list[str]:
+    return [rt for t, rt, _ in self.fks if t == table and rt in self.tables]
+
+  def closure(self, table: str) -> list[str]:
+    """`table` plus every table reachable through outgoing FKs (join path)."""
+    out = [table]
+    i = 0
+    while i < len(out):
+      for rt in self.references(out[i]):
+        if rt not in out:
+          out.append(rt)
+      i += 1
+    return out
+
+  def render(self, tables: list[str]) -> str:
+    keep = set(tables)
+    lines = list(self.header)
+    lines.append("## Tables and Columns")
+    for t in tables:
+      lines.append("")
+      lines.extend(self.tables[t])
+    lines.append("")
+    lines.append("## Foreign Keys")
+    lines.extend(line for t, rt, line in self.fks if t in keep and rt in keep)
+    return "\n".join(lines)
+
+
+class SchemaRetriever:
+  """Selects the question-relevant part of a schema prompt under a token budget.
+
+  Tables are scored with BM25 over their name, column names and the rules
+  template lines that mention them (user friendly aliases, domain rules); each
+  selected table brings its FK closure so the join paths stay valid.
+  """
+
+  def __init__(self) -> None:
+    # db -> (fingerprint of schema + rules, parsed schema, table index)
+    self._indexes: dict[str, tuple[str, ParsedSchema, BM25Index]] = {}
+
+  def _index(self, db_name: str, schema_text: str, rules: str) -> tuple[ParsedSchema, BM25Index]:
+    fp = fingerprint(schema_text, rules)
+    cached = self._indexes.get(db_name)
+    if cached is not None and cached[0] == fp:
+      return cached[1], cached[2]
+    parsed = ParsedSchema(schema_text)
+    docs = {t: "\n".join(lines) for t, lines in parsed.tables.items()}
+    # 규칙 템플릿에서 테이블을 언급한 라인("farm: 농장, 농가", "폐사 ... herd_history")을 붙임
+    for line in rules.splitlines():
+      for t in set(_IDENT.findall(line)) & docs.keys():
+        docs[t] += "\n" + line
+    index = BM25Index(docs)
+    self._indexes[db_name] = (fp, parsed, index)
+    return parsed, index
+
+  def prune(self, db_name: str, schema_text: str, rules: str, question: str, token_budget: int) -> tuple[str, dict[str, Any]]:
+    """Return (schema_text, info). Falls back to the full text when nothing matches."""
+    parsed, index = self._index(db_name, schema_text, rules)
+    info: dict[str, Any] = {"tables_total": len(parsed.tables)}
+    scores = index.score(question)
+    ranked = sorted(((s, t) for t, s in scores.items() if s > 0), reverse=True)
+    if not ranked:
+      info["tables"] = len(parsed.tables)
+      info["pruned"] = False
+      return schema_text, info
+
+    top = ranked[0][0]
+    selected: list[str] = []
+    used = 0
+    for score, table in ranked:
+      if score < top * MIN_RELATIVE_SCORE:
+        break
+      unit = [t for t in parsed.closure(table) if t not in selected]
+      if not unit:
+        continue
+      cost = sum(estimate_tokens("\n".join(parsed.tables[t])) for t in unit)
+      # 첫 테이블 묶음은 예산을 넘더라도 포함
+      if selected and used + cost > token_budget:
+        continue
+      selected.extend(unit)
+      used += cost
+
+    info["tables"] = len(selected)
+    info["pruned"] = True
+    return parsed.render(selected), info
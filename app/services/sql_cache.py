@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import Any
+from ..config import settings
+
+
+# 상대 날짜 표현 정규화 (공백 제거 후 적용, 긴 표현부터 치환)
+RELATIVE_DATE_SYNONYMS: list[tuple[str, str]] = [
+  ("이번년도", "올해"), ("올해년도", "올해"), ("금년", "올해"), ("thisyear", "올해"),
+  ("지난해", "작년"), ("전년", "작년"), ("lastyear", "작년"),
+  ("이달", "이번달"), ("금월", "이번달"), ("thismonth", "이번달"),
+  ("저번달", "지난달"), ("전월", "지난달"), ("lastmonth", "지난달"),
+  ("금주", "이번주"), ("thisweek", "이번주"),
+  ("저번주", "지난주"), ("lastweek", "지난주"),
+  ("엊그제", "그제"), ("그저께", "그제"),
+  ("금일", "오늘"), ("today", "오늘"),
+  ("작일", "어제"), ("전일", "어제"), ("yesterday", "어제"),
+]
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_question(question: str) -> str:
+  text = _NON_WORD.sub("", question.lower())
+  for src, dst in RELATIVE_DATE_SYNONYMS:
+    text = text.replace(src, dst)
+  return text
+
+
+def fingerprint(*parts: str) -> str:
+  h = hashlib.sha1()
+  for p in parts:
+    h.update(p.encode("utf-8"))
+    h.update(b"\0")
+  return h.hexdigest()[:16]
+
+
+class QuestionSQLCache:
+  """LRU+TTL cache of question → DB choice and (DB, question) → executed SQL.
+
+  Keys carry a fingerprint of the prompt inputs (db_selection template + DB
+  list, or `{db}__db_structure.txt` + sql_generation template), so a
+  regenerated schema prompt never serves stale SQL; entries of a DB whose
+  fingerprint changed are purged on the next lookup.
+  """
+
+  def __init__(self, max_entries: int | None = None, ttl_seconds: float | None = None) -> None:
+    self.enabled = settings.sql_cache_enabled
+    self.max_entries = max_entries if max_entries is not None else settings.sql_cache_max_entries
+    self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.sql_cache_ttl_seconds
+    self._entries: OrderedDict[tuple[str, ...], tuple[float, str]] = OrderedDict()
+    self._db_fingerprints: dict[str, str] = {}
+    self.hits = {"db": 0, "sql": 0}
+    self.misses = {"db": 0, "sql": 0}
+    self.invalidations = 0
+
+  def _get(self, key: tuple[str, ...]) -> str | None:
+    item = self._entries.get(key)
+    if item is None:
+      return None
+    stored_at, value = item
+    if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+      del self._entries[key]
+      return None
+    self._entries.move_to_end(key)
+    return value
+
+  def _put(self, key: tuple[str, ...], value: str) -> None:
+    self._entries[key] = (time.monotonic(), value)
+    self._entries.move_to_end(key)
+    while len(self._entries) > self.max_entries:
+      self._entries.popitem(last=False)
+
+  def _check_db_fingerprint(self, db_name: str, fp: str) -> None:
+    last = self._db_fingerprints.get(db_name)
+    if last is not None and last != fp:
+      self.invalidate_db(db_name)
+    self._db_fingerprints[db_name] = fp
+
+  def get_db(self, question: str, selection_fp: str) -> str | None:
+    if not self.enabled:
+      return None
+    value = self._get(("db", selection_fp, normalize_question(question)))
+    self._count("db", value)
+    return value
+
+  def put_db(self, question: str, selection_fp: str, db_name: str) -> None:
+    if not self.enabled:
+      return
+    self._put(("db", selection_fp, normalize_question(question)), db_name)
+
+  def get_sql(self, question: str, db_name: str, schema_fp: str) -> str | None:
+    if not self.enabled:
+      return None
+    self._check_db_fingerprint(db_name, schema_fp)
+    value = self._get(("sql", db_name, schema_fp, normalize_question(question)))
+    self._count("sql", value)
+    return value
+
+  def put_sql(self, question: str, db_name: str, schema_fp: str, sql: str) -> None:
+    if not self.enabled:
+      return
+    self._check_db_fingerprint(db_name, schema_fp)
+    self._put(("sql", db_name, schema_fp, normalize_question(question)), sql)
+
+  def discard_sql(self, question: str, db_name: str, schema_fp: str) -> None:
+    self._entries.pop(("sql", db_name, schema_fp, normalize_question(question)), None)
+
+  def invalidate_db(self, db_name: str) -> None:
+    stale = [k for k in self._entries if k[0] == "sql" and k[1] == db_name]
+    for k in stale:
+      del self._entries[k]
+    self.invalidations += 1
+
+  def clear(self) -> None:
+    self._entries.clear()
+    self._db_fingerprints.clear()
+
+  def _count(self, stage: str, value: str | None) -> None:
+    if value is None:
+      self.misses[stage] += 1
+    else:
+      self.hits[stage] += 1
+
+  def stats(self) -> dict[str, Any]:
+    return {
+      "enabled": self.enabled,
+      "entries": len(self._entries),
+      "max_entries": self.max_entries,
+      "ttl_seconds": self.ttl_seconds,
+      "hits": dict(self.hits),
+      "misses": dict(self.misses),
+      "invalidations": self.invalidations,
+    }
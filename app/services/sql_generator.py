@@ -1,30 +1,108 @@
 from __future__ import annotations
 
 import re
-from ..models.llm_client import LLMClient
+from typing import Any
+from ..config import settings
+from ..models.llm_client import LLMClient, DEFAULT_SYSTEM_PROMPT
 from .prompt_manager import PromptManager
+from .sql_cache import fingerprint
+from .schema_retriever import SchemaRetriever
+from .value_profiler import ValueProfiler, prompt_tables
+from .example_index import ExampleIndex
+from .lexical import estimate_tokens
 
 
 SQL_BLOCK_PATTERN = re.compile(r"```sql\s*(.*?)\s*```", re.IGNORECASE | re.DOTALL)
+# 따옴표 리터럴은 대소문자를 보존하고 나머지만 소문자로 (후보 중복 제거용)
+_QUOTED = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)")
+
+
+def normalize_sql(sql: str) -> str:
+  """Comparison key for candidate SQL: collapsed whitespace, no trailing `;`,
+  keywords/identifiers lower-cased outside string literals."""
+  parts = _QUOTED.split(" ".join(sql.split()).rstrip(";").strip())
+  return "".join(p if i % 2 else p.lower() for i, p in enumerate(parts))
 
 
 class SQLGenerator:
-  def __init__(self, prompt_manager: PromptManager) -> None:
-    self.lm = LLMClient()
+  def __init__(self, prompt_manager: PromptManager, llm_client: LLMClient | None = None, retriever: SchemaRetriever | None = None, profiler: ValueProfiler | None = None, examples: ExampleIndex | None = None) -> None:
+    self.lm = llm_client or LLMClient()
     self.pm = prompt_manager
+    self.retriever = retriever
+    self.profiler = profiler
+    self.examples = examples
+    # prompt size of the last generate_sql call (full vs pruned schema), for logs
+    self.prompt_stats: dict[str, Any] = {}
+    # distinct (sql, votes) of the last generate_sql call, most voted first
+    self.candidates: list[tuple[str, int]] = []
 
-  def _build_prompt(self, question: str, db_name: str) -> str:
+  def _stable_prefix(self, db_name: str) -> tuple[str, str, bool]:
+    """(system prompt, rules, schema_in_prefix). The system prompt is identical for
+    every request on `db_name` so vLLM's prefix cache can reuse its KV blocks.
+    With schema pruning the schema varies per question and moves to the user
+    message; otherwise the full schema is part of the cached prefix.
+    """
     rules = self.pm.load_template("sql_generation", db_name=db_name)
+    if settings.schema_pruning_enabled and self.retriever is not None:
+      return f"{DEFAULT_SYSTEM_PROMPT}\n\n{rules}", rules, False
+    schema = self.pm.get_db_structure_prompt(db_name)
+    return f"{DEFAULT_SYSTEM_PROMPT}\n\n{rules}\n\n[DB 구조]\n{schema}", rules, True
+
+  def _schema_part(self, question: str, db_name: str, rules: str, schema_in_prefix: bool, prune: bool) -> tuple[str, set[str] | None]:
+    """([DB 구조] block for the user message, pruned table names or None)."""
+    if schema_in_prefix:
+      return "", None
     schema = self.pm.get_db_structure_prompt(db_name)
+    tables = None
+    if prune:
+      schema, info = self.retriever.prune(db_name, schema, rules, question, settings.schema_prune_token_budget)
+      self.prompt_stats.update(info)
+      if info.get("pruned"):
+        tables = prompt_tables(schema)
+    return f"[DB 구조]\n{schema}\n\n", tables
+
+  def _context_part(self, question: str, db_name: str, tables: set[str] | None, record: bool) -> str:
+    """Value profile and example blocks; `record` adds their stats to prompt_stats."""
+    parts = ""
+    if settings.value_profiles_enabled and self.profiler is not None:
+      # 질문마다 달라지므로 user 메시지에 (prefix cache 유지)
+      profiles, info = self.profiler.render(db_name, question, tables, settings.value_profile_token_budget)
+      if record:
+        self.prompt_stats.update(info)
+      if profiles:
+        parts += f"{profiles}\n\n"
+    if settings.examples_enabled and self.examples is not None:
+      examples, info = self.examples.render(db_name, question, settings.examples_token_budget)
+      if record:
+        self.prompt_stats.update(info)
+      if examples:
+        parts += f"{examples}\n\n"
+    return parts
+
+  @staticmethod
+  def _user_message(schema_part: str, context_part: str, question: str) -> str:
     return (
-      f"{rules}\n\n"
-      f"[DB 구조]\n{schema}\n\n"
+      f"{schema_part}"
+      f"{context_part}"
       f"[요청]\n자연어 질문을 하나의 SQL 쿼리로 작성하세요.\n질문: {question}\n\n"
       f"출력 형식: SQL만 출력 (가능하면 ```sql 코드펜스```로 감싸기)")
 
-  def _build_retry_prompt(self, base_prompt: str, error_message: str) -> str:
-    return (
-      f"{base_prompt}\n\n"
+  def _build_prompt(self, question: str, db_name: str, prune: bool = False) -> tuple[str, str]:
+    """Returns (system, user)."""
+    system, rules, schema_in_prefix = self._stable_prefix(db_name)
+    schema_part, tables = self._schema_part(question, db_name, rules, schema_in_prefix, prune)
+    return system, self._user_message(schema_part, self._context_part(question, db_name, tables, prune), question)
+
+  def schema_fingerprint(self, db_name: str) -> str:
+    """Hash of the rules template and generated schema prompt for `db_name`."""
+    rules = self.pm.load_template("sql_generation", db_name=db_name)
+    schema = self.pm.get_db_structure_prompt(db_name)
+    return fingerprint(rules, schema)
+
+  def _build_retry_prompt(self, base_prompt: tuple[str, str], error_message: str) -> tuple[str, str]:
+    system, user = base_prompt
+    return system, (
+      f"{user}\n\n"
       f"[실패 원인]\n{error_message}\n\n"
       f"위 오류를 해결하도록 SQL을 수정하세요. 출력은 SQL만."
     )
@@ -50,14 +128,55 @@ class SQLGenerator:
     
     return sql
 
-  async def generate_sql(self, question: str, db_name: str) -> tuple[str, str]:
-    base_prompt = self._build_prompt(question, db_name)
-    text = await self.lm.generate(base_prompt, temperature=0.0)
+  async def generate_sql(self, question: str, db_name: str) -> tuple[str, tuple[str, str]]:
+    """Returns (sql, base_prompt). The first attempt uses the pruned schema;
+    base_prompt always carries the full schema so the retry can fall back to it;
+    both share one rendering of the value profile and example blocks.
+    """
+    self.prompt_stats = {}
+    system, rules, schema_in_prefix = self._stable_prefix(db_name)
+    schema_part, tables = self._schema_part(question, db_name, rules, schema_in_prefix, prune=True)
+    # 프로파일/예시 블록은 한 번만 만들어 재시도용 프롬프트에도 그대로 사용
+    context_part = self._context_part(question, db_name, tables, record=True)
+    user = self._user_message(schema_part, context_part, question)
+    full_part = schema_part
+    if self.prompt_stats.get("pruned"):
+      full_part, _ = self._schema_part(question, db_name, rules, schema_in_prefix, prune=False)
+    base_prompt = (system, self._user_message(full_part, context_part, question))
+    self.prompt_stats["prefix_tokens"] = estimate_tokens(system)
+    self.prompt_stats["prompt_tokens"] = estimate_tokens(system) + estimate_tokens(user)
+    self.prompt_stats["prompt_tokens_full"] = estimate_tokens(base_prompt[0]) + estimate_tokens(base_prompt[1])
+    n = settings.sql_candidates
+    if n > 1:
+      texts = await self.lm.generate_many(user, n, temperature=settings.sql_candidates_temperature, system=system, stage="sql")
+      if not texts:
+        # greedy 후보까지 비어 있으면 단일 생성으로 다시 물어도 같은 결과
+        raise RuntimeError(f"LLM returned no non-empty SQL candidates (n={n})")
+      self.candidates = self._dedupe([self._extract_sql(t) for t in texts])
+      self.prompt_stats["candidates"] = len(texts)
+      self.prompt_stats["distinct_candidates"] = len(self.candidates)
+      return self.candidates[0][0], base_prompt
+    text = await self.lm.generate(user, temperature=0.0, system=system, stage="sql")
     sql = self._extract_sql(text)
+    self.candidates = [(sql, 1)]
     return sql, base_prompt
 
-  async def retry_with_error(self, base_prompt: str, error_message: str) -> str:
-    prompt = self._build_retry_prompt(base_prompt, error_message)
-    text = await self.lm.generate(prompt, temperature=0.0)
+  @staticmethod
+  def _dedupe(sqls: list[str]) -> list[tuple[str, int]]:
+    """Group candidates by normalized SQL; order by votes, ties by first seen."""
+    groups: dict[str, list[Any]] = {}
+    for sql in sqls:
+      groups.setdefault(normalize_sql(sql), [sql, 0])[1] += 1
+    ranked = sorted(groups.values(), key=lambda g: -g[1])
+    return [(sql, votes) for sql, votes in ranked]
+
+  async def retry_with_error(self, base_prompt: tuple[str, str], error_message: str) -> str:
+    system, user = self._build_retry_prompt(base_prompt, error_message)
+    text = await self.lm.generate(user, temperature=0.0, system=system, stage="sql")
     return self._extract_sql(text)
 
+  async def warm_up(self, db_name: str) -> None:
+    """Send the stable prefix once (to every LLM endpoint) so the first real question hits a warm KV cache."""
+    system, _, _ = self._stable_prefix(db_name)
+    await self.lm.warm_up(system)
+
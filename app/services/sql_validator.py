@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import difflib
+import re
+from typing import Any
+from ..config import settings
+from .schema_retriever import ParsedSchema
+from .sql_cache import fingerprint
+
+
+_TOKEN = re.compile(r"""
+   (?P<ws>\s+)
+  |(?P<comment>--[^\n]*|\#[^\n]*|/\*.*?\*/)
+  |(?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+  |(?P<quoted>`(?:[^`]|``)*`)
+  |(?P<number>0[xX][0-9a-fA-F]+|\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)
+  |(?P<var>@@?[\w.$]+|@'[^']*')
+  |(?P<ident>[^\W\d][\w$]*)
+  |(?P<op><=>|<=|>=|<>|!=|:=|->>|->|\|\||&&|<<|>>|[-+*/%=<>!~^&|.,;()?{}])
+""", re.VERBOSE | re.DOTALL)
+
+# 실행을 허용하지 않는 키워드 (`REPLACE(`, `INSERT(` 같은 문자열 함수는 제외)
+WRITE_KEYWORDS = {
+  "INSERT", "UPDATE", "DELETE", "REPLACE", "DROP", "ALTER", "CREATE", "TRUNCATE", "RENAME",
+  "GRANT", "REVOKE", "LOAD", "CALL", "HANDLER", "LOCK", "UNLOCK", "INTO", "OUTFILE", "DUMPFILE",
+}
+
+# 컬럼이 아닌 단어 (예약어, 시간 단위, 타입, 괄호 없는 함수 등)
+KEYWORDS = {
+  "SELECT", "DISTINCT", "DISTINCTROW", "ALL", "FROM", "WHERE", "GROUP", "BY", "HAVING", "ORDER", "LIMIT",
+  "OFFSET", "UNION", "INTERSECT", "EXCEPT", "WITH", "RECURSIVE", "AS", "ON", "USING", "JOIN", "INNER",
+  "LEFT", "RIGHT", "OUTER", "CROSS", "NATURAL", "STRAIGHT_JOIN", "LATERAL", "AND", "OR", "NOT", "XOR",
+  "IS", "NULL", "TRUE", "FALSE", "UNKNOWN", "IN", "EXISTS", "ANY", "SOME", "BETWEEN", "LIKE", "ESCAPE",
+  "REGEXP", "RLIKE", "SOUNDS", "DIV", "MOD", "CASE", "WHEN", "THEN", "ELSE", "END", "ASC", "DESC",
+  "ROLLUP", "OVER", "PARTITION", "WINDOW", "ROWS", "RANGE", "UNBOUNDED", "PRECEDING", "FOLLOWING",
+  "CURRENT", "ROW", "INTERVAL", "BINARY", "COLLATE", "CHARACTER", "CHARSET", "SET", "SEPARATOR",
+  "BOTH", "LEADING", "TRAILING", "MEMBER", "OF", "DUAL", "FOR", "SHARE", "MODE", "NOWAIT", "SKIP",
+  "LOCKED", "USE", "FORCE", "IGNORE", "INDEX", "KEY", "SQL_CALC_FOUND_ROWS", "SQL_NO_CACHE",
+  "SQL_CACHE", "HIGH_PRIORITY", "SQL_SMALL_RESULT", "SQL_BIG_RESULT", "SQL_BUFFER_RESULT",
+  "MICROSECOND", "SECOND", "MINUTE", "HOUR", "DAY", "WEEK", "MONTH", "QUARTER", "YEAR",
+  "SECOND_MICROSECOND", "MINUTE_MICROSECOND", "MINUTE_SECOND", "HOUR_MICROSECOND", "HOUR_SECOND",
+  "HOUR_MINUTE", "DAY_MICROSECOND", "DAY_SECOND", "DAY_MINUTE", "DAY_HOUR", "YEAR_MONTH",
+  "SIGNED", "UNSIGNED", "INTEGER", "INT", "CHAR", "NCHAR", "VARCHAR", "DATE", "DATETIME", "TIME",
+  "TIMESTAMP", "DECIMAL", "DOUBLE", "FLOAT", "REAL", "JSON", "TEXT",
+  "CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP", "CURRENT_USER", "LOCALTIME", "LOCALTIMESTAMP",
+  "UTC_DATE", "UTC_TIME", "UTC_TIMESTAMP",
+}
+
+
+class SQLValidationError(ValueError):
+  """Generated SQL rejected without running it.
+
+  kind: `syntax` (cannot be tokenized / unbalanced), `statement` (not a single
+  read-only SELECT) or `schema` (unknown table / column).
+  """
+
+  def __init__(self, kind: str, message: str) -> None:
+    super().__init__(message)
+    self.kind = kind
+
+
+class _Token:
+  __slots__ = ("kind", "value", "upper")
+
+  def __init__(self, kind: str, value: str) -> None:
+    self.kind = kind
+    self.value = value
+    self.upper = value.upper() if kind == "ident" else value
+
+  def is_word(self, *words: str) -> bool:
+    return self.kind == "ident" and self.upper in words
+
+
+def tokenize(sql: str) -> list[_Token]:
+  tokens: list[_Token] = []
+  pos = 0
+  while pos < len(sql):
+    m = _TOKEN.match(sql, pos)
+    if m is None:
+      what = "string literal" if sql[pos] in "'\"" else f"character {sql[pos]!r}"
+      raise SQLValidationError("syntax", f"Unterminated or unexpected {what} near: {sql[pos:pos + 30]!r}")
+    kind = m.lastgroup or ""
+    if kind == "quoted":
+      tokens.append(_Token("quoted", m.group()[1:-1].replace("``", "`")))
+    elif kind not in ("ws", "comment"):
+      tokens.append(_Token(kind, m.group()))
+    pos = m.end()
+  return tokens
+
+
+def _did_you_mean(name: str, candidates: list[str]) -> str:
+  lowered = {c.lower(): c for c in candidates}
+  match = difflib.get_close_matches(name.lower(), list(lowered), n=1, cutoff=0.6)
+  return f"; did you mean '{lowered[match[0]]}'?" if match else ""
+
+
+class _Statement:
+  """Token-level view of one SELECT: paren matching, query/expression scopes,
+  table sources and aliases. Not a full parser; anything it cannot resolve
+  (CTEs, derived tables, other schemas) disables the checks that depend on it.
+  """
+
+  def __init__(self, tokens: list[_Token]) -> None:
+    self.tokens = tokens
+    self.match: dict[int, int] = {}
+    self.depth: list[int] = []
+    self.in_query: list[bool] = []  # token is in a SELECT scope, not inside a function call
+    stack: list[tuple[int, bool]] = []
+    for i, tok in enumerate(tokens):
+      if tok.value == ")":
+        if not stack:
+          raise SQLValidationError("syntax", "Unbalanced parentheses: unexpected ')'")
+        start, _ = stack.pop()
+        self.match[start] = i
+      self.depth.append(len(stack))
+      self.in_query.append(stack[-1][1] if stack else True)
+      if tok.value == "(":
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+        stack.append((i, nxt is not None and nxt.is_word("SELECT", "WITH")))
+    if stack:
+      raise SQLValidationError("syntax", "Unbalanced parentheses: missing ')'")
+
+  def word(self, i: int) -> _Token | None:
+    return self.tokens[i] if i < len(self.tokens) else None
+
+  def is_name(self, i: int) -> bool:
+    tok = self.word(i)
+    return tok is not None and (tok.kind == "quoted" or (tok.kind == "ident" and tok.upper not in KEYWORDS))
+
+
+class SQLValidator:
+  """Checks generated SQL locally before it reaches MySQL.
+
+  Rejects anything but a single read-only SELECT, checks table and column
+  names against the generated schema prompt (`{db}__db_structure.txt`) and
+  appends a LIMIT to unbounded top-level queries. Errors are worded for the
+  LLM retry prompt ("Unknown column 'x' in table 'y'; did you mean 'z'?").
+  """
+
+  def __init__(self) -> None:
+    self.enabled = settings.sql_validation_enabled
+    # db -> (fingerprint of schema text, table name (lower) -> (name, {column lower: column}))
+    self._schemas: dict[str, tuple[str, dict[str, tuple[str, dict[str, str]]]]] = {}
+    self.checked = 0
+    self.rejected = {"syntax": 0, "statement": 0, "schema": 0}
+    self.limit_injected = 0
+    # 로컬에서 거절해 DB에 보내지 않은 SQL 수
+    self.db_round_trips_saved = 0
+    # 재시도 결과: 최초 오류가 로컬 검증(local) / DB(db)에서 나온 경우
+    self.retries = {"local": {"attempts": 0, "fixed": 0}, "db": {"attempts": 0, "fixed": 0}}
+    # 마지막 시도의 schema 경고를 DB가 실행한 경우 (검증기 오탐)
+    self.overridden = 0
+
+  def _tables(self, db_name: str, schema_text: str) -> dict[str, tuple[str, dict[str, str]]]:
+    fp = fingerprint(schema_text)
+    cached = self._schemas.get(db_name)
+    if cached is not None and cached[0] == fp:
+      return cached[1]
+    parsed = ParsedSchema(schema_text)
+    tables = {
+      t.lower(): (t, {c.lower(): c for c in parsed.columns(t)}) for t in parsed.tables
+    }
+    self._schemas[db_name] = (fp, tables)
+    return tables
+
+  def check(self, db_name: str, sql: str, schema_text: str, limit: int | None = None, final: bool = False) -> tuple[str, list[str]]:
+    """Return (sql to execute, warnings) or raise SQLValidationError.
+
+    With `final=True` (last attempt) schema errors become warnings and the SQL
+    is still sent to MySQL, which stays the authority on names.
+    """
+    if not self.enabled:
+      return sql, []
+    self.checked += 1
+    try:
+      tokens = tokenize(sql)
+      stmt = self._statement(tokens)
+      problems = self._schema_problems(stmt, self._tables(db_name, schema_text))
+    except SQLValidationError as e:
+      self._reject(e.kind)
+      raise
+    if problems and not final:
+      self._reject("schema")
+      raise SQLValidationError("schema", "; ".join(problems))
+    if limit is not None and not any(
+      t.is_word("LIMIT") and d == 0 for t, d in zip(stmt.tokens, stmt.depth)
+    ):
+      sql = f"{sql.strip().rstrip(';').rstrip()}\nLIMIT {int(limit)}"
+      self.limit_injected += 1
+    return sql, problems
+
+  def _reject(self, kind: str) -> None:
+    self.rejected[kind] += 1
+    self.db_round_trips_saved += 1
+
+  def record_retry(self, local: bool, fixed: bool) -> None:
+    bucket = self.retries["local" if local else "db"]
+    bucket["attempts"] += 1
+    bucket["fixed"] += int(fixed)
+
+  def record_override(self) -> None:
+    self.overridden += 1
+
+  def _statement(self, tokens: list[_Token]) -> _Statement:
+    if not tokens:
+      raise SQLValidationError("syntax", "Empty SQL")
+    for i, tok in enumerate(tokens):
+      if tok.value == ";" and any(t.value != ";" for t in tokens[i + 1:]):
+        raise SQLValidationError("statement", "Multiple statements are not allowed; return a single SELECT")
+    tokens = [t for t in tokens if t.value != ";"]
+    first = next((t for t in tokens if t.value != "("), tokens[0])
+    if not first.is_word("SELECT", "WITH"):
+      raise SQLValidationError("statement", f"Only SELECT statements are allowed (got {first.value})")
+    for i, tok in enumerate(tokens):
+      if tok.kind == "ident" and tok.upper in WRITE_KEYWORDS:
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+        if nxt is None or nxt.value != "(":
+          raise SQLValidationError("statement", f"{tok.upper} is not allowed in a read-only query")
+    return _Statement(tokens)
+
+  def _schema_problems(self, stmt: _Statement, tables: dict[str, tuple[str, dict[str, str]]]) -> list[str]:
+    if not tables:
+      return []  # 스키마 프롬프트가 없음 (연결 실패 등)
+    toks = stmt.tokens
+    problems: list[str] = []
+    ctes: set[str] = set()
+    sources: dict[str, str] = {}  # qualifier (lower) -> table (lower)
+    opaque: set[str] = set()  # CTE / derived table / other schema qualifiers
+    skip: set[int] = set()  # token indexes that are not column references
+
+    # CTE 이름: WITH [RECURSIVE] name [(cols)] AS (...) [, name ...]
+    for i, tok in enumerate(toks):
+      if not tok.is_word("WITH") or (stmt.word(i + 1) and stmt.word(i + 1).is_word("ROLLUP")):
+        continue
+      j = i + 1
+      if stmt.word(j) and stmt.word(j).is_word("RECURSIVE"):
+        j += 1
+      while stmt.is_name(j):
+        ctes.add(toks[j].value.lower())
+        skip.add(j)
+        j += 1
+        if stmt.word(j) and stmt.word(j).value == "(":
+          skip.update(range(j, stmt.match[j] + 1))
+          j = stmt.match[j] + 1
+        if not (stmt.word(j) and stmt.word(j).is_word("AS")):
+          break
+        j += 1
+        if not (stmt.word(j) and stmt.word(j).value == "("):
+          break
+        j = stmt.match[j] + 1
+        if not (stmt.word(j) and stmt.word(j).value == ","):
+          break
+        j += 1
+    opaque.update(ctes)
+
+    def read_alias(j: int) -> tuple[str | None, int]:
+      if stmt.word(j) and stmt.word(j).is_word("AS"):
+        j += 1
+      if stmt.is_name(j):
+        skip.add(j)
+        return toks[j].value.lower(), j + 1
+      return None, j
+
+    def table_factor(j: int) -> int:
+      tok = stmt.word(j)
+      if tok is None:
+        return j
+      if tok.value == "(":
+        alias, k = read_alias(stmt.match[j] + 1)
+        if alias:
+          opaque.add(alias)
+        return k
+      if not (tok.kind == "quoted" or tok.kind == "ident"):
+        return j
+      if tok.is_word("DUAL"):
+        return j + 1
+      skip.add(j)
+      name, schema = tok.value, None
+      if stmt.word(j + 1) and stmt.word(j + 1).value == "." and stmt.word(j + 2):
+        schema, name = name, toks[j + 2].value
+        skip.update((j + 1, j + 2))
+        j += 2
+      alias, k = read_alias(j + 1)
+      key = name.lower()
+      if schema is not None or key in ctes:
+        opaque.add(alias or key)
+        if schema is not None:
+          opaque.add(schema.lower())
+      elif key in tables:
+        sources[key] = key
+        if alias:
+          sources[alias] = key
+      else:
+        problems.append(f"Table '{name}' doesn't exist{_did_you_mean(name, [t for t, _ in tables.values()])}")
+        opaque.add(alias or key)
+      return k
+
+    for i, tok in enumerate(toks):
+      if not stmt.in_query[i]:
+        continue
+      if tok.is_word("FROM"):
+        j = table_factor(i + 1)
+        while stmt.word(j) and stmt.word(j).value == ",":
+          j = table_factor(j + 1)
+      elif tok.is_word("JOIN", "STRAIGHT_JOIN"):
+        table_factor(i + 1)
+      elif tok.kind == "ident" and tok.upper == "JSON_TABLE":
+        opaque.add("json_table")
+
+    # SELECT 별칭, WINDOW 이름 등 컬럼처럼 보이지만 컬럼이 아닌 이름
+    aliases: set[str] = set()
+    for i, tok in enumerate(toks):
+      prev = toks[i - 1] if i else None
+      if prev is not None and prev.is_word("AS", "WINDOW", "OVER") and tok.kind in ("ident", "quoted"):
+        aliases.add(tok.value.lower())
+        skip.add(i)
+      elif stmt.is_name(i) and prev is not None and (
+        prev.value == ")" or prev.kind in ("string", "number", "quoted") or stmt.is_name(i - 1)
+      ):
+        aliases.add(tok.value.lower())  # 암시적 별칭: `COUNT(*) cnt`, `t.name farm_name`
+      elif tok.is_word("INDEX", "KEY") and stmt.word(i + 1) and stmt.word(i + 1).value == "(":
+        skip.update(range(i + 1, stmt.match[i + 1] + 1))  # USE INDEX (idx)
+      elif prev is not None and prev.is_word("COLLATE", "CHARSET", "SET", "USING") and tok.kind == "ident":
+        skip.add(i)  # 콜레이션/문자셋 이름: COLLATE utf8mb4_bin, CONVERT(x USING utf8mb4)
+
+    scope = sorted({sources[q] for q in sources})
+    scope_columns = {c for t in scope for c in tables[t][1]}
+    i = 0
+    while i < len(toks):
+      tok = toks[i]
+      if i in skip or tok.kind not in ("ident", "quoted") or (tok.kind == "ident" and tok.upper in KEYWORDS) or (i and toks[i - 1].value == "."):
+        i += 1
+        continue
+      nxt = stmt.word(i + 1)
+      if nxt is not None and (nxt.value == "(" or nxt.kind == "string"):
+        i += 1  # 함수 호출, 문자셋 introducer / 타입 리터럴 (_utf8mb4'..', DATE '..')
+        continue
+      if nxt is not None and nxt.value == ".":
+        col = stmt.word(i + 2)
+        if stmt.word(i + 3) and stmt.word(i + 3).value == ".":
+          i += 4  # schema.table.column
+          continue
+        qualifier = tok.value.lower()
+        if col is not None and col.value != "*" and col.kind in ("ident", "quoted"):
+          if qualifier in sources:
+            name, columns = tables[sources[qualifier]]
+            if col.value.lower() not in columns:
+              problems.append(f"Unknown column '{col.value}' in table '{name}'{_did_you_mean(col.value, list(columns.values()))}")
+          elif qualifier not in opaque and qualifier not in aliases:
+            problems.append(f"Unknown table or alias '{tok.value}' in '{tok.value}.{col.value}'")
+        i += 3
+        continue
+      name = tok.value.lower()
+      if not opaque and name not in aliases and name not in sources and name not in scope_columns:
+        candidates = [c for t in scope for c in tables[t][1].values()]
+        where = f" in tables {', '.join(tables[t][0] for t in scope)}" if scope else ""
+        problems.append(f"Unknown column '{tok.value}'{where}{_did_you_mean(tok.value, candidates)}")
+      i += 1
+    # 같은 오류는 한 번만
+    return list(dict.fromkeys(problems))
+
+  def stats(self) -> dict[str, Any]:
+    return {
+      "enabled": self.enabled,
+      "checked": self.checked,
+      "rejected": dict(self.rejected),
+      "limit_injected": self.limit_injected,
+      "db_round_trips_saved": self.db_round_trips_saved,
+      "retries": {k: dict(v) for k, v in self.retries.items()},
+      "overridden": self.overridden,
+    }
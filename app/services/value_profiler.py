@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from ..config import settings
+from ..models.db_manager import DatabaseManager
+from . import prompt_manager as prompt_module
+from .lexical import char_ngrams, estimate_tokens
+
+
+# 프로필 파일 형식이 바뀌면 올려서 기존 파일을 무시
+PROFILE_VERSION = 1
+
+# 값 목록을 기록하는 타입 / 범위(min~max)만 기록하는 타입. 그 외(text, blob, json 등)는 건너뜀
+_CATEGORICAL_TYPES = {"char", "varchar", "enum", "set", "tinyint", "smallint", "mediumint", "int", "integer", "bigint", "bit", "bool", "boolean"}
+_RANGED_TYPES = {"date", "datetime", "timestamp", "year", "time", "decimal", "numeric", "float", "double", "real"}
+
+_TABLE_LINE = re.compile(r"^- Table:\s*(\S+)", re.MULTILINE)
+
+# 값의 n-gram 중 이 비율 이상이 질문에 있으면 질문과 관련된 컬럼으로 봄
+MIN_VALUE_OVERLAP = 0.5
+
+
+def prompt_tables(schema_text: str) -> set[str]:
+  """Table names of a (possibly pruned) schema prompt."""
+  return set(_TABLE_LINE.findall(schema_text))
+
+
+class ValueProfiler:
+  """Per-DB column value profiles, stored in `{db}__profiles.json`.
+
+  A profiling pass samples the first VALUE_PROFILE_SAMPLE_ROWS rows of each
+  table and records null rate, distinct count and min/max per column, plus the
+  values of low-cardinality columns (at most VALUE_PROFILE_MAX_VALUES). It is
+  incremental: a table is profiled again only when its schema fingerprint
+  changed or its profile is older than VALUE_PROFILE_MAX_AGE_SECONDS.
+
+  `render` picks the profiles relevant to a question (values sharing
+  n-grams with it first, then other columns of the prompt's tables) under a
+  token budget, so the model uses literal values that exist.
+  """
+
+  def __init__(self) -> None:
+    # db -> stored profile document / render index [(score grams per value, table, column, line)]
+    self._profiles: dict[str, dict[str, Any]] = {}
+    self._index: dict[str, list[tuple[list[set[str]], str, str, str]]] = {}
+    self._db_locks: dict[str, threading.Lock] = {}
+
+  @staticmethod
+  def _path(db: str) -> Path:
+    return prompt_module.GENERATED_DIR / f"{db}__profiles.json"
+
+  def _load(self, db: str) -> dict[str, Any]:
+    doc = self._profiles.get(db)
+    if doc is None:
+      try:
+        doc = json.loads(self._path(db).read_text(encoding="utf-8"))
+      except (OSError, ValueError):
+        doc = {}
+      if doc.get("version") != PROFILE_VERSION:
+        doc = {"version": PROFILE_VERSION, "tables": {}}
+      self._set(db, doc)
+    return doc
+
+  def _set(self, db: str, doc: dict[str, Any]) -> None:
+    index: list[tuple[list[set[str]], str, str, str]] = []
+    for table, entry in sorted(doc["tables"].items()):
+      for col, p in entry.get("columns", {}).items():
+        line = _render_line(table, col, p)
+        if line is not None:
+          index.append(([set(char_ngrams(str(v))) for v in p.get("values") or ()], table, col, line))
+    # 인덱스를 먼저 만들고 교체 (render는 락 없이 읽음)
+    self._index[db] = index
+    self._profiles[db] = doc
+
+  def refresh(self, db_manager: DatabaseManager, db: str, tables: dict[str, Any], force: bool = False) -> list[str]:
+    """Profile the tables of `tables` (schema cache entry: table -> {fingerprint,
+    columns}) that are new, changed or stale. Returns the profiled tables;
+    a table whose queries fail keeps its previous profile and is retried on
+    the next pass."""
+    if not tables:
+      # 스키마를 아직 모름 (DB 미연결): 기존 프로필 유지
+      return []
+    with self._db_locks.setdefault(db, threading.Lock()):
+      doc = self._load(db)
+      old = doc["tables"]
+      now = time.time()
+      stale = [
+        t for t, meta in tables.items()
+        if force or t not in old or old[t].get("fingerprint") != meta["fingerprint"]
+        or now - old[t].get("profiled_at", 0) > settings.value_profile_max_age_seconds
+      ]
+      if not stale and old.keys() <= tables.keys():
+        return []
+      new_tables = {t: old[t] for t in tables if t in old}
+      profiled: list[str] = []
+      for t in stale:
+        # PK/FK 컬럼은 값이 아니라 키이므로 제외
+        keys = {fk[0] for fk in tables[t].get("fks", ())}
+        columns = [c for c in tables[t]["columns"] if c[3] != "PRI" and c[0] not in keys]
+        categorical = [c[0] for c in columns if c[1].lower() in _CATEGORICAL_TYPES]
+        ranged = [c[0] for c in columns if c[1].lower() in _RANGED_TYPES]
+        try:
+          profile = db_manager.profile_table(
+            db, t, categorical, ranged, settings.value_profile_sample_rows, settings.value_profile_max_values,
+          )
+        except Exception:
+          continue
+        new_tables[t] = {"fingerprint": tables[t]["fingerprint"], "profiled_at": now, "columns": profile}
+        profiled.append(t)
+      doc = {"version": PROFILE_VERSION, "tables": new_tables}
+      path = self._path(db)
+      tmp = path.with_name(path.name + ".tmp")
+      tmp.write_text(json.dumps(doc, ensure_ascii=False, default=str), encoding="utf-8")
+      tmp.replace(path)
+      # 저장된 형식(JSON 문자열)과 같게 다시 읽어 인덱스 생성
+      self._set(db, json.loads(path.read_text(encoding="utf-8")))
+      return profiled
+
+  def stats(self, db: str) -> dict[str, Any]:
+    doc = self._load(db)
+    entries = doc["tables"].values()
+    return {
+      "tables": len(doc["tables"]),
+      "columns": sum(len(e.get("columns", {})) for e in entries),
+      "columns_with_values": sum(1 for e in entries for p in e.get("columns", {}).values() if p.get("values")),
+      "oldest_profile": min((e.get("profiled_at", 0) for e in entries), default=None),
+    }
+
+  def render(self, db: str, question: str, tables: set[str] | None, token_budget: int) -> tuple[str, dict[str, Any]]:
+    """(prompt block, info). `tables` limits the columns to the prompt's
+    tables; with None (full schema) only value-matching columns are used."""
+    if db not in self._index:
+      self._load(db)
+    q = set(char_ngrams(question))
+    matched: list[tuple[float, str]] = []
+    rest: list[str] = []
+    for value_grams, table, _, line in self._index.get(db, ()):
+      if tables is not None and table not in tables:
+        continue
+      score = max((len(g & q) / len(g) for g in value_grams if g), default=0.0)
+      if score >= MIN_VALUE_OVERLAP:
+        matched.append((score, line))
+      elif tables is not None:
+        rest.append(line)
+    lines: list[str] = []
+    used = 0
+    for line in [line for _, line in sorted(matched, key=lambda m: -m[0])] + rest:
+      cost = estimate_tokens(line)
+      if used + cost > token_budget:
+        continue
+      lines.append(line)
+      used += cost
+    info = {"value_profile_columns": len(lines), "value_profile_matched": len(matched), "value_profile_tokens": used}
+    if not lines:
+      return "", info
+    return "[컬럼 값 프로필] (샘플 기준, 조건의 값은 아래 실제 값 중에서 고르세요)\n" + "\n".join(lines), info
+
+
+def _render_line(table: str, col: str, p: dict[str, Any]) -> str | None:
+  nulls = f" (NULL {round(p['null_rate'] * 100)}%)" if p.get("null_rate") else ""
+  if p.get("values"):
+    values = ", ".join(repr(v) if isinstance(v, str) else str(v) for v in p["values"])
+    return f"- {table}.{col}: {values}{nulls}"
+  if p.get("min") is not None and p.get("max") is not None and p["min"] != p["max"]:
+    return f"- {table}.{col}: {p['min']} ~ {p['max']}{nulls}"
+  return None
@@ -0,0 +1,214 @@
+"""
+파이프라인 e2e 벤치마크: 스텁 LLM + SQLite DB로 app.main:app 자체의 오버헤드 측정
+
+- 스텁 서버(benchmarks/stub_llm.py)가 토큰당 prefill/decode 지연과 동시 처리 슬롯을 흉내내고,
+  SQLite DB(benchmarks/sqlite_db.py)가 edgefarm 유사 스키마로 MySQL을 대신합니다.
+- `/api/query/stream`을 동시성 N으로 호출해 `done` 이벤트의 timings로
+  단계별(DB 선택, SQL 생성, 실행, 답변) p50/p95/p99와 처리량을 계산합니다.
+- 기본으로 질문→SQL 캐시를 끄고 매 요청이 전체 파이프라인을 거치게 합니다 (`--cache`로 켬).
+- 결과를 JSON으로 저장해 커밋 간 회귀를 비교합니다 (`git rev-parse HEAD` 포함).
+
+  python -m benchmarks.pipeline_bench --requests 200 --concurrency 16 --out bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app.config import settings
+from benchmarks.stub_llm import StubLLM, StubServer
+
+
+# (질문, DB, 스텁이 돌려줄 SQL)
+WORKLOAD: list[tuple[str, str, str]] = [
+  ("농장 목록 알려줘", "edgefarm", "SELECT id, name FROM farm"),
+  ("농장별 돈사 수", "edgefarm", "SELECT farm.name, COUNT(piggery.id) AS piggeries FROM piggery JOIN farm ON piggery.farm_id = farm.id GROUP BY farm.name"),
+  ("출하 두수 합계", "edgefarm", "SELECT SUM(herd_history.change) AS shipped FROM herd_history WHERE herd_history.category_id = 4"),
+  ("농장별 폐사 두수", "edgefarm", "SELECT farm.name, SUM(herd_history.change) AS dead FROM herd_history JOIN herd ON herd_history.herd_id = herd.id JOIN room ON herd.room_id = room.id JOIN piggery ON room.piggery_id = piggery.id JOIN farm ON piggery.farm_id = farm.id WHERE herd_history.category_id = 5 GROUP BY farm.name"),
+  ("돈사별 평균 체중", "edgefarm", "SELECT piggery.name, AVG(efg_room_daily_history.avg_weight) AS avg_weight FROM efg_room_daily_history JOIN room ON efg_room_daily_history.room_id = room.id JOIN piggery ON room.piggery_id = piggery.id GROUP BY piggery.name"),
+  ("최근 돈군 이력 100건", "edgefarm", "SELECT id, herd_id, category_id, change, created_at FROM herd_history ORDER BY created_at DESC LIMIT 100"),
+  ("돈군 이력 전체", "edgefarm", "SELECT herd_id, category_id, change, stock, created_at FROM herd_history"),
+  ("고객 목록", "sales", "SELECT id, name, region FROM customer"),
+  ("지역별 매출 합계", "sales", "SELECT customer.region, SUM(sales_order.amount) AS total FROM sales_order JOIN customer ON sales_order.customer_id = customer.id GROUP BY customer.region"),
+]
+
+STAGES = ("db", "sql", "execute", "answer", "ttft", "total")
+
+
+class WorkloadReply:
+  """Stub replies for WORKLOAD: DB name, SQL or an answer of `answer_tokens` words."""
+
+  def __init__(self, answer_tokens: int) -> None:
+    self.answer = " ".join(["요청하신"] + ["지표는"] * max(answer_tokens - 2, 0) + ["입니다."])
+    # 긴 질문부터 비교 (부분 문자열 충돌 방지)
+    self.items = sorted(WORKLOAD, key=lambda w: -len(w[0]))
+
+  def _match(self, text: str) -> tuple[str, str, str] | None:
+    return next((w for w in self.items if w[0] in text), None)
+
+  def __call__(self, messages: list[dict[str, str]]) -> str:
+    text = messages[-1]["content"]
+    item = self._match(text)
+    if "선택한 DB의 이름만" in text:
+      return item[1] if item else WORKLOAD[0][1]
+    if "하나의 SQL 쿼리로" in text:
+      return f"```sql\n{item[2] if item else 'SELECT 1 AS value'};\n```"
+    return self.answer
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+  if not values:
+    return {}
+  if len(values) == 1:
+    q = [values[0]] * 99
+  else:
+    q = statistics.quantiles(values, n=100, method="inclusive")
+  return {
+    "p50": round(q[49], 1),
+    "p95": round(q[94], 1),
+    "p99": round(q[98], 1),
+    "mean": round(statistics.mean(values), 1),
+    "max": round(max(values), 1),
+  }
+
+
+def stage_ms(timings: dict[str, float]) -> dict[str, float]:
+  """`done` timings are cumulative from request start; turn them into per-stage durations."""
+  return {
+    "db": timings["db_ms"],
+    "sql": timings["sql_ms"] - timings["db_ms"],
+    "execute": timings["rows_ms"] - timings["sql_ms"],
+    "answer": timings["total_ms"] - timings["rows_ms"],
+    "ttft": timings.get("ttft_ms", timings["total_ms"]) - timings["rows_ms"],
+    "total": timings["total_ms"],
+  }
+
+
+async def one_request(client: httpx.AsyncClient, question: str) -> tuple[dict[str, float] | None, str | None]:
+  event = None
+  async with client.stream("POST", "/api/query/stream", json={"question": question}) as resp:
+    async for line in resp.aiter_lines():
+      if line.startswith("event: "):
+        event = line[len("event: "):]
+      elif line.startswith("data: ") and event in ("done", "error"):
+        data = json.loads(line[len("data: "):])
+        if event == "error":
+          return None, data.get("error")
+        return stage_ms(data["timings"]), None
+  return None, f"stream ended without done (HTTP {resp.status_code})"
+
+
+async def drive(app: Any, args: argparse.Namespace) -> dict[str, Any]:
+  for handler in app.router.on_startup:
+    await handler()
+  samples: dict[str, list[float]] = {s: [] for s in STAGES}
+  errors: list[str] = []
+  queue: asyncio.Queue[str] = asyncio.Queue()
+  for i in range(args.requests):
+    queue.put_nowait(WORKLOAD[i % len(WORKLOAD)][0])
+
+  transport = httpx.ASGITransport(app=app)
+  async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+    # 워밍업은 측정 전에 순차 실행 (커넥션, 스텁 prefix 캐시)
+    for i in range(args.warmup):
+      await one_request(client, WORKLOAD[i % len(WORKLOAD)][0])
+
+    async def worker() -> None:
+      while not queue.empty():
+        stages, error = await one_request(client, queue.get_nowait())
+        if error is not None:
+          errors.append(error)
+          continue
+        for name, value in stages.items():
+          samples[name].append(value)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+  for handler in app.router.on_shutdown:
+    await handler()
+
+  completed = len(samples["total"])
+  return {
+    "requests": args.requests,
+    "completed": completed,
+    "errors": len(errors),
+    "error_samples": sorted(set(errors))[:5],
+    "elapsed_s": round(elapsed, 3),
+    "throughput_rps": round(completed / elapsed, 2) if elapsed else None,
+    "stages_ms": {name: percentiles(values) for name, values in samples.items()},
+  }
+
+
+def git_commit() -> str | None:
+  try:
+    return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--requests", type=int, default=200)
+  parser.add_argument("--concurrency", type=int, default=16)
+  parser.add_argument("--warmup", type=int, default=10, help="측정에서 제외할 첫 요청 수")
+  parser.add_argument("--prefill-ms-per-token", type=float, default=0.02)
+  parser.add_argument("--decode-ms-per-token", type=float, default=5.0)
+  parser.add_argument("--llm-concurrency", type=int, default=0, help="스텁의 동시 처리 슬롯 (0 = 무제한)")
+  parser.add_argument("--answer-tokens", type=int, default=30)
+  parser.add_argument("--rows", type=int, default=20000, help="가장 큰 테이블의 시드 행 수")
+  parser.add_argument("--db-pool-size", type=int, default=8)
+  parser.add_argument("--cache", action="store_true", help="질문→SQL 캐시 사용")
+  parser.add_argument("--port", type=int, default=8902)
+  parser.add_argument("--out", help="결과 JSON 파일 경로")
+  args = parser.parse_args()
+
+  stub = StubLLM(
+    prefill_ms_per_token=args.prefill_ms_per_token,
+    decode_ms_per_token=args.decode_ms_per_token,
+    reply=WorkloadReply(args.answer_tokens),
+    max_concurrency=args.llm_concurrency,
+  )
+  with tempfile.TemporaryDirectory(prefix="pipeline_bench_") as tmp, StubServer(stub, port=args.port) as server:
+    workdir = Path(tmp)
+    settings.llm_provider = "vllm"
+    settings.vllm_base_url = server.base_url
+    settings.sql_cache_enabled = args.cache
+    settings.llm_warmup = False
+
+    # 생성 프롬프트와 로그는 저장소가 아닌 임시 디렉터리에 (app.main import 전에)
+    from app.services import logger as logger_module, prompt_manager as prompt_module
+    prompt_module.GENERATED_DIR = workdir / "generated"
+    logger_module.LOG_DIR = workdir / "logs"
+
+    import app.main as app_main
+    from benchmarks.sqlite_db import SQLiteDatabaseManager
+    dm = SQLiteDatabaseManager(workdir, scale=args.rows, pool_size=args.db_pool_size)
+    app_main.db_manager = dm
+
+    result = asyncio.run(drive(app_main.app, args))
+    result["stub"] = dict(stub.stats)
+
+  report = {
+    "commit": git_commit(),
+    "config": {k: v for k, v in vars(args).items() if k not in ("out", "port")},
+    **result,
+  }
+  print(json.dumps(report, ensure_ascii=False, indent=2))
+  if args.out:
+    with open(args.out, "w", encoding="utf-8") as f:
+      json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+  main()
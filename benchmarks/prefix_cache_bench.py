@@ -0,0 +1,158 @@
+"""
+Prefix cache 벤치마크: 기존 단일 user 메시지 레이아웃 vs SQLGenerator의 고정 prefix 레이아웃
+
+SQLGenerator가 실제로 만드는 프롬프트(_build_prompt)를 스키마 프루닝 끈 경우/켠 경우로
+측정하고, 기존 레이아웃(기본 system + 규칙·스키마·질문을 한 user 메시지에)과 비교합니다.
+스키마는 PromptManager 대신 합성 스키마를 돌려주는 스텁에서 옵니다.
+스텁 서버(benchmarks/stub_llm.py)가 vLLM prefix caching을 흉내내며
+캐시되지 않은 토큰 수에 비례해 prefill 지연을 만듭니다.
+
+  python -m benchmarks.prefix_cache_bench --tables 60 --questions 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.config import settings
+from app.models.http_transport import LLMTransport
+from app.models.llm_client import LLMClient, DEFAULT_SYSTEM_PROMPT
+from app.services.lexical import estimate_tokens
+from app.services.prompt_manager import PromptManager
+from app.services.schema_retriever import SchemaRetriever
+from app.services.sql_generator import SQLGenerator
+from benchmarks.stub_llm import StubLLM, StubServer
+
+
+QUESTIONS = [
+  "오늘 1동 돼지 두수 알려줘", "어제 폐사 수", "지난달 출하 두수 합계", "3방 평균 체중",
+  "후기 돈사 재고", "이번주 전입 두수", "농장 목록", "이동보고서 최근 10건",
+  "급이기 목록", "어제 시간대별 체중 변화", "이번달 도태 두수", "돈군 현황",
+]
+
+
+# 규칙 템플릿(sql_generation__edgefarm.txt)이 언급하는 테이블: (이름, 참조 테이블)
+DOMAIN_TABLES = [
+  ("farm", None), ("member", "farm"), ("piggery", "farm"), ("room", "piggery"),
+  ("feeder", "room"), ("herd", "room"), ("herd_history_category", None),
+  ("herd_history", "herd"), ("movement", "herd"), ("efg_room_daily_history", "room"),
+]
+
+
+def synthetic_schema(n_tables: int) -> str:
+  """Domain tables plus `table_NNN` fillers up to `n_tables`, in the
+  `DatabaseManager.get_schema_text` format the retriever parses."""
+  tables = list(DOMAIN_TABLES)
+  tables += [(f"table_{i:03d}", "farm") for i in range(max(n_tables - len(tables), 0))]
+  lines = ["# DB: edgefarm", "## Tables and Columns"]
+  fks = []
+  for name, ref in tables:
+    lines += ["", f"- Table: {name}", f"  - id: int NULLABLE=NO [PRI]"]
+    if ref:
+      lines.append(f"  - {ref}_id: int NULLABLE=YES")
+      fks.append(f"- {name}.{ref}_id -> {ref}.id")
+    lines += [f"  - column_{j}: varchar NULLABLE=YES" for j in range(8)]
+    lines.append(f"  - created_at: datetime NULLABLE=YES")
+  lines += ["", "## Foreign Keys", *fks]
+  return "\n".join(lines)
+
+
+class StubPromptManager(PromptManager):
+  """Real templates, synthetic schema (no DB needed)."""
+
+  def __init__(self, schema: str) -> None:
+    super().__init__()
+    self.schema = schema
+
+  def get_db_structure_prompt(self, db_name: str) -> str:
+    return self.schema
+
+
+def baseline_prompt(pm: PromptManager, db_name: str, question: str) -> tuple[str, str]:
+  """Layout before the stable prefix: default system prompt, rules + schema + question in one user message."""
+  rules = pm.load_template("sql_generation", db_name=db_name)
+  schema = pm.get_db_structure_prompt(db_name)
+  return DEFAULT_SYSTEM_PROMPT, (
+    f"{rules}\n\n"
+    f"[DB 구조]\n{schema}\n\n"
+    f"[요청]\n자연어 질문을 하나의 SQL 쿼리로 작성하세요.\n질문: {question}\n\n"
+    f"출력 형식: SQL만 출력 (가능하면 ```sql 코드펜스```로 감싸기)")
+
+
+def build(layout: str, pm: PromptManager, client: LLMClient, question: str) -> tuple[str, str]:
+  if layout == "baseline":
+    return baseline_prompt(pm, "edgefarm", question)
+  prune = layout == "pruning-on"
+  settings.schema_pruning_enabled = prune
+  generator = SQLGenerator(pm, client, SchemaRetriever() if prune else None)
+  return generator._build_prompt(question, "edgefarm", prune=prune)
+
+
+async def run_layout(client: LLMClient, base_url: str, layout: str, pm: PromptManager, questions: list[str]) -> dict:
+  await client.transport.post("vllm", f"{base_url}/reset")
+  latencies: list[float] = []
+  prompt_tokens: list[int] = []
+  for q in questions:
+    system, user = build(layout, pm, client, q)
+    prompt_tokens.append(estimate_tokens(system) + estimate_tokens(user))
+    started = time.perf_counter()
+    await client.generate(user, temperature=0.0, max_tokens=32, system=system)
+    latencies.append((time.perf_counter() - started) * 1000)
+  stub_stats = (await client.transport.client("vllm").get(f"{base_url}/stats")).json()
+  warm = latencies[1:] or latencies
+  return {
+    "layout": layout,
+    "requests": len(latencies),
+    "prompt_tokens_mean": round(statistics.mean(prompt_tokens)),
+    "first_ms": round(latencies[0], 1),
+    "warm_mean_ms": round(statistics.mean(warm), 1),
+    "warm_p50_ms": round(statistics.median(warm), 1),
+    "cached_token_ratio": round(stub_stats["cached_tokens"] / max(stub_stats["prompt_tokens"], 1), 3),
+    "stub_prefill_ms": round(stub_stats["prefill_ms"], 1),
+  }
+
+
+async def main_async(args: argparse.Namespace, base_url: str) -> list[dict]:
+  settings.llm_provider = "vllm"
+  settings.vllm_base_url = base_url
+  transport = LLMTransport()
+  client = LLMClient(transport)
+  pm = StubPromptManager(synthetic_schema(args.tables))
+  # 프로파일/예시 블록은 두 레이아웃에 같은 영향을 주므로 제외
+  settings.value_profiles_enabled = False
+  settings.examples_enabled = False
+  questions = [QUESTIONS[i % len(QUESTIONS)] + f" ({i})" for i in range(args.questions)]
+  try:
+    return [
+      await run_layout(client, base_url, layout, pm, questions)
+      for layout in ("baseline", "pruning-off", "pruning-on")
+    ]
+  finally:
+    await transport.aclose()
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--tables", type=int, default=60)
+  parser.add_argument("--questions", type=int, default=20)
+  parser.add_argument("--prefill-ms-per-token", type=float, default=0.02)
+  parser.add_argument("--port", type=int, default=8901)
+  parser.add_argument("--out", help="결과 JSON 파일 경로")
+  args = parser.parse_args()
+
+  stub = StubLLM(prefill_ms_per_token=args.prefill_ms_per_token, decode_ms_per_token=1.0)
+  with StubServer(stub, port=args.port) as server:
+    results = asyncio.run(main_async(args, server.base_url))
+  for r in results:
+    print(json.dumps(r, ensure_ascii=False))
+  if args.out:
+    with open(args.out, "w", encoding="utf-8") as f:
+      json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+  main()
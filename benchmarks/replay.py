@@ -0,0 +1,439 @@
+"""
+트래픽 리플레이: 운영 쿼리 로그(AppLogger JSONL)의 요청을 원래 도착 간격대로 다시 보내 부하를 재현
+
+- `logs/*.log`, `*.log.gz`(또는 지정한 파일/디렉터리)의 query_succeeded/query_failed 레코드에서
+  질문과 엔드포인트를 복원합니다: `stream` -> /api/query/stream, `mode: rows` -> /api/query/rows,
+  같은 `batch` id -> /api/query/batch 한 번, 그 외 -> /api/query.
+- 로그는 요청이 끝날 때 기록되므로 도착 시각 = `ts` - `timings`의 마지막 값으로 계산합니다.
+  `--speed 4`면 간격을 1/4로 줄입니다. 앞 요청이 끝나지 않아도 예정 시각에 보내는 열린 루프라
+  서버가 밀리면 지연이 늘어나는 것까지 측정합니다 (`--max-in-flight`로 상한).
+  `--speed 0`이면 간격 없이 `--concurrency`개씩 최대한 빠르게 보냅니다.
+- 대상: `--url`(실행 중인 서버) 또는 `--in-process`(app.main:app을 httpx ASGITransport로, 설정은 환경변수 그대로).
+  `--stub-llm`이면 LLM 대신 로그의 DB/SQL/답변을 돌려주는 스텁 서버를 띄워 vLLM 없이 DB 쪽 부하만 재현합니다.
+- 결과: 처리량, 클라이언트 측 지연 p50/p95/p99(엔드포인트별), 오류율, 스케줄 지연(클라이언트가 밀린 정도),
+  질문/결과 캐시 적중률(`/api/admin/cache/*` 전후 차이), 스트림 요청의 서버 단계별 시간.
+
+  python -m benchmarks.replay logs/ --url http://localhost:8000 --speed 4 --out replay.json
+  python -m benchmarks.replay logs/2025-01-10.log --in-process --stub-llm --since 2025-01-10T09:00
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import re
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+import httpx
+
+from app.config import settings
+from benchmarks.pipeline_bench import git_commit, percentiles, stage_ms
+from benchmarks.stub_llm import StubLLM, StubServer
+
+
+REQUEST_EVENTS = ("query_succeeded", "query_failed")
+ENDPOINTS = {
+  "query": "/api/query",
+  "stream": "/api/query/stream",
+  "rows": "/api/query/rows",
+  "batch": "/api/query/batch",
+}
+
+
+@dataclass
+class ReplayRequest:
+  """One original HTTP request: `offset` seconds after the first one."""
+  offset: float
+  endpoint: str
+  questions: list[str]
+  failed: int = 0
+  concurrency: int | None = None
+
+
+@dataclass
+class Outcome:
+  endpoint: str
+  questions: int
+  ms: float
+  ttfb_ms: float | None = None
+  lag_ms: float = 0.0
+  errors: list[str] = field(default_factory=list)
+  timings: dict[str, float] | None = None
+
+
+def log_files(paths: list[str]) -> list[Path]:
+  files: list[Path] = []
+  for p in map(Path, paths):
+    if p.is_dir():
+      files += sorted(p.glob("*.log")) + sorted(p.glob("*.log.gz"))
+    elif p.exists():
+      files.append(p)
+  return files
+
+
+def read_records(files: list[Path]) -> Iterator[dict[str, Any]]:
+  for path in files:
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+      for line in f:
+        # 요청 레코드와 배치 요약만 파싱
+        if '"query_' not in line and '"batch_done"' not in line:
+          continue
+        try:
+          yield json.loads(line)
+        except ValueError:
+          continue
+
+
+def _started_at(record: dict[str, Any]) -> float | None:
+  """Request start (epoch seconds): log time minus the last stage mark."""
+  try:
+    ts = datetime.fromisoformat(record["ts"]).timestamp()
+  except (KeyError, TypeError, ValueError):
+    return None
+  timings = record.get("timings") or {}
+  elapsed = max((v for v in timings.values() if isinstance(v, (int, float))), default=0.0)
+  return ts - (record.get("total_ms") or elapsed) / 1000
+
+
+def build_schedule(records: Iterator[dict[str, Any]], since: str | None, until: str | None) -> list[ReplayRequest]:
+  """Original requests ordered by arrival; batch items are folded into their batch."""
+  singles: list[tuple[float, str, str, bool]] = []
+  batches: dict[str, dict[str, Any]] = {}
+  for r in records:
+    if since and str(r.get("ts", "")) < since or until and str(r.get("ts", "")) >= until:
+      continue
+    started = _started_at(r)
+    if started is None:
+      continue
+    if r.get("event") == "batch_done":
+      b = batches.setdefault(r["batch"], {"questions": [], "failed": 0})
+      b["started"], b["concurrency"] = started, r.get("concurrency")
+      continue
+    if r.get("event") not in REQUEST_EVENTS or not r.get("question"):
+      continue
+    failed = r["event"] == "query_failed"
+    if r.get("batch"):
+      b = batches.setdefault(r["batch"], {"questions": [], "failed": 0})
+      b["questions"].append(r["question"])
+      b["failed"] += failed
+      # batch_done이 없으면(범위 밖, 중단) 가장 이른 항목 기준
+      b.setdefault("first_item", started)
+      b["first_item"] = min(b["first_item"], started)
+      continue
+    endpoint = "stream" if r.get("stream") else "rows" if r.get("mode") == "rows" else "query"
+    singles.append((started, endpoint, r["question"], failed))
+
+  items = [(t, ReplayRequest(0.0, endpoint, [q], int(failed))) for t, endpoint, q, failed in singles]
+  for b in batches.values():
+    if b["questions"]:
+      started = b.get("started", b["first_item"])
+      items.append((started, ReplayRequest(0.0, "batch", b["questions"], b["failed"], b.get("concurrency"))))
+  items.sort(key=lambda item: item[0])
+  if not items:
+    return []
+  first = items[0][0]
+  for t, req in items:
+    req.offset = t - first
+  return [req for _, req in items]
+
+
+_SELECTION_QUESTION = re.compile(r"질문:\n(.*?)\n\n", re.DOTALL)
+# few-shot 예시도 "질문: "으로 시작하므로 [요청] 아래의 것
+_SQL_QUESTION = re.compile(r"\[요청\].*?질문: (.*?)\n\n", re.DOTALL)
+_ANSWER_QUESTION = re.compile(r"\[질문\]\n(.*?)\n\n", re.DOTALL)
+
+
+class LoggedReply:
+  """Stub replies taken from the log: the logged DB, SQL and answer of each question."""
+
+  def __init__(self, records: list[dict[str, Any]]) -> None:
+    self.by_question: dict[str, dict[str, Any]] = {}
+    for r in records:
+      if r.get("event") == "query_succeeded" and r.get("question"):
+        self.by_question[r["question"]] = r
+      elif r.get("event") == "query_failed" and r.get("question"):
+        self.by_question.setdefault(r["question"], r)
+
+  def __call__(self, messages: list[dict[str, str]]) -> str:
+    text = messages[-1]["content"]
+    if "선택한 DB의 이름만" in text:
+      m = _SELECTION_QUESTION.search(text)
+      r = self.by_question.get(m.group(1).strip() if m else "", {})
+      return r.get("db") or ""
+    if "하나의 SQL 쿼리로" in text:
+      m = _SQL_QUESTION.search(text)
+      r = self.by_question.get(m.group(1).strip() if m else "", {})
+      return f"```sql\n{(r.get('sql') or 'SELECT 1 AS value').rstrip(';')};\n```"
+    m = _ANSWER_QUESTION.search(text)
+    r = self.by_question.get(m.group(1).strip() if m else "", {})
+    return r.get("answer") or "요청하신 지표는 1 입니다."
+
+
+async def send(client: httpx.AsyncClient, req: ReplayRequest) -> Outcome:
+  """Send one request and read the whole response; errors are per question."""
+  started = time.perf_counter()
+  out = Outcome(req.endpoint, len(req.questions), 0.0)
+
+  def first_byte() -> None:
+    if out.ttfb_ms is None:
+      out.ttfb_ms = (time.perf_counter() - started) * 1000
+
+  try:
+    if req.endpoint == "query":
+      resp = await client.post(ENDPOINTS["query"], json={"question": req.questions[0]})
+      first_byte()
+      if resp.status_code != 200:
+        out.errors.append(f"HTTP {resp.status_code}")
+    elif req.endpoint == "stream":
+      event, done = None, False
+      async with client.stream("POST", ENDPOINTS["stream"], json={"question": req.questions[0]}) as resp:
+        async for line in resp.aiter_lines():
+          first_byte()
+          if line.startswith("event: "):
+            event = line[len("event: "):]
+          elif line.startswith("data: ") and event in ("done", "error"):
+            data = json.loads(line[len("data: "):])
+            if event == "error":
+              out.errors.append(str(data.get("message") or data.get("error")))
+            else:
+              done = True
+              out.timings = stage_ms(data["timings"])
+      if not done and not out.errors:
+        out.errors.append(f"stream ended without done (HTTP {resp.status_code})")
+    else:
+      body: dict[str, Any] = {"question": req.questions[0]}
+      if req.endpoint == "batch":
+        body = {"questions": req.questions, "concurrency": req.concurrency}
+      done = False
+      async with client.stream("POST", ENDPOINTS[req.endpoint], json=body) as resp:
+        async for line in resp.aiter_lines():
+          first_byte()
+          if not line:
+            continue
+          data = json.loads(line)
+          # 행 자체에 error 컬럼이 있을 수 있으므로 오류 줄의 다른 키로 구분
+          if "error" in data and ({"index", "message", "row_count"} & data.keys()):
+            error = data["error"]
+            out.errors.append(str(error.get("message") if isinstance(error, dict) else error))
+          done = done or bool(data.get("done"))
+      if resp.status_code != 200:
+        out.errors = [f"HTTP {resp.status_code}"] * len(req.questions)
+      elif not done and not out.errors:
+        out.errors.append("response ended without done")
+  except Exception as e:
+    # --in-process에서는 앱 예외가 (500 응답 대신) 그대로 올라옴
+    out.errors = [type(e).__name__] * len(req.questions)
+  out.ms = (time.perf_counter() - started) * 1000
+  return out
+
+
+async def cache_snapshot(client: httpx.AsyncClient) -> dict[str, Any] | None:
+  try:
+    sql = (await client.get("/api/admin/cache/sql")).json()
+    result = (await client.get("/api/admin/cache/result")).json()
+  except (httpx.HTTPError, ValueError):
+    # admin API를 막아 둔 서버
+    return None
+  return {"sql": sql, "result": result}
+
+
+def cache_delta(before: dict[str, Any] | None, after: dict[str, Any] | None) -> dict[str, Any] | None:
+  """Hits/misses during the replay and hit rates (question cache per stage, result cache)."""
+  if before is None or after is None:
+    return None
+
+  def rate(hits: int, misses: int) -> float | None:
+    return round(hits / (hits + misses), 3) if hits + misses else None
+
+  sql: dict[str, Any] = {}
+  for stage in sorted(set(after["sql"]["hits"]) | set(after["sql"]["misses"])):
+    hits = after["sql"]["hits"].get(stage, 0) - before["sql"]["hits"].get(stage, 0)
+    misses = after["sql"]["misses"].get(stage, 0) - before["sql"]["misses"].get(stage, 0)
+    sql[stage] = {"hits": hits, "misses": misses, "hit_rate": rate(hits, misses)}
+  hits = after["result"]["hits"] - before["result"]["hits"]
+  misses = after["result"]["misses"] - before["result"]["misses"]
+  return {
+    "sql_cache": {"enabled": after["sql"].get("enabled"), **sql},
+    "result_cache": {"hits": hits, "misses": misses, "hit_rate": rate(hits, misses)},
+  }
+
+
+async def replay(client: httpx.AsyncClient, schedule: list[ReplayRequest], args: argparse.Namespace) -> dict[str, Any]:
+  if args.clear_cache:
+    await client.delete("/api/admin/cache/sql")
+    await client.delete("/api/admin/cache/result")
+  before = await cache_snapshot(client)
+  outcomes: list[Outcome] = []
+  started = time.perf_counter()
+
+  if args.speed > 0:
+    # 열린 루프: 예정 시각에 보내고 끝나기를 기다리지 않음
+    slots = asyncio.Semaphore(args.max_in_flight) if args.max_in_flight > 0 else None
+
+    async def fire(req: ReplayRequest, lag: float) -> None:
+      try:
+        out = await send(client, req)
+        out.lag_ms = lag * 1000
+        outcomes.append(out)
+      finally:
+        if slots is not None:
+          slots.release()
+
+    tasks: list[asyncio.Task[None]] = []
+    for req in schedule:
+      due = started + req.offset / args.speed
+      delay = due - time.perf_counter()
+      if delay > 0:
+        await asyncio.sleep(delay)
+      if slots is not None:
+        await slots.acquire()
+      tasks.append(asyncio.create_task(fire(req, max(0.0, time.perf_counter() - due))))
+    await asyncio.gather(*tasks)
+  else:
+    queue: asyncio.Queue[ReplayRequest] = asyncio.Queue()
+    for req in schedule:
+      queue.put_nowait(req)
+
+    async def worker() -> None:
+      while not queue.empty():
+        outcomes.append(await send(client, queue.get_nowait()))
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+  elapsed = time.perf_counter() - started
+  after = await cache_snapshot(client)
+
+  questions = sum(o.questions for o in outcomes)
+  errors = [e for o in outcomes for e in o.errors]
+  latency = {"all": percentiles([o.ms for o in outcomes])}
+  for endpoint in ENDPOINTS:
+    values = [o.ms for o in outcomes if o.endpoint == endpoint]
+    if values:
+      latency[endpoint] = {"requests": len(values), **percentiles(values)}
+  stages = [o.timings for o in outcomes if o.timings]
+  return {
+    "requests": len(outcomes),
+    "questions": questions,
+    "errors": len(errors),
+    "error_rate": round(len(errors) / questions, 4) if questions else None,
+    "error_samples": sorted(set(errors))[:5],
+    "elapsed_s": round(elapsed, 3),
+    "throughput_rps": round(len(outcomes) / elapsed, 2) if elapsed else None,
+    "questions_per_s": round(questions / elapsed, 2) if elapsed else None,
+    "latency_ms": latency,
+    "ttfb_ms": percentiles([o.ttfb_ms for o in outcomes if o.ttfb_ms is not None]),
+    "schedule_lag_ms": percentiles([o.lag_ms for o in outcomes]) if args.speed > 0 else None,
+    "server_stages_ms": {name: percentiles([s[name] for s in stages]) for name in stages[0]} if stages else None,
+    "cache": cache_delta(before, after),
+  }
+
+
+async def drive_in_process(schedule: list[ReplayRequest], args: argparse.Namespace) -> dict[str, Any]:
+  import app.main as app_main
+
+  app = app_main.app
+  for handler in app.router.on_startup:
+    await handler()
+  try:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=args.timeout) as client:
+      return await replay(client, schedule, args)
+  finally:
+    for handler in app.router.on_shutdown:
+      await handler()
+
+
+async def drive_remote(schedule: list[ReplayRequest], args: argparse.Namespace) -> dict[str, Any]:
+  limits = httpx.Limits(max_connections=None, max_keepalive_connections=args.max_in_flight or args.concurrency)
+  async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+    return await replay(client, schedule, args)
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("paths", nargs="*", help="로그 파일 또는 디렉터리 (기본 logs/)")
+  target = parser.add_mutually_exclusive_group(required=True)
+  target.add_argument("--url", help="실행 중인 서버 주소 (예: http://localhost:8000)")
+  target.add_argument("--in-process", action="store_true", help="app.main:app을 이 프로세스에서 실행")
+  parser.add_argument("--speed", type=float, default=1.0, help="도착 간격 배속 (0 = 간격 없이 --concurrency로)")
+  parser.add_argument("--concurrency", type=int, default=16, help="--speed 0일 때 동시 요청 수")
+  parser.add_argument("--max-in-flight", type=int, default=0, help="동시에 보내는 요청 상한 (0 = 무제한)")
+  parser.add_argument("--since", help="이 ts(ISO, 문자열 비교) 이후 요청만")
+  parser.add_argument("--until", help="이 ts 이전 요청만")
+  parser.add_argument("--limit", type=int, default=0, help="앞에서부터 요청 수 제한")
+  parser.add_argument("--timeout", type=float, default=300.0, help="요청당 제한 시간(초)")
+  parser.add_argument("--clear-cache", action="store_true", help="시작 전에 질문/결과 캐시를 비움")
+  parser.add_argument("--stub-llm", action="store_true", help="(--in-process) 로그의 DB/SQL/답변을 돌려주는 스텁 LLM 사용")
+  parser.add_argument("--prefill-ms-per-token", type=float, default=0.02)
+  parser.add_argument("--decode-ms-per-token", type=float, default=5.0)
+  parser.add_argument("--llm-concurrency", type=int, default=0, help="스텁의 동시 처리 슬롯 (0 = 무제한)")
+  parser.add_argument("--port", type=int, default=8903, help="스텁 LLM 포트")
+  parser.add_argument("--out", help="결과 JSON 파일 경로")
+  args = parser.parse_args()
+  if args.stub_llm and not args.in_process:
+    parser.error("--stub-llm requires --in-process")
+
+  from app.services import logger as logger_module
+  files = log_files(args.paths or [str(logger_module.LOG_DIR)])
+  records = list(read_records(files))
+  schedule = build_schedule(iter(records), args.since, args.until)
+  if args.limit > 0:
+    schedule = schedule[:args.limit]
+  if not schedule:
+    parser.error(f"no query records in {', '.join(map(str, files)) or 'the given paths'}")
+  span = schedule[-1].offset
+  source = {
+    "files": len(files),
+    "requests": len(schedule),
+    "questions": sum(len(r.questions) for r in schedule),
+    "original_errors": sum(r.failed for r in schedule),
+    "span_s": round(span, 3),
+    "original_rps": round(len(schedule) / span, 2) if span else None,
+    "by_endpoint": {e: sum(1 for r in schedule if r.endpoint == e) for e in ENDPOINTS},
+  }
+
+  stub: StubLLM | None = None
+  if args.url:
+    result = asyncio.run(drive_remote(schedule, args))
+  else:
+    with tempfile.TemporaryDirectory(prefix="replay_") as tmp:
+      # 리플레이 요청의 로그가 원본 로그에 섞이지 않도록
+      logger_module.LOG_DIR = Path(tmp) / "logs"
+      settings.llm_warmup = False
+      if args.stub_llm:
+        stub = StubLLM(
+          prefill_ms_per_token=args.prefill_ms_per_token,
+          decode_ms_per_token=args.decode_ms_per_token,
+          reply=LoggedReply(records),
+          max_concurrency=args.llm_concurrency,
+        )
+        with StubServer(stub, port=args.port) as server:
+          settings.llm_provider = "vllm"
+          settings.vllm_base_url = server.base_url
+          result = asyncio.run(drive_in_process(schedule, args))
+      else:
+        result = asyncio.run(drive_in_process(schedule, args))
+  if stub is not None:
+    result["stub"] = dict(stub.stats)
+
+  report = {
+    "commit": git_commit(),
+    "config": {k: v for k, v in vars(args).items() if k not in ("out", "port", "paths")},
+    "source": source,
+    **result,
+  }
+  print(json.dumps(report, ensure_ascii=False, indent=2))
+  if args.out:
+    with open(args.out, "w", encoding="utf-8") as f:
+      json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,154 @@
+"""
+SQLite로 MySQL을 대신하는 DatabaseManager (벤치마크용)
+
+- edgefarm 유사 스키마(farm → piggery → room → herd → herd_history, 일별 체중)와
+  작은 sales 스키마를 임시 파일 DB로 만들고 시드 데이터를 넣습니다.
+- 실행 경로는 DatabaseManager.aquery_bounded 그대로이며 (DB별 limiter, 결과 캐시),
+  스레드에서 실행되는 `_query_connector`, 스키마 조회(`introspect_tables`), 값 프로필 조회(`_fetch_internal`)만 SQLite로 바꿉니다.
+  MySQL 전용 가드(EXPLAIN, MAX_EXECUTION_TIME, KILL QUERY)는 측정 대상이 아닙니다.
+"""
+
+from __future__ import annotations
+
+import random
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Any
+
+from app.models.db_manager import ColumnarRows, DatabaseConfig, DatabaseManager, PoolConfig
+
+
+SCHEMAS: dict[str, str] = {
+  "edgefarm": """
+    CREATE TABLE farm (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL, created_at DATETIME);
+    CREATE TABLE piggery (id INTEGER PRIMARY KEY, farm_id INTEGER NOT NULL REFERENCES farm(id), name VARCHAR(50), created_at DATETIME);
+    CREATE TABLE room (id INTEGER PRIMARY KEY, piggery_id INTEGER NOT NULL REFERENCES piggery(id), name VARCHAR(50));
+    CREATE TABLE herd (id INTEGER PRIMARY KEY, room_id INTEGER NOT NULL REFERENCES room(id), active_status INTEGER, created_at DATETIME);
+    CREATE TABLE herd_history (id INTEGER PRIMARY KEY, herd_id INTEGER NOT NULL REFERENCES herd(id), category_id INTEGER, change INTEGER, stock INTEGER, created_at DATETIME);
+    CREATE TABLE efg_room_daily_history (id INTEGER PRIMARY KEY, room_id INTEGER NOT NULL REFERENCES room(id), avg_weight DECIMAL(6,2), created_at DATETIME);
+  """,
+  "sales": """
+    CREATE TABLE customer (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL, region VARCHAR(20));
+    CREATE TABLE sales_order (id INTEGER PRIMARY KEY, customer_id INTEGER NOT NULL REFERENCES customer(id), amount DECIMAL(12,2), ordered_at DATETIME);
+  """,
+}
+
+DESCRIPTIONS = {
+  "edgefarm": "양돈 농장 DB (농장, 돈사, 방, 돈군, 두수 이력, 체중)",
+  "sales": "매출 관련 DB (고객, 주문, 매출액)",
+}
+
+
+def _day(i: int) -> str:
+  return f"2025-{1 + (i // 28) % 12:02d}-{1 + i % 28:02d} 00:00:00"
+
+
+def seed(path: Path, db_name: str, scale: int, rnd: random.Random) -> None:
+  """Create `db_name`'s schema in `path`; `scale` ≈ rows of the largest table."""
+  con = sqlite3.connect(path)
+  con.executescript(SCHEMAS[db_name])
+  if db_name == "edgefarm":
+    farms = [(f, f"농장{f}", _day(f)) for f in range(1, 6)]
+    piggeries = [(p, 1 + (p - 1) // 4, ["자돈사", "비육사", "후기자돈사", "육성사"][(p - 1) % 4], _day(p)) for p in range(1, 21)]
+    rooms = [(r, 1 + (r - 1) // 6, f"{1 + (r - 1) % 6}방") for r in range(1, 121)]
+    herds = [(h, h, 1 if h % 10 else 0, _day(h)) for h in range(1, 121)]
+    history = [
+      (i, rnd.randint(1, 120), rnd.randint(1, 6), rnd.randint(1, 30), rnd.randint(50, 500), _day(i))
+      for i in range(1, scale + 1)
+    ]
+    weights = [(i, 1 + i % 120, round(rnd.uniform(5, 120), 2), _day(i // 120)) for i in range(1, scale // 4 + 1)]
+    con.executemany("INSERT INTO farm VALUES (?, ?, ?)", farms)
+    con.executemany("INSERT INTO piggery VALUES (?, ?, ?, ?)", piggeries)
+    con.executemany("INSERT INTO room VALUES (?, ?, ?)", rooms)
+    con.executemany("INSERT INTO herd VALUES (?, ?, ?, ?)", herds)
+    con.executemany("INSERT INTO herd_history VALUES (?, ?, ?, ?, ?, ?)", history)
+    con.executemany("INSERT INTO efg_room_daily_history VALUES (?, ?, ?, ?)", weights)
+  else:
+    customers = [(c, f"고객{c}", ["서울", "부산", "대구"][c % 3]) for c in range(1, 201)]
+    orders = [(i, rnd.randint(1, 200), round(rnd.uniform(1000, 900000), 2), _day(i)) for i in range(1, scale // 2 + 1)]
+    con.executemany("INSERT INTO customer VALUES (?, ?, ?)", customers)
+    con.executemany("INSERT INTO sales_order VALUES (?, ?, ?, ?)", orders)
+  con.commit()
+  con.close()
+
+
+class SQLiteDatabaseManager(DatabaseManager):
+  """DatabaseManager over seeded SQLite files in `workdir`."""
+
+  def __init__(self, workdir: Path, scale: int = 20000, pool_size: int = 8, seed_value: int = 7) -> None:
+    super().__init__()
+    self.workdir = workdir
+    self.scale = scale
+    self.pool_size = pool_size
+    self.seed_value = seed_value
+    self.paths: dict[str, Path] = {}
+    self._local = threading.local()
+
+  def load_config(self) -> None:
+    self.databases = [
+      DatabaseConfig(name, "sqlite", 0, "", "", name, DESCRIPTIONS[name], pool=PoolConfig(max_size=self.pool_size))
+      for name in SCHEMAS
+    ]
+
+  def connect_db(self, name: str) -> None:
+    if name in self.paths:
+      return
+    path = self.workdir / f"{name}.sqlite"
+    if not path.exists():
+      seed(path, name, self.scale, random.Random(self.seed_value))
+    self.paths[name] = path
+
+  def connect_all(self) -> None:
+    self._limiters = {}
+    for cfg in self.databases:
+      self.connect_db(cfg.name)
+
+  def close_all(self) -> None:
+    self.paths = {}
+
+  def _connect(self, db_name: str) -> sqlite3.Connection:
+    # 워커 스레드마다 DB별 연결 하나 (sqlite3 연결은 스레드 간 공유 불가)
+    cons = self._local.__dict__.setdefault("cons", {})
+    con = cons.get(db_name)
+    if con is None:
+      con = cons[db_name] = sqlite3.connect(self.paths[db_name])
+    return con
+
+  def _query_connector(self, db_name: str, sql: str, params: tuple[Any, ...] | None, max_rows: int | None = None, columnar: bool = False, cancel: threading.Event | None = None) -> tuple[list[dict[str, Any]] | ColumnarRows, bool]:
+    cur = self._connect(db_name).execute(sql.rstrip().rstrip(";"), params or ())
+    names = [d[0] for d in cur.description or ()]
+    rows = cur.fetchmany(max_rows + 1) if max_rows is not None else cur.fetchall()
+    cur.close()
+    truncated = max_rows is not None and len(rows) > max_rows
+    if truncated:
+      rows = rows[:max_rows]
+    if columnar:
+      return ColumnarRows(names, rows), truncated
+    return [dict(zip(names, r)) for r in rows], truncated
+
+  def _fetch_internal(self, db_name: str, sql: str) -> list[tuple[Any, ...]]:
+    return self._connect(db_name).execute(sql).fetchall()
+
+  def table_fingerprints(self, db_name: str) -> dict[str, str]:
+    con = sqlite3.connect(self.paths[db_name])
+    rows = con.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'").fetchall()
+    con.close()
+    return {name: str(zlib.crc32(ddl.encode())) for name, ddl in rows}
+
+  def introspect_tables(self, db_name: str, tables: list[str] | None = None) -> dict[str, dict[str, list[list[Any]]]]:
+    """Same shape as DatabaseManager.introspect_tables (INFORMATION_SCHEMA)."""
+    con = sqlite3.connect(self.paths[db_name])
+    names = tables if tables is not None else [r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    result: dict[str, dict[str, list[list[Any]]]] = {}
+    for tbl in names:
+      columns = [
+        [col, dtype.split("(")[0].lower(), "NO" if notnull or pk else "YES", "PRI" if pk else ""]
+        for _, col, dtype, notnull, _, pk in con.execute(f"PRAGMA table_info({tbl})")
+      ]
+      if columns:
+        fks = [[row[3], row[2], row[4]] for row in con.execute(f"PRAGMA foreign_key_list({tbl})")]
+        result[tbl] = {"columns": columns, "fks": fks}
+    con.close()
+    return result
@@ -0,0 +1,169 @@
+"""
+OpenAI 호환 스텁 LLM 서버 (벤치마크용)
+
+- POST /v1/chat/completions (stream, `n` 지원), GET /stats, POST /reset
+- 프롬프트 "토큰"은 문자 단위로 근사합니다.
+- vLLM automatic prefix caching 흉내: 프롬프트를 block_size 단위 블록으로 나누고
+  앞에서부터 이미 본 블록(체인 해시)이면 prefill 비용을 생략합니다.
+- max_concurrency: 동시에 처리하는 요청 수 (GPU 배치 슬롯 흉내, 0 = 무제한). 초과 요청은 대기합니다.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+def default_reply(messages: list[dict[str, str]]) -> str:
+  text = messages[-1]["content"]
+  if "SQL" in text:
+    return "```sql\nSELECT 1 AS value;\n```"
+  return "요청하신 지표는 1 입니다."
+
+
+class StubLLM:
+  def __init__(
+    self,
+    prefill_ms_per_token: float = 0.02,
+    decode_ms_per_token: float = 5.0,
+    block_size: int = 64,
+    prefix_caching: bool = True,
+    reply: Callable[[list[dict[str, str]]], str] = default_reply,
+    max_concurrency: int = 0,
+  ) -> None:
+    self.prefill_ms_per_token = prefill_ms_per_token
+    self.decode_ms_per_token = decode_ms_per_token
+    self.block_size = block_size
+    self.prefix_caching = prefix_caching
+    self.reply = reply
+    self.max_concurrency = max_concurrency
+    self._blocks: set[str] = set()
+    self.stats: dict[str, float] = {}
+    self.reset()
+
+  def reset(self) -> None:
+    self._blocks.clear()
+    self.stats = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "prefill_ms": 0.0, "queued_ms": 0.0}
+
+  def _cached_prefix(self, prompt: str) -> int:
+    """Number of leading tokens already in the (simulated) KV cache."""
+    cached = 0
+    h = hashlib.sha1()
+    hit = self.prefix_caching
+    for i in range(0, len(prompt) - self.block_size + 1, self.block_size):
+      h.update(prompt[i:i + self.block_size].encode("utf-8"))
+      digest = h.hexdigest()
+      if hit and digest in self._blocks:
+        cached += self.block_size
+      else:
+        hit = False
+        self._blocks.add(digest)
+    return cached
+
+  def app(self) -> FastAPI:
+    app = FastAPI()
+    slots = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency > 0 else None
+
+    @contextlib.asynccontextmanager
+    async def slot():
+      if slots is None:
+        yield
+        return
+      queued = time.perf_counter()
+      async with slots:
+        self.stats["queued_ms"] += (time.perf_counter() - queued) * 1000
+        yield
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat(req: Request) -> Any:
+      body = await req.json()
+      if not body.get("stream"):
+        async with slot():
+          return await complete(body)
+
+      async def locked():
+        async with slot():
+          async for event in await complete(body):
+            yield event
+
+      return StreamingResponse(locked(), media_type="text/event-stream")
+
+    async def complete(body: dict[str, Any]) -> Any:
+      messages = body["messages"]
+      # chat template 렌더링 흉내: role 경계 포함 문자열
+      prompt = "".join(f"<|{m['role']}|>{m['content']}" for m in messages)
+      cached = self._cached_prefix(prompt)
+      prefill_ms = (len(prompt) - cached) * self.prefill_ms_per_token
+      self.stats["requests"] += 1
+      self.stats["prompt_tokens"] += len(prompt)
+      self.stats["cached_tokens"] += cached
+      self.stats["prefill_ms"] += prefill_ms
+      await asyncio.sleep(prefill_ms / 1000)
+
+      text = self.reply(messages)
+      if body.get("max_tokens") is not None:
+        text = text[: body["max_tokens"]]
+      tokens = text.split(" ")
+      usage = {
+        "prompt_tokens": len(prompt),
+        "completion_tokens": len(tokens),
+        "total_tokens": len(prompt) + len(tokens),
+        "prompt_tokens_details": {"cached_tokens": cached},
+      }
+      if not body.get("stream"):
+        # n개 샘플은 한 배치로 디코딩되므로 지연은 1개와 같음
+        await asyncio.sleep(len(tokens) * self.decode_ms_per_token / 1000)
+        choice = {"message": {"role": "assistant", "content": text}}
+        return {"choices": [choice] * int(body.get("n") or 1), "usage": usage}
+
+      async def events():
+        for i, tok in enumerate(tokens):
+          await asyncio.sleep(self.decode_ms_per_token / 1000)
+          piece = tok if i == 0 else " " + tok
+          yield "data: " + json.dumps({"choices": [{"delta": {"content": piece}}]}, ensure_ascii=False) + "\n\n"
+        yield "data: " + json.dumps({"choices": [], "usage": usage}) + "\n\n"
+        yield "data: [DONE]\n\n"
+
+      return events()
+
+    @app.get("/stats")
+    def stats() -> dict[str, float]:
+      return dict(self.stats)
+
+    @app.post("/reset")
+    def reset() -> dict[str, bool]:
+      self.reset()
+      return {"ok": True}
+
+    return app
+
+
+class StubServer:
+  """Runs a StubLLM with uvicorn in a background thread."""
+
+  def __init__(self, stub: StubLLM, host: str = "127.0.0.1", port: int = 8901) -> None:
+    self.stub = stub
+    self.base_url = f"http://{host}:{port}"
+    config = uvicorn.Config(stub.app(), host=host, port=port, log_level="warning")
+    self._server = uvicorn.Server(config)
+    self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+  def __enter__(self) -> "StubServer":
+    self._thread.start()
+    while not self._server.started:
+      time.sleep(0.01)
+    return self
+
+  def __exit__(self, *exc: Any) -> None:
+    self._server.should_exit = True
+    self._thread.join(timeout=5)
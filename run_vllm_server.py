@@ -48,6 +48,7 @@ def main():
         "--max-model-len", MAX_MODEL_LEN,
         "--trust-remote-code",
         "--dtype", "auto",
+        "--enable-prefix-caching",          # 규칙+스키마 고정 prefix의 KV 블록 재사용
     ]
 
     try:
@@ -22,4 +22,5 @@ python3 -m vllm.entrypoints.openai.api_server \
   --port 8001 \
   --trust-remote-code \
   --max-model-len 8192 \
+  --enable-prefix-caching \
   --gpu-memory-utilization 0.9 
\ No newline at end of file